@@ -2,9 +2,17 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
-import networkx as nx
 from datetime import datetime
 
+from curriculum import CurriculumIndex, as_semester
+from evaluasi import PASSING_ATTAINMENT, AttainmentEngine, cohort_summary, ingest_grades, store_attainment
+from jadwal import DAYS, SLOTS, build_problem, solve_timetable
+from krs import SKS_MAX, SKS_MIN, EligibilityEngine
+from nilai_store import GradeStore
+from rencana import StudyPlanner
+from prasyarat import GraphAnalytics, ReachabilityIndex, is_large_graph, prasyarat_edges, prasyarat_figure, prasyarat_layout
+from prasyarat_ui import show_large_prasyarat_graph
+
 # Konfigurasi halaman
 st.set_page_config(
     page_title="Kurikulum OBE Ilmu Komputer MNCU",
@@ -156,6 +164,56 @@ def load_data():
     
     return pl_data, cpl_data, mk_wajib, peminatan_data, prasyarat_data
 
+@st.cache_resource
+def load_curriculum_index():
+    """CurriculumIndex bersama untuk data kurikulum (dibangun sekali per proses)"""
+    _, _, mk_wajib, peminatan_data, _ = load_data()
+    return CurriculumIndex(mk_wajib, peminatan_data)
+
+@st.cache_resource
+def load_reachability_index():
+    """Transitive closure prasyarat bersama (dibangun sekali per proses)"""
+    _, _, _, _, prasyarat_data = load_data()
+    return ReachabilityIndex(prasyarat_data)
+
+@st.cache_resource
+def load_graph_analytics():
+    """Kedalaman, fan-in/out, betweenness dan jalur kritis graph prasyarat (sekali per proses)"""
+    return GraphAnalytics(load_reachability_index(), load_curriculum_index())
+
+@st.cache_resource
+def load_krs_engine():
+    """Mesin kelayakan KRS bersama (cache transkrip dibagi antar sesi)"""
+    return EligibilityEngine(None, reach=load_reachability_index())
+
+@st.cache_resource
+def load_attainment_engine():
+    """Matriks bobot MK x CPL bersama (dibangun sekali per proses)"""
+    _, cpl_data, _, _, _ = load_data()
+    return AttainmentEngine(load_curriculum_index(), [cpl for codes in cpl_data.values() for cpl in codes])
+
+@st.cache_resource
+def load_grade_store():
+    """Gudang nilai kolumnar di data/nilai (dibaca lewat memory map)"""
+    return GradeStore()
+
+@st.cache_data(show_spinner="Menghitung capaian CPL...", max_entries=8)
+def load_store_attainment(version, tahun):
+    """Capaian per mahasiswa dari gudang nilai; version = stamp manifest gudang"""
+    return store_attainment(load_attainment_engine(), load_grade_store(), tahun)
+
+@st.cache_data(show_spinner="Menyusun jadwal...")
+def load_jadwal(parity):
+    """Jadwal semua MK yang dibuka di semester ganjil (1) atau genap (0)"""
+    index = load_curriculum_index()
+    offerings = [mk for mk in index.by_kode.values() if (as_semester(mk.get("Semester")) or 0) % 2 == parity]
+    return solve_timetable(build_problem(offerings, index.peminatan_of))
+
+@st.cache_resource
+def load_study_planner():
+    """Perencana studi bersama (hasil rencana di-cache per transkrip)"""
+    return StudyPlanner(load_curriculum_index(), load_reachability_index())
+
 # Fungsi untuk dashboard
 def show_dashboard(pl_data, cpl_data, mk_wajib):
     st.markdown('<h1 class="main-header">🎓 Dashboard Kurikulum OBE Ilmu Komputer MNCU</h1>', unsafe_allow_html=True)
@@ -271,7 +329,7 @@ def show_profil_lulusan(pl_data):
                         st.success(f"✓ {skill}")
 
 # Fungsi untuk menampilkan Struktur Kurikulum
-def show_struktur_kurikulum(mk_wajib, peminatan_data):
+def show_struktur_kurikulum(index, peminatan_data):
     st.markdown('<h1 class="main-header">📚 Struktur Kurikulum 145 SKS</h1>', unsafe_allow_html=True)
     
     # Pilih semester
@@ -279,7 +337,7 @@ def show_struktur_kurikulum(mk_wajib, peminatan_data):
     
     if semester <= 4:
         # Mata kuliah wajib
-        mk_semester = [mk for mk in mk_wajib if mk["Semester"] == semester]
+        mk_semester = index.wajib_semester(semester)
         
         st.markdown(f'<div class="semester-box">Semester {semester} - Mata Kuliah Wajib</div>', unsafe_allow_html=True)
         
@@ -306,7 +364,7 @@ def show_struktur_kurikulum(mk_wajib, peminatan_data):
         peminatan = st.radio("Pilih Peminatan:", list(peminatan_data.keys()), horizontal=True)
         
         if peminatan:
-            mk_peminatan = [mk for mk in peminatan_data[peminatan] if mk["Semester"] == semester]
+            mk_peminatan = index.peminatan_semester(peminatan, semester)
             
             for mk in mk_peminatan:
                 with st.expander(f"{mk['Kode']} - {mk['Nama']} ({mk['SKS']} SKS)"):
@@ -319,87 +377,43 @@ def show_struktur_kurikulum(mk_wajib, peminatan_data):
     # Total SKS
     total_sks = 0
     if semester <= 4:
-        total_sks = sum(mk["SKS"] for mk in mk_wajib if mk["Semester"] == semester)
+        total_sks = sum(mk["SKS"] for mk in index.wajib_semester(semester))
     else:
         total_sks = 9  # Rata-rata SKS peminatan + MBKM
     
     st.info(f"**Total SKS Semester {semester}: {total_sks} SKS**")
 
+# Fungsi graph prasyarat besar (WebGL, ringkas per kelompok)
 # Fungsi untuk menampilkan Prasyarat
-def show_prasyarat(prasyarat_data, mk_wajib):
+def show_prasyarat(prasyarat_data, index):
     st.markdown('<h1 class="main-header">🔗 Prasyarat Mata Kuliah</h1>', unsafe_allow_html=True)
     
     # Visualisasi graph prasyarat
     st.markdown("### Diagram Prasyarat Mata Kuliah")
     
-    # Buat graph
-    G = nx.DiGraph()
+    # Posisi berlapis per semester (di-cache per hash graph)
+    pos = prasyarat_layout(prasyarat_data, index, extra_nodes=index.wajib_codes)
+    edges = prasyarat_edges(prasyarat_data)
     
-    # Tambahkan node dan edges
-    for mk, prasyarat in prasyarat_data.items():
-        for p in prasyarat:
-            G.add_edge(p, mk)
+    if is_large_graph(pos):
+        show_large_prasyarat_graph(pos, edges, index, load_reachability_index())
+    else:
+        fig = prasyarat_figure(pos, edges, title='Diagram Prasyarat Mata Kuliah')
+        st.plotly_chart(fig, use_container_width=True)
     
-    # Tambahkan node lain yang tidak memiliki prasyarat
-    all_mk = set()
-    for mk in mk_wajib:
-        all_mk.add(mk["Kode"])
-    
-    for mk in all_mk:
-        if mk not in G:
-            G.add_node(mk)
-    
-    # Buat posisi layout
-    pos = nx.spring_layout(G, seed=42)
-    
-    # Buat plotly figure
-    edge_x = []
-    edge_y = []
-    for edge in G.edges():
-        x0, y0 = pos[edge[0]]
-        x1, y1 = pos[edge[1]]
-        edge_x.extend([x0, x1, None])
-        edge_y.extend([y0, y1, None])
-    
-    edge_trace = go.Scatter(
-        x=edge_x, y=edge_y,
-        line=dict(width=2, color='#888'),
-        hoverinfo='none',
-        mode='lines')
-    
-    node_x = []
-    node_y = []
-    node_text = []
-    for node in G.nodes():
-        x, y = pos[node]
-        node_x.append(x)
-        node_y.append(y)
-        node_text.append(node)
-    
-    node_trace = go.Scatter(
-        x=node_x, y=node_y,
-        mode='markers+text',
-        hoverinfo='text',
-        text=node_text,
-        textposition="top center",
-        marker=dict(
-            showscale=True,
-            colorscale='Viridis',
-            size=20,
-            color=list(range(len(G.nodes()))),
-            line_width=2))
-    
-    fig = go.Figure(data=[edge_trace, node_trace],
-                    layout=go.Layout(
-                        title='Diagram Prasyarat Mata Kuliah',
-                        showlegend=False,
-                        hovermode='closest',
-                        margin=dict(b=20,l=5,r=5,t=40),
-                        xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-                        yaxis=dict(showgrid=False, zeroline=False, showticklabels=False))
-                    )
+    # Analitik graph (dihitung sekali, tidak di setiap rerun)
+    st.markdown("### 📊 Analitik Prasyarat")
+    analytics = load_graph_analytics()
     
-    st.plotly_chart(fig, use_container_width=True)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Rantai Prasyarat Terpanjang", f"{analytics.max_depth()} semester")
+        st.write("**MK leher botol (betweenness tertinggi):**")
+        st.dataframe(pd.DataFrame(analytics.bottlenecks()), use_container_width=True, hide_index=True)
+    with col2:
+        st.write("**Jalur kritis menuju capstone peminatan:**")
+        for peminatan, path in analytics.critical_paths.items():
+            st.write(f"- **{peminatan}:** {' → '.join(path)}")
     
     # Tabel prasyarat
     st.markdown("### Tabel Prasyarat")
@@ -421,22 +435,26 @@ def show_prasyarat(prasyarat_data, mk_wajib):
     selected_mk = st.selectbox("Pilih Mata Kuliah:", list(prasyarat_data.keys()))
     
     if selected_mk:
+        reach = load_reachability_index()
         st.write(f"**Mata Kuliah:** {selected_mk}")
         st.write(f"**Prasyarat:** {', '.join(prasyarat_data[selected_mk])}")
+        st.write(f"**Rantai prasyarat lengkap:** {', '.join(reach.all_prerequisites(selected_mk))}")
         
         # Contoh: apakah mahasiswa bisa ambil MK ini?
         col1, col2 = st.columns(2)
         with col1:
             mk_lulus = st.multiselect("Mata Kuliah yang sudah lulus:", 
-                                     list(set([item for sublist in prasyarat_data.values() for item in sublist])))
+                                     reach.all_prerequisites(selected_mk))
         
         with col2:
-            if set(prasyarat_data[selected_mk]).issubset(set(mk_lulus)):
+            missing = reach.missing(selected_mk, mk_lulus)
+            if reach.eligible(selected_mk, mk_lulus):
                 st.success("✅ Boleh mengambil mata kuliah ini!")
+                if missing:
+                    st.caption(f"Prasyarat tidak langsung yang belum tercatat: {', '.join(missing)}")
             elif mk_lulus:
                 st.error("❌ Belum memenuhi semua prasyarat")
-                missing = set(prasyarat_data[selected_mk]) - set(mk_lulus)
-                st.write(f"Masih perlu: {', '.join(missing)}")
+                st.write(f"Masih perlu (urut dari yang paling dasar): {', '.join(missing)}")
 
 # Fungsi untuk menampilkan MBKM
 def show_mbkm():
@@ -508,7 +526,7 @@ def show_mbkm():
         st.write(f"**{sem}**: {kegiatan}")
 
 # Fungsi untuk Simulasi KRS
-def show_simulasi_krs(mk_wajib, peminatan_data, prasyarat_data):
+def show_simulasi_krs(index, peminatan_data, prasyarat_data):
     st.markdown('<h1 class="main-header">📝 Simulator KRS Online</h1>', unsafe_allow_html=True)
     
     # Input mahasiswa
@@ -527,25 +545,27 @@ def show_simulasi_krs(mk_wajib, peminatan_data, prasyarat_data):
     available_mk = []
     
     # MK wajib untuk semester ini
-    mk_semester = [mk for mk in mk_wajib if mk["Semester"] == semester]
-    available_mk.extend(mk_semester)
+    available_mk.extend(index.wajib_semester(semester))
     
     # MK peminatan untuk semester ini
     if semester >= 5:
-        mk_peminatan = [mk for mk in peminatan_data[peminatan] if mk["Semester"] == semester]
-        available_mk.extend(mk_peminatan)
-    
-    # Cek prasyarat untuk setiap MK
-    mk_valid = []
-    mk_invalid = []
-    
-    for mk in available_mk:
-        mk_code = mk["Kode"]
-        if mk_code in prasyarat_data:
-            # Asumsikan semua prasyarat sudah dipenuhi (dalam simulasi sederhana)
-            mk_valid.append(mk)
-        else:
-            mk_valid.append(mk)
+        available_mk.extend(index.peminatan_semester(peminatan, semester))
+    
+    # Transkrip: default semua MK wajib semester sebelumnya dianggap lulus
+    mk_sebelumnya = [mk["Kode"] for s in range(1, semester) for mk in index.wajib_semester(s)]
+    mk_lulus = st.multiselect("Mata kuliah yang sudah lulus:", index.all_codes, default=mk_sebelumnya,
+                              key=f"krs_lulus_{semester}")
+    
+    # Cek prasyarat untuk setiap MK (bitset, di-cache per transkrip)
+    valid_codes, blocked = load_krs_engine().check([mk["Kode"] for mk in available_mk], mk_lulus)
+    valid_codes = set(valid_codes)
+    mk_valid = [mk for mk in available_mk if mk["Kode"] in valid_codes]
+    mk_invalid = [mk for mk in available_mk if mk["Kode"] in blocked]
+    
+    if mk_invalid:
+        with st.expander(f"⛔ {len(mk_invalid)} MK belum memenuhi prasyarat"):
+            for mk in mk_invalid:
+                st.write(f"{mk['Kode']} - {mk['Nama']}: perlu {', '.join(blocked[mk['Kode']])}")
     
     # Tampilkan MK yang bisa diambil
     selected_mk = []
@@ -570,26 +590,46 @@ def show_simulasi_krs(mk_wajib, peminatan_data, prasyarat_data):
     if selected_mk:
         st.write(f"**Total SKS yang diambil:** {total_sks} SKS")
         
-        if total_sks < 18:
-            st.warning("⚠️ Total SKS kurang dari 18 (minimum rekomendasi)")
-        elif total_sks > 24:
-            st.error("❌ Total SKS melebihi 24 (maksimum yang diizinkan)")
+        if total_sks < SKS_MIN:
+            st.warning(f"⚠️ Total SKS kurang dari {SKS_MIN} (minimum rekomendasi)")
+        elif total_sks > SKS_MAX:
+            st.error(f"❌ Total SKS melebihi {SKS_MAX} (maksimum yang diizinkan)")
         else:
             st.success("✅ KRS valid!")
         
-        # Tampilkan jadwal contoh
-        st.markdown("### 🗓️ Contoh Jadwal Perkuliahan")
+        # Jadwal dari timetable semester ganjil/genap (bebas bentrok, di-cache per penawaran)
+        st.markdown("### 🗓️ Jadwal Perkuliahan")
         
-        jadwal_data = {
-            "Hari": ["Senin", "Selasa", "Rabu", "Kamis", "Jumat"],
-            "Pukul 08:00-10:00": [mk[0]["Nama"] if len(mk) > 0 else "-" for mk in [selected_mk[:1], selected_mk[1:2], selected_mk[2:3], selected_mk[3:4], selected_mk[4:5]]],
-            "Pukul 10:00-12:00": [mk[0]["Nama"] if len(mk) > 0 else "-" for mk in [selected_mk[5:6], selected_mk[6:7], selected_mk[7:8], selected_mk[8:9], selected_mk[9:10]]],
-            "Pukul 13:00-15:00": ["Praktikum" if i < len(selected_mk) else "-" for i in range(5)]
-        }
+        timetable = load_jadwal(semester % 2)
+        selected_codes = {mk["Kode"] for mk in selected_mk}
+        rows = [row for row in timetable["rows"] if row["Kode"] in selected_codes]
+        if timetable["bentrok"]:
+            st.warning(f"⚠️ Jadwal masih memiliki {timetable['bentrok']} bentrok (slot/ruang tidak cukup)")
         
-        df_jadwal = pd.DataFrame(jadwal_data)
+        df_jadwal = pd.DataFrame(rows, columns=["Kode", "Kelas", "Hari", "Pukul", "Ruang"])
+        df_jadwal["MK"] = df_jadwal["Kode"] + " (" + df_jadwal["Ruang"] + ")"
+        df_jadwal = (df_jadwal.pivot_table(index="Hari", columns="Pukul", values="MK", aggfunc=", ".join)
+                     .reindex(index=DAYS, columns=SLOTS).fillna("-")
+                     .rename_axis(columns=None).reset_index()) if rows else pd.DataFrame({"Hari": DAYS})
         st.dataframe(df_jadwal, use_container_width=True, hide_index=True)
     
+    # Rencana studi sampai semester 8 dari transkrip saat ini
+    st.markdown("### 🧭 Rencana Studi Otomatis")
+    mbkm_semesters = st.multiselect("Semester yang dicadangkan untuk MBKM:", list(range(max(semester, 5), 9)),
+                                    default=[semester] if mbkm_plan and semester >= 5 else [],
+                                    key=f"krs_mbkm_{semester}_{mbkm_plan}")
+    plan = load_study_planner().plan(mk_lulus, peminatan, semester, mbkm_semesters)
+    if plan is None:
+        st.error("❌ Sisa MK tidak dapat diselesaikan sampai semester 8 dengan batas "
+                 f"{SKS_MAX} SKS per semester dan prasyarat yang ada.")
+    else:
+        st.dataframe(pd.DataFrame([{
+            "Semester": p["Semester"],
+            "Mata Kuliah": ", ".join(p["MK"]) or "-",
+            "SKS": p["SKS"],
+            "MBKM": "✓" if p["MBKM"] else ""
+        } for p in plan]), use_container_width=True, hide_index=True)
+    
     # Opsi MBKM
     if mbkm_plan and semester >= 5:
         st.markdown('<div class="mbkm-badge">OPTION MBKM</div>', unsafe_allow_html=True)
@@ -599,6 +639,7 @@ def show_simulasi_krs(mk_wajib, peminatan_data, prasyarat_data):
 def main():
     # Load data
     pl_data, cpl_data, mk_wajib, peminatan_data, prasyarat_data = load_data()
+    index = load_curriculum_index()
     
     # Routing berdasarkan menu
     if menu == "Dashboard":
@@ -608,35 +649,78 @@ def main():
         show_profil_lulusan(pl_data)
     
     elif menu == "Struktur Kurikulum":
-        show_struktur_kurikulum(mk_wajib, peminatan_data)
+        show_struktur_kurikulum(index, peminatan_data)
     
     elif menu == "Prasyarat MK":
-        show_prasyarat(prasyarat_data, mk_wajib)
+        show_prasyarat(prasyarat_data, index)
     
     elif menu == "MBKM":
         show_mbkm()
     
     elif menu == "Simulasi KRS":
-        show_simulasi_krs(mk_wajib, peminatan_data, prasyarat_data)
+        show_simulasi_krs(index, peminatan_data, prasyarat_data)
     
     elif menu == "Evaluasi OBE":
         st.markdown('<h1 class="main-header">📈 Evaluasi Pencapaian OBE</h1>', unsafe_allow_html=True)
         
-        # Upload data mahasiswa (contoh)
-        uploaded_file = st.file_uploader("Upload Data Nilai Mahasiswa (CSV)", type="csv")
+        # Upload data nilai mahasiswa
+        st.caption("Format: NIM, Kode, Nilai (satu baris per MK) atau NIM + satu kolom per kode MK. "
+                   "Nilai berupa angka 0-100 atau huruf A-E; kolom Angkatan dan Semester opsional. "
+                   "Upload ulang mengganti nilai MK pada semester yang sama; tanpa Semester, "
+                   "nilai digabung per NIM.")
+        uploaded_file = st.file_uploader("Upload Data Nilai Mahasiswa (CSV/Excel)", type=["csv", "xlsx"])
         
+        engine = load_attainment_engine()
+        store = load_grade_store()
         if uploaded_file:
-            df = pd.read_csv(uploaded_file)
-            st.write("### Data Nilai Mahasiswa")
-            st.dataframe(df.head())
+            # Upload baru disimpan sekali ke gudang nilai; rerun berikutnya hanya membaca gudang
+            hasil = st.session_state.get("evaluasi_nilai")
+            if hasil is None or hasil[0] != uploaded_file.file_id:
+                bar = st.progress(0.0, text="Membaca data nilai...")
+                
+                def report(fraction, rows):
+                    bar.progress(fraction or 0.0, text=f"Membaca data nilai... {rows:,} baris")
+                
+                try:
+                    grades = ingest_grades(uploaded_file, engine, uploaded_file.name, progress=report, store=store)
+                except (ValueError, pd.errors.ParserError) as e:
+                    bar.empty()
+                    st.error(str(e))
+                    st.stop()
+                bar.empty()
+                hasil = (uploaded_file.file_id, grades.preview, grades.rows, grades.rejected,
+                         sorted(grades.unknown_courses), len(grades.nims))
+                st.session_state["evaluasi_nilai"] = hasil
+            _, preview, rows, rejected, unknown, students = hasil
             
-            # Analisis pencapaian CPL
+            st.write("### Data Nilai Mahasiswa")
+            st.dataframe(preview)
+            st.caption(f"{rows:,} nilai dibaca untuk {students:,} mahasiswa; "
+                       f"{rejected:,} baris tidak valid dilewati.")
+            if unknown:
+                st.warning(f"{len(unknown)} kode MK tidak ada di kurikulum dan diabaikan: {', '.join(unknown[:10])}")
+        
+        if store.version() is None:
+            st.info("Belum ada data nilai tersimpan. Upload file nilai untuk memulai analisis.")
+        else:
+            # Analisis pencapaian CPL (nilai x bobot MK-CPL) dari gudang nilai
             st.write("### 📊 Analisis Pencapaian CPL")
+            tahun = st.selectbox("Tahun Akademik", ["Semua"] + store.years())
+            attainment, cohorts = load_store_attainment(store.version(), None if tahun == "Semua" else tahun)
+            if attainment.empty:
+                st.warning("Tidak ada nilai untuk MK yang terdaftar di kurikulum.")
+                st.stop()
             
-            # Contoh visualisasi
-            cpl_labels = ["S1", "S2", "S3", "S4", "P1", "P2", "P3", "P4", 
-                         "KU1", "KU2", "KU3", "KU4", "KK1", "KK2", "KK3", "KK4", "KK5"]
-            cpl_values = [85, 90, 88, 82, 78, 85, 80, 75, 88, 90, 85, 82, 80, 78, 85, 82, 80]
+            summary = cohort_summary(attainment, cohorts)
+            angkatan = sorted(summary["Angkatan"].unique())
+            pilihan = st.selectbox("Angkatan", ["Semua"] + angkatan)
+            
+            if pilihan == "Semua":
+                cpl_values = attainment.mean()
+            else:
+                cpl_values = summary[summary["Angkatan"] == pilihan].set_index("CPL")["Rata-rata"]
+            cpl_labels = [cpl for cpl in engine.cpls if pd.notna(cpl_values.get(cpl))]
+            cpl_values = [round(cpl_values[cpl], 1) for cpl in cpl_labels]
             
             fig = go.Figure(data=[go.Bar(
                 x=cpl_labels,
@@ -647,13 +731,21 @@ def main():
             )])
             
             fig.update_layout(
-                title="Persentase Pencapaian CPL",
+                title="Rata-rata Pencapaian CPL",
                 xaxis_title="Capaian Pembelajaran Lulusan",
-                yaxis_title="Persentase Pencapaian (%)",
+                yaxis_title="Pencapaian (0-100)",
                 yaxis_range=[0, 100]
             )
             
             st.plotly_chart(fig, use_container_width=True)
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write(f"#### Ringkasan per Angkatan (tercapai ≥ {PASSING_ATTAINMENT:.0f})")
+                st.dataframe(summary.round(1), hide_index=True)
+            with col2:
+                st.write("#### Capaian per Mahasiswa")
+                st.dataframe(attainment.round(1))
     
     elif menu == "Export Data":
         st.markdown('<h1 class="main-header">📤 Export Data Kurikulum</h1>', unsafe_allow_html=True)
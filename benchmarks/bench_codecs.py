@@ -0,0 +1,39 @@
+"""Benchmark codec file data: waktu encode/decode dan ukuran (serializer.py).
+
+Jalankan dari root repo:  python -m benchmarks.bench_codecs [jumlah_mk]
+"""
+import sys
+import time
+
+from benchmarks.synthetic import synthetic_curriculum
+from serializer import JsonCodec, MsgpackCodec, msgpack, orjson
+
+
+def timed(func, repeat=5):
+    """Waktu terbaik (ms) dari beberapa kali pemanggilan"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+
+def main(n_mk=5000):
+    data = synthetic_curriculum(n_mk)
+    codecs = [JsonCodec(compact=False, fast=False), JsonCodec(compact=True, fast=False)]
+    if orjson is not None:
+        codecs += [JsonCodec(compact=False, fast=True), JsonCodec(compact=True, fast=True)]
+    if msgpack is not None:
+        codecs.append(MsgpackCodec())
+
+    print(f"{'Codec':<16} {'Encode (ms)':>12} {'Decode (ms)':>12} {'Ukuran (KB)':>12}")
+    for codec in codecs:
+        payload, encode_ms = timed(lambda: codec.dumps(data))
+        decoded, decode_ms = timed(lambda: codec.loads(payload))
+        assert decoded == data, f"{codec.name}: hasil decode berbeda"
+        print(f"{codec.name:<16} {encode_ms:>12.1f} {decode_ms:>12.1f} {len(payload) / 1024:>12.1f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
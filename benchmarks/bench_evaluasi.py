@@ -0,0 +1,94 @@
+"""Benchmark capaian CPL (evaluasi.AttainmentEngine).
+
+Jalankan dari root repo:  python -m benchmarks.bench_evaluasi [jumlah_mahasiswa]
+"""
+import io
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_curriculum
+from curriculum import CurriculumIndex
+from evaluasi import (AttainmentEngine, CplAggregates, batch_contribution, cohort_summary, grades_long, ingest_grades,
+                      store_attainment)
+from nilai_store import GradeStore
+
+
+def main(n_students=20000, n_courses=150, courses_per_student=40, seed=11):
+    data = synthetic_curriculum(n_courses)
+    index = CurriculumIndex(data['mk_wajib'], data['peminatan_data'])
+    rng = np.random.default_rng(seed)
+    codes = np.array(list(index.by_kode))
+    nims = np.array([f"{2020 + i % 5}{i:06d}" for i in range(n_students)])
+    raw = pd.DataFrame({
+        'NIM': np.repeat(nims, courses_per_student),
+        'Kode': codes[rng.integers(0, len(codes), n_students * courses_per_student)],
+        'Nilai': rng.integers(40, 101, n_students * courses_per_student),
+    })
+
+    start = time.perf_counter()
+    engine = AttainmentEngine(index)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    grades = grades_long(raw)
+    normalize_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, matrix = engine.pivot(grades)
+    pivot_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine.attainment_matrix(matrix)
+    matmul_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    summary = cohort_summary(engine.attainment(grades))
+    total_s = time.perf_counter() - start
+
+    print(f"Mahasiswa: {n_students}, MK: {len(engine.courses)}, CPL: {len(engine.cpls)}, nilai: {len(grades)}")
+    print(f"Bobot MK x CPL: {build_s * 1000:.1f} ms, normalisasi: {normalize_s:.2f} s, "
+          f"pivot: {pivot_s:.2f} s, perkalian matriks: {matmul_s * 1000:.1f} ms")
+    print(f"Pivot + capaian + ringkasan angkatan: {total_s:.2f} s ({len(summary)} baris ringkasan)")
+
+    # Jalur upload: file CSV dibaca bertahap per potongan
+    payload = raw.to_csv(index=False).encode('utf-8')
+    chunks = []
+    start = time.perf_counter()
+    accumulator = ingest_grades(io.BytesIO(payload), engine, 'nilai.csv', chunksize=100000,
+                                progress=lambda fraction, rows: chunks.append(rows))
+    accumulator.attainment()
+    stream_s = time.perf_counter() - start
+    print(f"Streaming CSV {len(payload) / 1e6:.0f} MB dalam {len(chunks)} potongan: {stream_s:.2f} s")
+
+    # Agregat materialized: satu batch per MK, lalu ganti satu batch
+    start = time.perf_counter()
+    records = [batch_contribution(engine, kode, '2024/2025 Ganjil', batch)
+               for kode, batch in grades.groupby('Kode', sort=False)]
+    aggregates = CplAggregates(records)
+    build_s = time.perf_counter() - start
+    kode, batch = next(iter(grades.groupby('Kode', sort=False)))
+    start = time.perf_counter()
+    touched = aggregates.apply(batch_contribution(engine, kode, '2024/2025 Ganjil', batch.iloc[::2]))
+    replace_s = time.perf_counter() - start
+    print(f"Agregat {len(records)} batch: {build_s:.2f} s; ganti 1 batch: {replace_s * 1000:.1f} ms "
+          f"({len(touched)} dari {len(aggregates.totals)} baris agregat)")
+
+    # Gudang nilai kolumnar: simpan sekali, rerun hanya membaca partisi lewat memory map
+    with tempfile.TemporaryDirectory() as root:
+        store = GradeStore(root)
+        start = time.perf_counter()
+        ingest_grades(io.BytesIO(payload), engine, 'nilai.csv', chunksize=100000, store=store)
+        write_s = time.perf_counter() - start
+        start = time.perf_counter()
+        store_attainment(engine, store)
+        read_s = time.perf_counter() - start
+        print(f"Gudang nilai ({store.format}, {len(store.partitions())} partisi): streaming + simpan {write_s:.2f} s, "
+              f"capaian dari gudang {read_s:.2f} s")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,43 @@
+"""Benchmark validasi KRS massal (krs.validate_krs_batch).
+
+Jalankan dari root repo:  python -m benchmarks.bench_krs [jumlah_mahasiswa]
+"""
+import io
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_curriculum, synthetic_krs
+from curriculum import CurriculumIndex
+from krs import iter_report_csv, read_krs_csv, read_transcript_csv, validate_krs_batch
+
+
+def main(n_students=5000):
+    # Katalog seukuran prodi (50 MK per semester) agar transkrip realistis
+    data = synthetic_curriculum(400)
+    krs_rows, transcript_rows = synthetic_krs(data, n_students)
+    index = CurriculumIndex(data['mk_wajib'], data['peminatan_data'])
+    krs_csv = pd.DataFrame(krs_rows).to_csv(index=False)
+    transcript_csv = pd.DataFrame(transcript_rows).to_csv(index=False)
+
+    start = time.perf_counter()
+    krs = read_krs_csv(io.StringIO(krs_csv))
+    transcripts = read_transcript_csv(io.StringIO(transcript_csv))
+    read_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    report = validate_krs_batch(krs, transcripts, index, data['prasyarat_data'])
+    validate_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    size = sum(len(part) for part in iter_report_csv(report))
+    report_s = time.perf_counter() - start
+
+    print(f"Baris KRS: {len(krs)}, transkrip: {len(transcripts)}, pelanggaran: {len(report)}")
+    print(f"Baca CSV: {read_s:.2f} s, validasi: {validate_s:.2f} s, laporan ({size / 1024:.0f} KB): {report_s:.2f} s")
+    print(report['Jenis'].value_counts().to_string())
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,52 @@
+"""Benchmark memori load_collection: dict yang dibekukan vs model __slots__ (models.py).
+
+Kedua sisi dibangun dari teks JSON yang sama dan hanya hasil akhirnya yang
+diukur (dict sementara hasil json.loads sudah dilepas), jadi string yang
+dipegang model ikut terhitung.
+
+Jalankan dari root repo:  python -m benchmarks.bench_models [jumlah_mk]
+"""
+import gc
+import json
+import sys
+import tracemalloc
+
+from benchmarks.synthetic import synthetic_curriculum
+from models import COLLECTION_MODELS, to_records
+from snapshot import freeze
+
+
+def measure(build):
+    """Alokasi bersih (byte) untuk objek hasil build()"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def main(n_mk=5000):
+    data = synthetic_curriculum(n_mk)
+    print(f"{'Koleksi':<12} {'Record':>8} {'Dict beku (KB)':>15} {'Model (KB)':>11} {'Hemat':>7}")
+
+    for key, model in COLLECTION_MODELS.items():
+        rows = data[key]
+        if not rows:
+            continue
+        raw = json.dumps(rows)
+        frozen, frozen_bytes = measure(lambda: freeze(json.loads(raw)))
+        models, model_bytes = measure(lambda: tuple(model.from_dict(row) for row in json.loads(raw)))
+
+        # Konversi harus lossless dan model harus setara dengan dict aslinya
+        assert to_records(models) == json.loads(raw), f"{key}: konversi tidak lossless"
+        assert all(m == f for m, f in zip(models, frozen)), f"{key}: isi Mapping berbeda"
+
+        # Negatif = model lebih boros (koleksi kecil: overhead kelas/intern lebih besar dari hematnya)
+        saving = 1 - model_bytes / frozen_bytes if frozen_bytes else 0
+        print(f"{key:<12} {len(rows):>8} {frozen_bytes / 1024:>15.1f} {model_bytes / 1024:>11.1f} {saving:>7.0%}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,96 @@
+"""Generator kurikulum sintetis berukuran besar untuk benchmark"""
+import random
+
+CPL_CODES = [f"S{i}" for i in range(1, 5)] + [f"P{i}" for i in range(1, 5)] + \
+            [f"KU{i}" for i in range(1, 5)] + [f"KK{i}" for i in range(1, 6)]
+JENIS = ["Teori", "Praktikum", "Teori+Praktikum", "Praktisi", "Project"]
+PEMINATAN = ["Software Engineering", "Data Science", "Artificial Intelligence", "Cybersecurity"]
+
+
+def synthetic_curriculum(n_mk=3000, n_cpmk_per_mk=3, seed=42):
+    """Data dengan skema yang sama seperti data/*.json (peminatan berbentuk dict)"""
+    rng = random.Random(seed)
+
+    mk_wajib = []
+    for i in range(n_mk):
+        semester = i * 8 // n_mk + 1
+        earlier = [mk["Kode"] for mk in mk_wajib[-200:] if mk["Semester"] < semester]
+        mk_wajib.append({
+            "Kode": f"MK{i:05d}",
+            "Nama": f"Mata Kuliah Sintetis {i}",
+            "SKS": rng.choice([2, 3, 3, 4]),
+            "Semester": semester,
+            "Jenis": rng.choice(JENIS),
+            "CPL": ",".join(rng.sample(CPL_CODES, rng.randint(1, 3))),
+            "Prasyarat": ",".join(rng.sample(earlier, min(len(earlier), rng.randint(0, 2))))
+        })
+
+    peminatan_data = {p: [] for p in PEMINATAN}
+    for i in range(n_mk // 10):
+        peminatan = PEMINATAN[i % len(PEMINATAN)]
+        peminatan_data[peminatan].append({
+            "Kode": f"PM{i:04d}",
+            "Nama": f"Peminatan Sintetis {i}",
+            "SKS": 3,
+            "Semester": rng.randint(5, 8),
+            "CPL": ",".join(rng.sample(CPL_CODES, 2)),
+            "Prasyarat": rng.choice(mk_wajib)["Kode"]
+        })
+
+    cpl_data = [
+        {"id": code, "domain": "Keterampilan Khusus", "kode": code, "deskripsi": f"Deskripsi {code}"}
+        for code in CPL_CODES
+    ]
+    cpmk_data = [
+        {
+            "id": f"c{i:05d}{j}",
+            "mk_kode": mk["Kode"],
+            "kode": f"CPMK{j + 1}",
+            "deskripsi": f"Capaian pembelajaran {j + 1} untuk {mk['Nama']}",
+            "cpl_terkait": mk["CPL"].split(",")
+        }
+        for i, mk in enumerate(mk_wajib)
+        for j in range(n_cpmk_per_mk)
+    ]
+    bk_data = [
+        {"id": f"bk{i}", "kode": f"BK{i}", "nama": f"Bahan Kajian {i}", "deskripsi": "Deskripsi bahan kajian"}
+        for i in range(n_mk // 5)
+    ]
+    prasyarat_data = {
+        mk["Kode"]: mk["Prasyarat"].split(",")
+        for mk in mk_wajib if mk["Prasyarat"]
+    }
+
+    return {
+        'pl_data': [],
+        'cpl_data': cpl_data,
+        'mk_wajib': mk_wajib,
+        'peminatan_data': peminatan_data,
+        'prasyarat_data': prasyarat_data,
+        'mbkm_data': [],
+        'bk_data': bk_data,
+        'cpmk_data': cpmk_data
+    }
+
+
+def synthetic_krs(data, n_students=5000, courses_per_student=7, seed=7):
+    """Rencana KRS (NIM, Kode, Semester, Peminatan) dan transkrip (NIM, Kode) sintetis"""
+    rng = random.Random(seed)
+    mk_wajib = data['mk_wajib']
+    peminatan_codes = {p: [mk["Kode"] for mk in rows] for p, rows in data['peminatan_data'].items()}
+    by_semester = {}
+    for mk in mk_wajib:
+        by_semester.setdefault(mk["Semester"], []).append(mk["Kode"])
+
+    krs, transcripts = [], []
+    for s in range(n_students):
+        nim = f"2025{s:06d}"
+        semester = rng.randint(1, 8)
+        peminatan = rng.choice(PEMINATAN)
+        for sem in range(1, semester):
+            # Sebagian besar MK semester sebelumnya lulus
+            transcripts.extend({"NIM": nim, "Kode": kode} for kode in by_semester[sem] if rng.random() < 0.9)
+        pool = by_semester[semester] + (peminatan_codes[peminatan] if semester >= 5 else [])
+        for kode in rng.sample(pool, min(len(pool), courses_per_student)):
+            krs.append({"NIM": nim, "Kode": kode, "Semester": semester, "Peminatan": peminatan})
+    return krs, transcripts
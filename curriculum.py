@@ -0,0 +1,82 @@
+"""Index in-memory untuk data kurikulum (dibangun sekali per versi data)"""
+from models import parse_codes
+
+
+def as_semester(value):
+    """Normalisasi nilai semester (int/str/float dari data editor) ke int"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class CurriculumIndex:
+    """Hash index MK per Kode, semester, CPL, peminatan dan MK -> CPMK.
+
+    Objek ini dibagi antar sesi (st.cache_resource), jadi list yang
+    dikembalikan tidak boleh diubah oleh pemanggil.
+    """
+
+    def __init__(self, mk_wajib, peminatan_data=None, cpmk_data=None):
+        self.by_kode = {}
+        self.by_semester = {}
+        self.by_cpl = {}
+        self.by_peminatan = {}
+        self.by_peminatan_semester = {}
+        self.peminatan_of = {}
+        self.cpmk_by_mk = {}
+        self.wajib_codes = []
+        self.all_codes = []
+
+        for mk in mk_wajib or []:
+            kode = mk.get('Kode')
+            if not kode:
+                continue
+            self._add_mk(mk)
+            self.wajib_codes.append(kode)
+            self.by_semester.setdefault(as_semester(mk.get('Semester')), []).append(mk)
+
+        for peminatan, mk_list in (peminatan_data or {}).items():
+            self.by_peminatan[peminatan] = mk_list
+            for mk in mk_list:
+                kode = mk.get('Kode')
+                if not kode:
+                    continue
+                if kode not in self.by_kode:
+                    self._add_mk(mk)
+                self.peminatan_of.setdefault(kode, []).append(peminatan)
+                key = (peminatan, as_semester(mk.get('Semester')))
+                self.by_peminatan_semester.setdefault(key, []).append(mk)
+
+        for cpmk in cpmk_data or []:
+            self.cpmk_by_mk.setdefault(cpmk.get('mk_kode'), []).append(cpmk)
+
+    def _add_mk(self, mk):
+        kode = mk['Kode']
+        self.by_kode[kode] = mk
+        self.all_codes.append(kode)
+        for cpl in parse_codes(mk.get('CPL')):
+            self.by_cpl.setdefault(cpl, []).append(mk)
+
+    def get(self, kode):
+        return self.by_kode.get(kode)
+
+    def wajib_semester(self, semester):
+        """MK wajib pada satu semester"""
+        return self.by_semester.get(as_semester(semester), [])
+
+    def peminatan_semester(self, peminatan, semester):
+        """MK suatu peminatan pada satu semester"""
+        return self.by_peminatan_semester.get((peminatan, as_semester(semester)), [])
+
+    def mk_for_cpl(self, cpl):
+        """MK yang mendukung kode CPL tertentu"""
+        return self.by_cpl.get(cpl, [])
+
+    def cpmk_for(self, kode):
+        """CPMK milik satu MK"""
+        return self.cpmk_by_mk.get(kode, [])
+
+    def sks(self, kode):
+        mk = self.by_kode.get(kode)
+        return mk.get('SKS', 0) if mk else 0
@@ -0,0 +1,73 @@
+"""Analisis dampak perubahan kurikulum (hapus MK atau pindah semester).
+
+Memakai bitset turunan dari prasyarat.ReachabilityIndex yang sudah
+di-cache per versi graph, jadi satu query hanya berupa operasi bit dan
+pencarian di CurriculumIndex.
+"""
+from curriculum import as_semester
+from models import parse_codes
+
+HAPUS = 'hapus'
+PINDAH = 'pindah'
+
+
+def semester_of(index, kode):
+    mk = index.get(kode)
+    return as_semester(mk.get('Semester')) if mk else None
+
+
+def analyze_impact(index, reach, kode, aksi=HAPUS, semester_baru=None):
+    """Dampak menghapus MK (aksi='hapus') atau memindahkannya ke semester_baru (aksi='pindah').
+
+    Mengembalikan dict:
+    - turunan: semua MK yang (langsung/tidak langsung) membutuhkan MK ini
+    - turunan_langsung: MK yang mencantumkan MK ini sebagai prasyarat langsung
+    - peminatan: peminatan yang memuat MK ini atau salah satu turunannya
+    - pelanggaran_semester: relasi prasyarat yang urutan semesternya menjadi salah (aksi pindah)
+    - cpl_terdampak: CPL yang didukung MK ini atau turunannya
+    - cpl_hilang: CPL yang tidak lagi didukung MK mana pun (aksi hapus)
+    """
+    turunan = reach.dependents(kode)
+    langsung = [code for code in turunan if reach.is_direct_prerequisite(kode, code)]
+
+    peminatan = set(index.peminatan_of.get(kode, ()))
+    for code in turunan:
+        peminatan.update(index.peminatan_of.get(code, ()))
+
+    cpl_terdampak = {}
+    for code in [kode] + turunan:
+        mk = index.get(code)
+        for cpl in parse_codes(mk.get('CPL')) if mk else ():
+            cpl_terdampak.setdefault(cpl, []).append(code)
+
+    cpl_hilang = []
+    if aksi == HAPUS:
+        mk = index.get(kode)
+        for cpl in parse_codes(mk.get('CPL')) if mk else ():
+            if all(other.get('Kode') == kode for other in index.mk_for_cpl(cpl)):
+                cpl_hilang.append(cpl)
+
+    pelanggaran = []
+    if aksi == PINDAH and semester_baru is not None:
+        semester_baru = as_semester(semester_baru)
+        for code in reach.all_prerequisites(kode):
+            semester = semester_of(index, code)
+            if semester is not None and semester >= semester_baru:
+                pelanggaran.append({"Kode": code, "Semester": semester, "Relasi": f"prasyarat dari {kode}"})
+        for code in turunan:
+            semester = semester_of(index, code)
+            if semester is not None and semester <= semester_baru:
+                pelanggaran.append({"Kode": code, "Semester": semester, "Relasi": f"membutuhkan {kode}"})
+
+    return {
+        "kode": kode,
+        "aksi": aksi,
+        "semester_lama": semester_of(index, kode),
+        "semester_baru": semester_baru,
+        "turunan": turunan,
+        "turunan_langsung": langsung,
+        "peminatan": sorted(peminatan),
+        "pelanggaran_semester": pelanggaran,
+        "cpl_terdampak": {cpl: codes for cpl, codes in sorted(cpl_terdampak.items())},
+        "cpl_hilang": sorted(cpl_hilang),
+    }
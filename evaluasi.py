@@ -0,0 +1,553 @@
+"""Mesin capaian CPL: nilai mahasiswa x bobot MK-CPL dalam satu perkalian matriks.
+
+Bobot MK x CPL dibangun dari kolom CPL MK wajib dan MK peminatan.
+Nilai dipivot menjadi matriks mahasiswa x MK (NaN = belum mengambil),
+lalu capaian CPL setiap mahasiswa adalah rata-rata nilai MK pendukung
+CPL tersebut yang sudah diambil, berbobot sesuai matriks.
+"""
+import contextlib
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from models import cpl_code, parse_codes
+
+GRADE_EXTRA_COLUMNS = ('Angkatan', 'Semester')
+CHUNK_ROWS = int(os.environ.get('OBE_CHUNK_ROWS', '100000'))  # baris per potongan saat membaca file besar
+PASSING_ATTAINMENT = 70.0  # capaian minimum (skala 0-100) agar CPL dianggap tercapai
+
+# Nilai huruf -> skala 0-100 (bobot 4.0 = 100)
+LETTER_SCORES = {
+    'A': 4.0, 'A-': 3.75, 'AB': 3.5, 'B+': 3.25, 'B': 3.0, 'B-': 2.75,
+    'BC': 2.5, 'C+': 2.25, 'C': 2.0, 'CD': 1.5, 'D': 1.0, 'E': 0.0,
+}
+
+_CPL_ORDER = {'S': 0, 'P': 1, 'KU': 2, 'KK': 3}
+
+
+def cpl_sort_key(code):
+    """S1..S4, P1.., KU1.., KK1.. (urutan domain seperti di dokumen kurikulum)"""
+    match = re.match(r'([A-Za-z]+)(\d*)', code)
+    prefix, number = (match.group(1), match.group(2)) if match else (code, '')
+    return _CPL_ORDER.get(prefix.upper(), len(_CPL_ORDER)), prefix, int(number or 0), code
+
+
+def to_scores(values):
+    """Kolom nilai (angka 0-100 atau huruf A..E) -> float 0-100, NaN jika tidak dikenal"""
+    numeric = pd.to_numeric(values, errors='coerce').astype(float)
+    other = numeric.isna() & values.notna()
+    if other.any():
+        letters = values[other].astype(str).str.strip().str.upper().map(LETTER_SCORES) * 25
+        numeric[other] = letters.astype(float)
+    return numeric
+
+
+def _long_form(df):
+    """CSV/sheet nilai -> format panjang NIM, Kode, Nilai (+ Angkatan, Semester jika ada), belum disaring"""
+    df = df.rename(columns=lambda c: str(c).strip())
+    if 'NIM' not in df.columns:
+        raise ValueError("Kolom NIM tidak ditemukan")
+    extra = [c for c in GRADE_EXTRA_COLUMNS if c in df.columns]
+    if {'Kode', 'Nilai'} <= set(df.columns):
+        long = df[['NIM', 'Kode', 'Nilai'] + extra]
+    else:
+        id_vars = ['NIM'] + extra
+        long = df.drop(columns=[c for c in ('Nama',) if c in df.columns]).melt(
+            id_vars=id_vars, var_name='Kode', value_name='Nilai')
+        long = long[long['Nilai'].notna()]  # sel kosong = MK belum diambil, bukan data rusak
+    nim = long['NIM'].astype('string').str.strip()
+    kode = long['Kode'].astype('string').str.strip()
+    columns = {'NIM': nim, 'Kode': kode, 'Nilai': to_scores(long['Nilai'])}
+    for column in extra:
+        columns[column] = long[column].astype('string').str.strip()
+    return pd.DataFrame(columns)
+
+
+def _valid_rows(long):
+    return (long['NIM'].fillna('') != '') & (long['Kode'].fillna('') != '') & long['Nilai'].between(0, 100)
+
+
+def grades_long(df):
+    """Normalisasi CSV nilai ke format panjang NIM, Kode, Nilai.
+
+    Menerima format panjang (NIM, Kode, Nilai) atau lebar (NIM + satu kolom per Kode MK);
+    kolom Angkatan dan Semester ikut dibawa. Baris tanpa NIM/Kode atau nilai di luar 0-100 dibuang.
+    """
+    long = _long_form(df)
+    return long[_valid_rows(long)].reset_index(drop=True)
+
+
+def weighted_mean(matrix, weights):
+    """Rata-rata berbobot per kolom bobot, mengabaikan sel NaN (belum dinilai).
+
+    Pembilang (nilai x bobot) dan penyebut (sel terisi x bobot) dihitung
+    bersama dalam satu perkalian matriks dengan menumpuk kedua baris.
+    """
+    taken = ~np.isnan(matrix)
+    stacked = np.vstack([np.where(taken, matrix, 0.0), taken.astype(np.float64)])
+    product = np.asarray(stacked @ weights)
+    n = len(matrix)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return product[:n] / product[n:]
+
+
+class AttainmentEngine:
+    """Matriks bobot MK x CPL, dibangun sekali per versi data kurikulum (read-only)"""
+
+    def __init__(self, index, cpl_codes=None):
+        self.courses = list(index.by_kode)
+        linked = {cpl for mk in index.by_kode.values() for cpl in parse_codes(mk.get('CPL'))}
+        self.cpls = list(cpl_codes) if cpl_codes else sorted(linked, key=cpl_sort_key)
+        self.course_pos = {kode: i for i, kode in enumerate(self.courses)}
+        cpl_pos = {cpl: j for j, cpl in enumerate(self.cpls)}
+
+        self.weights = np.zeros((len(self.courses), len(self.cpls)), dtype=np.float64)
+        for i, mk in enumerate(index.by_kode.values()):
+            for cpl in parse_codes(mk.get('CPL')):
+                j = cpl_pos.get(cpl)
+                if j is not None:
+                    self.weights[i, j] = 1.0
+
+    def pivot(self, grades):
+        """Format panjang -> (nims, matriks nilai mahasiswa x MK, NaN jika belum diambil).
+
+        Nilai ganda (mengulang) diambil yang tertinggi; MK di luar kurikulum diabaikan.
+        """
+        known = grades[grades['Kode'].isin(self.course_pos)]
+        nim_codes, nims = pd.factorize(known['NIM'], sort=True)
+        course_idx = known['Kode'].map(self.course_pos).to_numpy()
+        matrix = np.full((len(nims), len(self.courses)), np.nan)
+        # Urutkan naik agar penulisan terakhir (nilai tertinggi) yang tersisa
+        order = np.argsort(known['Nilai'].to_numpy(), kind='stable')
+        matrix[nim_codes[order], course_idx[order]] = known['Nilai'].to_numpy()[order]
+        return list(nims), matrix
+
+    def attainment_matrix(self, matrix):
+        """Capaian mahasiswa x CPL (0-100, NaN jika belum ada MK pendukung yang diambil)"""
+        return weighted_mean(matrix, self.weights)
+
+    def attainment(self, grades):
+        """DataFrame capaian per mahasiswa (index NIM, kolom CPL)"""
+        nims, matrix = self.pivot(grades)
+        return pd.DataFrame(self.attainment_matrix(matrix), index=pd.Index(nims, name='NIM'),
+                            columns=self.cpls)
+
+
+def cohort_summary(attainment, cohorts=None, passing=PASSING_ATTAINMENT):
+    """Rata-rata capaian dan persentase mahasiswa yang mencapai CPL per angkatan.
+
+    cohorts: Series NIM -> angkatan; default 4 digit pertama NIM.
+    """
+    if cohorts is None:
+        cohorts = pd.Series(attainment.index.str[:4], index=attainment.index)
+    keys = cohorts.reindex(attainment.index).fillna('-').astype(str).to_numpy()
+    mean = attainment.groupby(keys).mean().stack().rename('Rata-rata')
+    reached = (attainment >= passing).where(attainment.notna()).astype(float)
+    share = reached.groupby(keys).mean().stack().rename('% Tercapai') * 100
+    summary = pd.concat([mean, share], axis=1).reset_index()
+    summary.columns = ['Angkatan', 'CPL', 'Rata-rata', '% Tercapai']
+    return summary.dropna(subset=['Rata-rata']).reset_index(drop=True)
+
+
+# ==================== PEMBACAAN BERTAHAP ====================
+def _source_size(source):
+    """Ukuran file (byte) untuk path, file object atau UploadedFile; None jika tidak diketahui"""
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    if getattr(source, 'size', None) is not None:
+        return source.size
+    try:
+        position = source.tell()
+        source.seek(0, os.SEEK_END)
+        size = source.tell()
+        source.seek(position)
+        return size
+    except (AttributeError, OSError):
+        return None
+
+
+def _is_excel(source, filename):
+    name = filename or getattr(source, 'name', None) or (source if isinstance(source, str) else '')
+    return str(name).lower().endswith(('.xlsx', '.xlsm'))
+
+
+def excel_sheet_names(source):
+    from openpyxl import load_workbook
+    workbook = load_workbook(source, read_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+
+def iter_table_chunks(source, filename=None, chunksize=CHUNK_ROWS, sheet=None):
+    """Baca CSV/Excel per potongan: menghasilkan (DataFrame string, fraksi progres 0-1).
+
+    Memori puncak sebanding chunksize, bukan ukuran file. Excel dibaca dengan
+    openpyxl mode read-only (sheet pertama jika sheet tidak disebut).
+    """
+    if _is_excel(source, filename):
+        yield from _iter_excel_chunks(source, chunksize, sheet)
+        return
+    size = _source_size(source)
+    reader = pd.read_csv(source, dtype=str, chunksize=chunksize, skipinitialspace=True)
+    handle = None if isinstance(source, (str, os.PathLike)) else source
+    with reader:
+        for chunk in reader:
+            if size and handle is not None:
+                fraction = min(handle.tell() / size, 1.0)  # posisi buffer pembaca, cukup untuk progres
+            else:
+                fraction = None
+            yield chunk, fraction
+
+
+def _iter_excel_chunks(source, chunksize, sheet=None):
+    from openpyxl import load_workbook
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+        total = worksheet.max_row or 0
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            yield pd.DataFrame(), 1.0
+            return
+        columns = [str(c).strip() if c is not None else f"Kolom {i + 1}" for i, c in enumerate(header)]
+        batch, done = [], 1
+        for row in rows:
+            batch.append([None if v is None else str(v) for v in row])
+            if len(batch) >= chunksize:
+                done += len(batch)
+                yield pd.DataFrame(batch, columns=columns), min(done / total, 1.0) if total else None
+                batch = []
+        if batch or done == 1:
+            done += len(batch)
+            yield pd.DataFrame(batch, columns=columns), 1.0
+    finally:
+        workbook.close()
+
+
+class GradeAccumulator:
+    """Nilai terbaik per (mahasiswa, MK) yang diisi bertahap per potongan file.
+
+    Memori sebanding jumlah mahasiswa x MK kurikulum, tidak bergantung
+    jumlah baris file (nilai mengulang hanya menyimpan yang tertinggi).
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.nim_pos = {}
+        self.nims = []
+        self.matrix = np.full((0, len(engine.courses)), np.nan)
+        self.cohorts = {}
+        self.rows = 0
+        self.rejected = 0
+        self.unknown_courses = set()
+        self.preview = None
+
+    def _grow(self, needed):
+        if needed <= len(self.matrix):
+            return
+        capacity = max(needed, 2 * len(self.matrix), 1024)
+        grown = np.full((capacity, self.matrix.shape[1]), np.nan)
+        grown[:len(self.matrix)] = self.matrix
+        self.matrix = grown
+
+    def add(self, chunk):
+        """Validasi + normalisasi satu potongan lalu gabungkan ke matriks nilai.
+
+        Mengembalikan baris valid (format panjang) untuk disimpan, mis. ke GradeStore.
+        """
+        if chunk.empty:
+            return chunk
+        if self.preview is None:
+            self.preview = chunk.head()
+        long = _long_form(chunk)
+        valid = _valid_rows(long)
+        self.rows += len(long)
+        self.rejected += int((~valid).sum())
+        long = valid_rows = long[valid]
+
+        known = long['Kode'].isin(self.engine.course_pos)
+        self.unknown_courses.update(long.loc[~known, 'Kode'].unique())
+        long = long[known]
+        if 'Angkatan' in long.columns:
+            self.cohorts.update(long.drop_duplicates('NIM').set_index('NIM')['Angkatan'].dropna().to_dict())
+
+        for nim in long['NIM'].unique():
+            if nim not in self.nim_pos:
+                self.nim_pos[nim] = len(self.nims)
+                self.nims.append(nim)
+        self._grow(len(self.nims))
+
+        student = long['NIM'].map(self.nim_pos).to_numpy()
+        course = long['Kode'].map(self.engine.course_pos).to_numpy()
+        scores = long['Nilai'].to_numpy(dtype=float)
+        order = np.argsort(scores, kind='stable')  # nilai tertinggi ditulis terakhir
+        student, course, scores = student[order], course[order], scores[order]
+        self.matrix[student, course] = np.fmax(self.matrix[student, course], scores)
+        return valid_rows
+
+    def attainment(self):
+        """DataFrame capaian per mahasiswa (index NIM, kolom CPL)"""
+        matrix = self.matrix[:len(self.nims)]
+        return pd.DataFrame(self.engine.attainment_matrix(matrix), index=pd.Index(self.nims, name='NIM'),
+                            columns=self.engine.cpls)
+
+    def cohort_series(self):
+        """NIM -> Angkatan dari kolom Angkatan file, None jika kolom tidak ada"""
+        return pd.Series(self.cohorts, dtype='string') if self.cohorts else None
+
+
+def ingest_grades(source, engine, filename=None, chunksize=CHUNK_ROWS, progress=None, store=None):
+    """Baca file nilai (CSV/Excel) per potongan ke GradeAccumulator.
+
+    Jika store (nilai_store.GradeStore) diberikan, baris valid setiap potongan
+    juga ditulis ke sana; partisi (tahun akademik, MK) yang ada di file diganti.
+    progress(fraksi atau None, jumlah baris nilai) dipanggil setelah setiap potongan.
+    """
+    accumulator = GradeAccumulator(engine)
+    with store.writer() if store is not None else contextlib.nullcontext() as writer:
+        for chunk, fraction in iter_table_chunks(source, filename, chunksize):
+            rows = accumulator.add(chunk)
+            if writer is not None:
+                writer.write(rows)
+            if progress:
+                progress(fraction, accumulator.rows)
+    return accumulator
+
+
+def store_attainment(engine, store, tahun=None):
+    """Capaian per mahasiswa langsung dari GradeStore (tanpa membaca upload mentah).
+
+    Hanya partisi MK kurikulum (dan tahun akademik yang diminta) serta kolom
+    nim, angkatan dan nilai yang dibuka lewat memory map. Mengembalikan
+    (DataFrame capaian index NIM, Series NIM -> Angkatan).
+    """
+    nims, courses, scores, cohorts = [], [], [], []
+    for _, kode, arrays in store.iter_partitions(('nim', 'angkatan', 'nilai'), tahun,
+                                                 kodes=engine.course_pos.keys()):
+        nims.append(arrays['nim'])
+        cohorts.append(arrays['angkatan'])
+        scores.append(arrays['nilai'])
+        courses.append(np.full(len(arrays['nim']), engine.course_pos[kode]))
+    if not nims:
+        empty = pd.Index([], name='NIM')
+        return pd.DataFrame(columns=engine.cpls, index=empty, dtype=float), pd.Series(index=empty, dtype='string')
+
+    nim_codes, student = np.unique(np.concatenate(nims), return_inverse=True)
+    course = np.concatenate(courses)
+    values = np.concatenate(scores).astype(np.float64)
+    matrix = np.full((len(nim_codes), len(engine.courses)), np.nan)
+    order = np.argsort(values, kind='stable')  # nilai tertinggi ditulis terakhir
+    matrix[student[order], course[order]] = values[order]
+
+    index = pd.Index(store.decode('nim', nim_codes), name='NIM')
+    first = np.zeros(len(nim_codes), dtype=np.int64)
+    first[student[::-1]] = np.arange(len(student))[::-1]  # baris pertama tiap mahasiswa
+    cohort = pd.Series(store.decode('angkatan', np.concatenate(cohorts)[first]), index=index, dtype='string')
+    return pd.DataFrame(engine.attainment_matrix(matrix), index=index, columns=engine.cpls), cohort
+
+
+# ==================== MATRIKS CPMK -> CPL ====================
+def dense_from_coo(rows, cols, values, shape):
+    """Matriks padat dari COO; duplikat dijumlah. Kolom (CPL) hanya puluhan,
+    jadi bentuk padat tetap kecil dan perkalian BLAS padat paling cepat."""
+    dense = np.zeros(shape, dtype=np.float64)
+    np.add.at(dense, (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)), values)
+    return dense
+
+
+class CpmkCplMatrix:
+    """Bobot CPMK x CPL dan turunannya MK x CPL, dibangun sekali per versi data CPMK.
+
+    CPMK dikenali dengan pasangan (kode MK, kode CPMK); entri ganda digabung.
+    Bobot diambil dari cpl_bobot jika ada, selain itu 1 untuk setiap CPL
+    terkait. Label format lama ("KK1 - Mengembangkan...") tetap dikenali sebagai kode CPL.
+    """
+
+    def __init__(self, cpmk_data, cpl_codes=None):
+        # CPMK dengan (kode MK, kode CPMK) yang sama digabung: CPL-nya disatukan, bobot terbesar dipakai
+        links = {}
+        for cpmk in cpmk_data or []:
+            key = (cpmk.get('mk_kode'), cpmk.get('kode'))
+            if not key[0] or not key[1]:
+                continue
+            weights = cpmk.get('cpl_bobot') or {}
+            merged = links.setdefault(key, {})
+            for code in (cpl_code(c) for c in cpmk.get('cpl_terkait') or []):
+                merged[code] = max(merged.get(code, 0.0), float(weights.get(code, 1.0)))
+        self.cpmk_keys = list(links)
+        self.cpmk_pos = {key: i for i, key in enumerate(self.cpmk_keys)}
+
+        linked = {code for weights in links.values() for code in weights}
+        self.cpls = list(cpl_codes) if cpl_codes else sorted(linked, key=cpl_sort_key)
+        self.cpl_pos = {cpl: j for j, cpl in enumerate(self.cpls)}
+        rows, cols, values = [], [], []
+        for i, weights in enumerate(links.values()):
+            for code, weight in weights.items():
+                j = self.cpl_pos.get(code)
+                if j is not None and weight > 0:
+                    rows.append(i)
+                    cols.append(j)
+                    values.append(weight)
+
+        self.weights = dense_from_coo(rows, cols, values, (len(self.cpmk_keys), len(self.cpls)))
+
+        # MK x CPL = (MK x CPMK keanggotaan) @ (CPMK x CPL): cukup ganti baris CPMK dengan MK-nya
+        self.courses = list(dict.fromkeys(mk for mk, _ in self.cpmk_keys))
+        self.course_pos = {kode: i for i, kode in enumerate(self.courses)}
+        course_of = [self.course_pos[mk] for mk, _ in self.cpmk_keys]
+        self.course_weights = dense_from_coo([course_of[i] for i in rows], cols, values,
+                                             (len(self.courses), len(self.cpls)))
+
+    def course_frame(self):
+        """Tabel MK x CPL (bobot gabungan CPMK), untuk ditampilkan"""
+        return pd.DataFrame(self.course_weights, index=pd.Index(self.courses, name='Kode'),
+                            columns=self.cpls)
+
+    def pivot(self, scores):
+        """Nilai CPMK format panjang (NIM, Kode, CPMK, Nilai) -> (nims, matriks mahasiswa x CPMK)"""
+        keys = pd.MultiIndex.from_arrays([scores['Kode'], scores['CPMK']])
+        position = pd.Index(pd.MultiIndex.from_tuples(self.cpmk_keys) if self.cpmk_keys else keys[:0])
+        cpmk_idx = position.get_indexer(keys)
+        known = cpmk_idx >= 0
+        nim_codes, nims = pd.factorize(scores['NIM'][known], sort=True)
+        matrix = np.full((len(nims), len(self.cpmk_keys)), np.nan)
+        values = scores['Nilai'].to_numpy(dtype=float)[known]
+        order = np.argsort(values, kind='stable')  # nilai tertinggi ditulis terakhir
+        matrix[nim_codes[order], cpmk_idx[known][order]] = values[order]
+        return list(nims), matrix
+
+    def rollup(self, scores):
+        """Capaian CPL per mahasiswa dari nilai CPMK (DataFrame index NIM, kolom CPL)"""
+        nims, matrix = self.pivot(scores)
+        return pd.DataFrame(weighted_mean(matrix, self.weights), index=pd.Index(nims, name='NIM'),
+                            columns=self.cpls)
+
+
+def cpmk_scores_long(df):
+    """Normalisasi nilai CPMK: kolom NIM, Kode (MK), CPMK, Nilai; baris tidak valid dibuang"""
+    df = df.rename(columns=lambda c: str(c).strip())
+    missing = [c for c in ('NIM', 'Kode', 'CPMK', 'Nilai') if c not in df.columns]
+    if missing:
+        raise ValueError(f"Kolom wajib tidak ada: {', '.join(missing)}")
+    long = pd.DataFrame({column: df[column].astype('string').str.strip() for column in ('NIM', 'Kode', 'CPMK')})
+    long['Nilai'] = to_scores(df['Nilai'])
+    valid = (long[['NIM', 'Kode', 'CPMK']].fillna('') != '').all(axis=1) & long['Nilai'].between(0, 100)
+    return long[valid].reset_index(drop=True)
+
+
+# ==================== AGREGAT CPL INKREMENTAL ====================
+AGGREGATE_FIELDS = ('Total Nilai', 'Bobot', 'Jumlah Nilai', 'Nilai Tercapai')
+
+
+def batch_id(kode, semester):
+    """Kunci satu batch nilai: MK + semester akademik (mis. "ILK101|2024/2025 Ganjil")"""
+    return f"{kode}|{semester}"
+
+
+def batch_contribution(engine, kode, semester, grades, passing=PASSING_ATTAINMENT):
+    """Kontribusi satu batch nilai MK ke agregat CPL x angkatan x semester.
+
+    grades: DataFrame NIM, Nilai (skala 0-100), opsional Angkatan (default 4 digit NIM).
+    Hasilnya record kecil (satu baris per CPL MK x angkatan) yang disimpan
+    per batch, sehingga batch bisa diganti/dihapus dengan mengurangkannya.
+    """
+    row = engine.course_pos.get(kode)
+    if row is None:
+        raise ValueError(f"Kode MK {kode} tidak ada di kurikulum")
+    grades = grades.dropna(subset=['Nilai'])
+    cohorts = grades['Angkatan'] if 'Angkatan' in grades.columns else grades['NIM'].astype(str).str[:4]
+    nilai = grades['Nilai'].astype(float)
+    per_cohort = pd.DataFrame({'Angkatan': cohorts.fillna('-').astype(str), 'Nilai': nilai,
+                               'Tercapai': nilai >= passing}).groupby('Angkatan').agg(
+        total=('Nilai', 'sum'), jumlah=('Nilai', 'size'), tercapai=('Tercapai', 'sum'))
+
+    rows = []
+    for j in np.flatnonzero(engine.weights[row]):
+        weight = float(engine.weights[row, j])
+        for angkatan, total, jumlah, tercapai in per_cohort.itertuples():
+            rows.append([engine.cpls[j], angkatan, weight * float(total), weight * int(jumlah),
+                         int(jumlah), int(tercapai)])
+    return {"id": batch_id(kode, semester), "Kode": kode, "Semester": str(semester),
+            "Mahasiswa": int(len(grades)), "Baris": rows}
+
+
+class CplAggregates:
+    """Agregat materialized per (CPL, angkatan, semester): total nilai berbobot, bobot,
+    jumlah nilai MK dan jumlah nilai yang mencapai ambang.
+
+    Hitungan dilakukan per nilai MK, bukan per mahasiswa: mahasiswa dengan
+    beberapa MK pendukung CPL yang sama terhitung sekali untuk setiap MK.
+
+    Menambah, mengganti atau menghapus satu batch MK hanya menyentuh baris
+    CPL yang didukung MK tersebut (kontribusi lama dikurangkan, yang baru
+    ditambahkan); tidak ada perhitungan ulang dari seluruh nilai.
+    """
+
+    def __init__(self, records=()):
+        self.batches = {}
+        self.totals = {}
+        for record in records:
+            self.apply(record)
+
+    def _add(self, record, sign):
+        touched = set()
+        for cpl, angkatan, total, bobot, jumlah, tercapai in record['Baris']:
+            key = (cpl, angkatan, record['Semester'])
+            values = self.totals.setdefault(key, [0.0, 0.0, 0, 0])
+            values[0] += sign * total
+            values[1] += sign * bobot
+            values[2] += sign * jumlah
+            values[3] += sign * tercapai
+            if values[2] <= 0:
+                del self.totals[key]
+            touched.add(key)
+        return touched
+
+    def apply(self, record):
+        """Tambah atau ganti satu batch; mengembalikan kunci agregat yang berubah"""
+        touched = self.remove(record['id'])
+        self.batches[record['id']] = record
+        return touched | self._add(record, 1)
+
+    def copy(self):
+        """Salinan untuk dibaca di luar lock (record batch tidak pernah diubah, cukup dict baru)"""
+        clone = CplAggregates()
+        clone.batches = dict(self.batches)
+        clone.totals = {key: list(values) for key, values in self.totals.items()}
+        return clone
+
+    def remove(self, batch):
+        """Hapus satu batch (id); mengembalikan kunci agregat yang berubah"""
+        record = self.batches.pop(batch, None)
+        return self._add(record, -1) if record else set()
+
+    def frame(self):
+        """Tabel agregat: CPL, Angkatan, Semester, Rata-rata, % Nilai Tercapai, Jumlah Nilai"""
+        columns = ['CPL', 'Angkatan', 'Semester', 'Rata-rata', '% Nilai Tercapai', 'Jumlah Nilai']
+        if not self.totals:
+            return pd.DataFrame(columns=columns)
+        keys = list(self.totals)
+        values = np.array(list(self.totals.values()), dtype=float)
+        frame = pd.DataFrame(keys, columns=['CPL', 'Angkatan', 'Semester'])
+        frame['Rata-rata'] = values[:, 0] / values[:, 1]
+        frame['% Nilai Tercapai'] = values[:, 3] / values[:, 2] * 100
+        frame['Jumlah Nilai'] = values[:, 2].astype(int)
+        frame = frame.sort_values(['CPL', 'Angkatan', 'Semester'], kind='stable',
+                                  key=lambda col: col.map(cpl_sort_key) if col.name == 'CPL' else col)
+        return frame.reset_index(drop=True)
+
+    def cpl_means(self, angkatan=None, semester=None):
+        """Rata-rata berbobot per CPL, digabung lintas angkatan/semester (atau difilter)"""
+        sums = {}
+        for (cpl, a, s), values in self.totals.items():
+            if (angkatan is None or a == angkatan) and (semester is None or s == semester):
+                total = sums.setdefault(cpl, [0.0, 0.0])
+                total[0] += values[0]
+                total[1] += values[1]
+        return {cpl: total / bobot for cpl, (total, bobot) in sorted(sums.items(), key=lambda item: cpl_sort_key(item[0]))
+                if bobot > 0}
@@ -0,0 +1,246 @@
+"""Penyusun jadwal kuliah bebas bentrok (hari/jam/ruang) untuk MK yang ditawarkan.
+
+MK yang diambil bersama (semester yang sama, wajib atau peminatan yang
+sama) tidak boleh berada di slot yang sama. Jadwal awal dibuat dengan
+pewarnaan graph DSatur (warna = slot waktu, dibatasi jumlah ruang),
+lalu diperbaiki dengan local search min-conflicts. Beberapa restart
+independen dijalankan paralel di process pool dan hasil terbaik dipakai.
+Hasil di-cache per himpunan MK yang ditawarkan.
+"""
+import hashlib
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from curriculum import as_semester
+
+DAYS = ["Senin", "Selasa", "Rabu", "Kamis", "Jumat"]
+SLOTS = ["08:00-10:00", "10:00-12:00", "13:00-15:00", "15:00-17:00"]
+ROOMS = {"R101": "Teori", "R102": "Teori", "R103": "Teori", "Lab 1": "Lab", "Lab 2": "Lab"}
+
+RESTARTS = int(os.environ.get('OBE_JADWAL_RESTARTS', '8'))
+LOCAL_SEARCH_STEPS = 2000
+MAX_PER_DAY = 2  # MK satu kelompok per hari sebelum dianggap terlalu padat (soft)
+PARALLEL_MIN_SECTIONS = 60  # di bawah ini overhead process pool lebih mahal dari solve-nya
+HARD = 1000
+MAX_CACHED_TIMETABLES = 32
+
+_timetables = {}
+
+
+def room_type(mk):
+    """MK praktikum butuh laboratorium"""
+    return "Lab" if "praktikum" in str(mk.get('Jenis', '')).lower() else "Teori"
+
+
+def build_problem(offerings, peminatan_of=None, sections=None, rooms=ROOMS):
+    """Susun data solver (tuple/dict sederhana agar bisa dikirim ke process pool).
+
+    offerings: list MK (Kode, Semester, Jenis); peminatan_of: {kode: [peminatan]};
+    sections: {kode: jumlah kelas} (default 1).
+    """
+    peminatan_of = peminatan_of or {}
+    sections = sections or {}
+    items = []
+    for mk in sorted(offerings, key=lambda mk: str(mk.get('Kode'))):
+        kode = mk.get('Kode')
+        if not kode:
+            continue
+        semester = as_semester(mk.get('Semester'))
+        tracks = tuple(sorted(peminatan_of.get(kode, ())))
+        for kelas in range(int(sections.get(kode, 1))):
+            items.append((kode, chr(ord('A') + kelas), semester, tracks, room_type(mk)))
+
+    n = len(items)
+    neighbours = [[] for _ in range(n)]
+    for i in range(n):
+        for j in range(i + 1, n):
+            if _conflicting(items[i], items[j]):
+                neighbours[i].append(j)
+                neighbours[j].append(i)
+
+    groups = []
+    for _, _, semester, tracks, _ in items:
+        groups.append((('wajib', semester),) if not tracks else tuple(('peminatan', t, semester) for t in tracks))
+
+    capacity = {}
+    for kind in rooms.values():
+        capacity[kind] = capacity.get(kind, 0) + 1
+    return {
+        'items': items,
+        'neighbours': neighbours,
+        'groups': groups,
+        'capacity': capacity,
+        'rooms': dict(rooms),
+        'n_slots': len(DAYS) * len(SLOTS),
+    }
+
+
+def _conflicting(a, b):
+    """Dua kelas bentrok jika mahasiswa yang sama bisa mengambil keduanya pada semester itu"""
+    if a[0] == b[0] or a[2] != b[2]:
+        return False  # kelas paralel MK yang sama / semester berbeda
+    return not a[3] or not b[3] or bool(set(a[3]) & set(b[3]))
+
+
+def timetable_key(problem):
+    payload = json.dumps([problem['items'], sorted(problem['rooms'].items())], separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+# ==================== SOLVER ====================
+class _State:
+    """Penugasan slot per kelas beserta hitungan untuk evaluasi biaya inkremental"""
+
+    def __init__(self, problem):
+        self.problem = problem
+        n = len(problem['items'])
+        self.slot = [None] * n
+        self.usage = [dict.fromkeys(problem['capacity'], 0) for _ in range(problem['n_slots'])]
+        self.day_load = {}
+
+    def place(self, i, slot):
+        kind = self.problem['items'][i][4]
+        self.slot[i] = slot
+        self.usage[slot][kind] += 1
+        day = slot // len(SLOTS)
+        for group in self.problem['groups'][i]:
+            self.day_load[(group, day)] = self.day_load.get((group, day), 0) + 1
+
+    def remove(self, i):
+        slot = self.slot[i]
+        kind = self.problem['items'][i][4]
+        self.usage[slot][kind] -= 1
+        day = slot // len(SLOTS)
+        for group in self.problem['groups'][i]:
+            self.day_load[(group, day)] -= 1
+        self.slot[i] = None
+
+    def cost_at(self, i, slot):
+        """Biaya menaruh kelas i di slot (kelas i belum ditempatkan)"""
+        kind = self.problem['items'][i][4]
+        clashes = sum(1 for j in self.problem['neighbours'][i] if self.slot[j] == slot)
+        overflow = max(0, self.usage[slot][kind] + 1 - self.problem['capacity'].get(kind, 0))
+        day = slot // len(SLOTS)
+        crowded = sum(1 for group in self.problem['groups'][i]
+                      if self.day_load.get((group, day), 0) >= MAX_PER_DAY)
+        return HARD * (clashes + overflow) + crowded
+
+    def current_cost(self, i):
+        """Biaya kelas i di slotnya sekarang"""
+        slot = self.slot[i]
+        self.remove(i)
+        cost = self.cost_at(i, slot)
+        self.place(i, slot)
+        return cost
+
+    def total_cost(self):
+        hard = sum(1 for i, s in enumerate(self.slot) for j in self.problem['neighbours'][i]
+                   if j > i and self.slot[j] == s)
+        hard += sum(max(0, used - self.problem['capacity'].get(kind, 0))
+                    for usage in self.usage for kind, used in usage.items())
+        soft = sum(max(0, load - MAX_PER_DAY) for load in self.day_load.values())
+        return hard, soft
+
+
+def _dsatur(problem, rng):
+    """Pewarnaan DSatur: kelas dengan slot tetangga paling beragam ditempatkan lebih dulu"""
+    state = _State(problem)
+    n = len(problem['items'])
+    neighbours = problem['neighbours']
+    saturation = [set() for _ in range(n)]
+    tiebreak = [rng.random() for _ in range(n)]
+    remaining = set(range(n))
+    slots = list(range(problem['n_slots']))
+
+    while remaining:
+        i = max(remaining, key=lambda k: (len(saturation[k]), len(neighbours[k]), tiebreak[k]))
+        remaining.discard(i)
+        rng.shuffle(slots)
+        slot = min(slots, key=lambda s: state.cost_at(i, s))
+        state.place(i, slot)
+        for j in neighbours[i]:
+            saturation[j].add(slot)
+    return state
+
+
+def _local_search(state, rng, steps=LOCAL_SEARCH_STEPS):
+    """Min-conflicts: pindahkan kelas yang bermasalah ke slot dengan biaya terendah"""
+    n = len(state.problem['items'])
+    slots = list(range(state.problem['n_slots']))
+    while steps > 0:
+        bad = [i for i in range(n) if state.current_cost(i) > 0]
+        if not bad:
+            break
+        rng.shuffle(bad)
+        improved = False
+        for i in bad[:steps]:
+            steps -= 1
+            current = state.slot[i]
+            before = state.current_cost(i)
+            state.remove(i)
+            rng.shuffle(slots)
+            best = min(slots, key=lambda s: (state.cost_at(i, s), s != current))
+            improved |= state.cost_at(i, best) < before
+            state.place(i, best)
+        if not improved:
+            break  # minimum lokal; restart lain yang mencoba jalur berbeda
+    return state
+
+
+def _solve_once(problem, seed):
+    """Satu restart (dipanggil di worker process)"""
+    rng = random.Random(seed)
+    state = _local_search(_dsatur(problem, rng), rng)
+    return state.total_cost(), state.slot
+
+
+def _assign_rooms(problem, slots):
+    """Ruang per kelas: ruang bertipe sesuai yang masih kosong di slot tersebut"""
+    free = {}
+    for name, kind in problem['rooms'].items():
+        free.setdefault(kind, []).append(name)
+    used = {}
+    rooms = []
+    for item, slot in zip(problem['items'], slots):
+        kind = item[4]
+        taken = used.setdefault((slot, kind), 0)
+        names = free.get(kind, [])
+        rooms.append(names[taken] if taken < len(names) else "-")
+        used[(slot, kind)] = taken + 1
+    return rooms
+
+
+def solve_timetable(problem, restarts=RESTARTS, workers=None):
+    """Jadwal terbaik dari beberapa restart; di-cache per himpunan penawaran.
+
+    Mengembalikan {"rows": [{Kode, Kelas, Hari, Pukul, Ruang}], "bentrok": int, "padat": int}.
+    """
+    key = timetable_key(problem)
+    if key in _timetables:
+        return _timetables[key]
+
+    seeds = list(range(max(1, restarts)))
+    results = None
+    if len(seeds) > 1 and workers != 1 and len(problem['items']) >= PARALLEL_MIN_SECTIONS:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_solve_once, [problem] * len(seeds), seeds))
+        except (OSError, BrokenProcessPool):
+            results = None  # lingkungan tanpa multiprocessing: jalankan berurutan
+    if results is None:
+        results = [_solve_once(problem, seed) for seed in seeds]
+
+    (hard, soft), slots = min(results, key=lambda result: result[0])
+    rooms = _assign_rooms(problem, slots)
+    rows = []
+    for (kode, kelas, _, _, _), slot, room in zip(problem['items'], slots, rooms):
+        rows.append({"Kode": kode, "Kelas": kelas, "Hari": DAYS[slot // len(SLOTS)],
+                     "Pukul": SLOTS[slot % len(SLOTS)], "Ruang": room})
+    timetable = {"rows": rows, "bentrok": hard, "padat": soft}
+    if len(_timetables) >= MAX_CACHED_TIMETABLES:
+        _timetables.clear()
+    _timetables[key] = timetable
+    return timetable
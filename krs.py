@@ -0,0 +1,220 @@
+"""Mesin kelayakan KRS: MK mana yang boleh diambil berdasarkan MK yang sudah lulus.
+
+Setiap MK dipetakan ke satu bit (lihat prasyarat.ReachabilityIndex), jadi
+transkrip mahasiswa menjadi satu bitset dan kelayakan seluruh katalog
+dihitung dengan operasi AND terhadap mask prasyarat yang sudah dihitung.
+Hasil per transkrip di-cache (LRU) dengan bitset transkrip sebagai kunci.
+"""
+import functools
+import io
+import sys
+
+import pandas as pd
+
+from curriculum import CurriculumIndex
+from prasyarat import ReachabilityIndex, prasyarat_edges
+
+TRANSCRIPT_CACHE_SIZE = 4096
+
+# Aturan KRS
+SKS_MIN = 18
+SKS_MAX = 24
+PEMINATAN_MIN_SEMESTER = 5
+
+REPORT_COLUMNS = ['NIM', 'Kode', 'Jenis', 'Keterangan']
+
+
+class EligibilityEngine:
+    """Kelayakan MK terhadap transkrip, dibangun sekali per versi data prasyarat/katalog.
+
+    Objek ini dibagi antar sesi; cache transkripnya thread-safe (lru_cache).
+    """
+
+    def __init__(self, prasyarat_data, catalog_codes=(), reach=None):
+        # Kode yang tidak ada di index tidak punya prasyarat, jadi selalu layak
+        self.reach = reach or ReachabilityIndex(prasyarat_data, extra_nodes=catalog_codes)
+        self._eligible_mask = functools.lru_cache(maxsize=TRANSCRIPT_CACHE_SIZE)(self._compute_mask)
+
+    def passed_mask(self, passed):
+        return self.reach.mask_of(passed)
+
+    def _compute_mask(self, passed):
+        """Bitset semua MK yang prasyarat langsungnya sudah lulus"""
+        missing = ~passed
+        mask = 0
+        for i, direct in enumerate(self.reach.direct):
+            if not direct & missing:
+                mask |= 1 << i
+        return mask
+
+    def eligible_mask(self, passed):
+        """Bitset MK yang layak untuk transkrip (di-cache per transkrip)"""
+        return self._eligible_mask(self.passed_mask(passed))
+
+    def check(self, offered, passed):
+        """Pisahkan MK yang ditawarkan menjadi (layak, {kode: prasyarat langsung yang belum lulus})"""
+        passed_bits = self.passed_mask(passed)
+        eligible = self._eligible_mask(passed_bits)
+        valid, blocked = [], {}
+        for kode in offered:
+            i = self.reach.bit.get(kode)
+            if i is None or eligible >> i & 1:
+                valid.append(kode)
+            else:
+                blocked[kode] = self.reach.codes_of(self.reach.direct[i] & ~passed_bits)
+        return valid, blocked
+
+    def is_eligible(self, kode, passed):
+        i = self.reach.bit.get(kode)
+        return i is None or bool(self.eligible_mask(passed) >> i & 1)
+
+    def cache_info(self):
+        return self._eligible_mask.cache_info()
+
+
+# ==================== VALIDASI KRS MASSAL ====================
+def _read_codes_csv(source, required):
+    """CSV -> DataFrame string; kolom Kode berisi "A,B" dipecah menjadi satu baris per MK"""
+    df = pd.read_csv(source, dtype=str, skipinitialspace=True)
+    df.columns = [c.strip() for c in df.columns]
+    missing = [c for c in required if c not in df.columns]
+    if missing:
+        raise ValueError(f"Kolom wajib tidak ada: {', '.join(missing)}")
+    df['NIM'] = df['NIM'].str.strip()
+    if df['Kode'].str.contains(',', na=False).any():
+        df = df.assign(Kode=df['Kode'].str.split(',')).explode('Kode')
+    df['Kode'] = df['Kode'].str.strip()
+    return df[df['NIM'].notna() & df['Kode'].notna() & (df['Kode'] != '')].reset_index(drop=True)
+
+
+def read_krs_csv(source):
+    """Rencana KRS: kolom NIM, Kode; opsional Semester (semester mahasiswa) dan Peminatan"""
+    df = _read_codes_csv(source, ('NIM', 'Kode'))
+    if 'Semester' in df.columns:
+        df['Semester'] = pd.to_numeric(df['Semester'], errors='coerce')
+    return df
+
+
+def read_transcript_csv(source):
+    """Transkrip: kolom NIM, Kode berisi MK yang sudah lulus"""
+    return _read_codes_csv(source, ('NIM', 'Kode'))[['NIM', 'Kode']].drop_duplicates()
+
+
+def catalog_frame(index):
+    """Katalog MK (Kode, SKS, Semester MK, apakah MK peminatan) dari CurriculumIndex"""
+    return pd.DataFrame({
+        'Kode': list(index.by_kode),
+        'SKS': pd.to_numeric([mk.get('SKS') for mk in index.by_kode.values()], errors='coerce'),
+        'Semester MK': pd.to_numeric([mk.get('Semester') for mk in index.by_kode.values()], errors='coerce'),
+        'Peminatan MK': [kode in index.peminatan_of for kode in index.by_kode],
+    })
+
+
+def _violations(frame, jenis, keterangan):
+    out = frame[['NIM', 'Kode']].copy()
+    out['Jenis'] = jenis
+    out['Keterangan'] = keterangan
+    return out
+
+
+def validate_krs_batch(krs, transcripts, index, prasyarat_data, sks_min=SKS_MIN, sks_max=SKS_MAX):
+    """Validasi KRS seluruh angkatan sekaligus (operasi kolom pandas, tanpa loop per baris).
+
+    Mengembalikan DataFrame pelanggaran (NIM, Kode, Jenis, Keterangan) terurut per NIM.
+    """
+    reports = []
+
+    duplicate = krs.duplicated(['NIM', 'Kode'])
+    reports.append(_violations(krs[duplicate], 'DUPLIKAT', 'MK tercantum lebih dari sekali'))
+    rows = krs[~duplicate].merge(catalog_frame(index), on='Kode', how='left')
+
+    unknown = rows['SKS'].isna() & rows['Semester MK'].isna()
+    reports.append(_violations(rows[unknown], 'TIDAK_DIKENAL', 'Kode MK tidak ada di kurikulum'))
+    rows = rows[~unknown]
+
+    # Batas SKS per mahasiswa
+    total = rows.groupby('NIM', sort=False)['SKS'].sum().rename('Total').reset_index()
+    total['Kode'] = ''
+    low, high = total[total['Total'] < sks_min], total[total['Total'] > sks_max]
+    reports.append(_violations(low, 'SKS', 'Total ' + low['Total'].astype(int).astype(str) + f' SKS < {sks_min}'))
+    reports.append(_violations(high, 'SKS', 'Total ' + high['Total'].astype(int).astype(str) + f' SKS > {sks_max}'))
+
+    # MK yang sudah lulus
+    passed = rows.merge(transcripts, on=['NIM', 'Kode'], how='inner')
+    reports.append(_violations(passed, 'SUDAH_LULUS', 'MK sudah lulus di transkrip'))
+
+    # Prasyarat langsung: anti-join (NIM, prasyarat) terhadap transkrip
+    edges = pd.DataFrame(prasyarat_edges(prasyarat_data), columns=['Prasyarat', 'Kode'])
+    needed = rows[['NIM', 'Kode']].merge(edges, on='Kode')
+    needed = needed.merge(transcripts.rename(columns={'Kode': 'Prasyarat'}), on=['NIM', 'Prasyarat'],
+                          how='left', indicator=True)
+    lacking = needed[needed['_merge'] == 'left_only']
+    lacking = lacking.groupby(['NIM', 'Kode'], sort=False)['Prasyarat'].agg(', '.join).reset_index()
+    reports.append(_violations(lacking, 'PRASYARAT', 'Belum lulus ' + lacking['Prasyarat']))
+
+    # Ketersediaan semester: MK hanya dibuka di semester ganjil/genap sesuai kurikulum
+    if 'Semester' in rows.columns:
+        known = rows['Semester'].notna() & rows['Semester MK'].notna()
+        parity = known & (rows['Semester'] % 2 != rows['Semester MK'] % 2)
+        reports.append(_violations(rows[parity], 'SEMESTER', 'MK tidak dibuka di semester ' +
+                                   rows.loc[parity, 'Semester'].astype(int).astype(str)))
+        early = known & rows['Peminatan MK'] & (rows['Semester'] < PEMINATAN_MIN_SEMESTER)
+        reports.append(_violations(rows[early], 'SEMESTER',
+                                   f'MK peminatan baru dapat diambil mulai semester {PEMINATAN_MIN_SEMESTER}'))
+
+    # Keanggotaan peminatan
+    if 'Peminatan' in rows.columns:
+        pairs = pd.MultiIndex.from_tuples(
+            [(kode, p) for kode, names in index.peminatan_of.items() for p in names], names=['Kode', 'Peminatan'])
+        member = pd.MultiIndex.from_frame(rows[['Kode', 'Peminatan']].fillna('')).isin(pairs)
+        outside = rows[rows['Peminatan MK'] & ~member]
+        reports.append(_violations(outside, 'PEMINATAN', 'MK bukan bagian dari peminatan ' +
+                                   outside['Peminatan'].fillna('-')))
+
+    report = pd.concat(reports, ignore_index=True)
+    return report.sort_values(['NIM', 'Kode'], kind='stable').reset_index(drop=True)[REPORT_COLUMNS]
+
+
+def iter_report_csv(report, students_per_chunk=1000):
+    """Laporan pelanggaran sebagai potongan teks CSV, dikelompokkan per mahasiswa"""
+    yield ','.join(REPORT_COLUMNS) + '\n'
+    nims = report['NIM'].unique()
+    for start in range(0, len(nims), students_per_chunk):
+        chunk = report[report['NIM'].isin(nims[start:start + students_per_chunk])]
+        yield chunk.to_csv(index=False, header=False)
+
+
+def report_csv_buffer(report):
+    """Laporan CSV sebagai buffer biner, ditulis per potongan dari iter_report_csv"""
+    buffer = io.BytesIO()
+    for chunk in iter_report_csv(report):
+        buffer.write(chunk.encode('utf-8'))
+    buffer.seek(0)
+    return buffer
+
+
+def summarize_report(report, krs):
+    """Ringkasan per mahasiswa: jumlah pelanggaran per jenis (0 = KRS valid)"""
+    summary = pd.crosstab(report['NIM'], report['Jenis']) if len(report) else pd.DataFrame()
+    summary = summary.reindex(krs['NIM'].unique(), fill_value=0)
+    summary.index.name = 'NIM'
+    summary.columns.name = None
+    summary['Valid'] = summary.sum(axis=1) == 0
+    return summary.reset_index()
+
+
+if __name__ == '__main__':
+    # python krs.py validate krs.csv transkrip.csv [laporan.csv]
+    if len(sys.argv) >= 4 and sys.argv[1] == 'validate':
+        from storage import get_backend
+        backend = get_backend()
+        index = CurriculumIndex(backend.load('mk_wajib', []), backend.load('peminatan_data', {}))
+        report = validate_krs_batch(read_krs_csv(sys.argv[2]), read_transcript_csv(sys.argv[3]),
+                                    index, backend.load('prasyarat_data', {}))
+        if len(sys.argv) > 4:
+            with open(sys.argv[4], 'w', encoding='utf-8') as f:
+                f.writelines(iter_report_csv(report))
+        else:
+            sys.stdout.writelines(iter_report_csv(report))
+    else:
+        print("Penggunaan: python krs.py validate krs.csv transkrip.csv [laporan.csv]")
@@ -1,15 +1,31 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
 import plotly.express as px
-import networkx as nx
 from datetime import datetime
 import json
 import os
 import uuid
+import functools
+import threading
+from collections.abc import Mapping
 from io import BytesIO
 import base64
 
+from curriculum import CurriculumIndex
+from dampak import HAPUS, PINDAH, analyze_impact
+from evaluasi import (AttainmentEngine, CplAggregates, CpmkCplMatrix, batch_contribution, cpmk_scores_long,
+                      excel_sheet_names, grades_long, iter_table_chunks)
+from models import COLLECTION_MODELS, cpl_code, parse_cpl_weights
+from krs import read_krs_csv, read_transcript_csv, report_csv_buffer, summarize_report, validate_krs_batch
+from prasyarat import (GraphAnalytics, PrerequisiteOrder, ReachabilityIndex, is_large_graph, prasyarat_edges,
+                       prasyarat_figure, prasyarat_layout)
+from prasyarat_ui import show_large_prasyarat_graph
+from rencana import StudyPlanner, plan_batch, read_students_csv
+from serializer import JsonCodec, MsgpackCodec, codec_for_path, get_codec, json_text
+from snapshot import EditSession, LazySnapshot, freeze
+from storage import (DATA_FILES, DICT_COLLECTIONS, StorageError, atomic_write_bytes, get_backend,
+                     manifest_version, nest_peminatan, read_manifest, record_key, update_manifest)
+
 # Konfigurasi halaman
 st.set_page_config(
     page_title="Kurikulum OBE Dinamis - Ilmu Komputer MNCU",
@@ -107,78 +123,12 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Sidebar
-with st.sidebar:
-    st.image("https://mncu.ac.id/Images/navbar_logo.png", width=200)
-    
-    st.markdown("---")
-    st.markdown("<h2 style='color: #0056A4;'>Navigasi Kurikulum</h2>", unsafe_allow_html=True)
-    
-    # Mode Admin
-    admin_mode = st.checkbox("🔐 Mode Admin", value=False)
-    
-    if admin_mode:
-        st.markdown('<div class="admin-badge">ADMIN MODE AKTIF</div>', unsafe_allow_html=True)
-        menu_options = [
-            "🏠 Dashboard", "👥 Kelola Profil Lulusan", "🎓 Kelola CPL", 
-            "📚 Kelola Mata Kuliah", "🔗 Kelola Prasyarat", "🌐 Kelola MBKM",
-            "📊 Kelola Evaluasi OBE", "📤 Export/Import Data", "ℹ️ Tentang MNCU"
-        ]
-    else:
-        menu_options = [
-            "🏠 Dashboard", "👥 Profil Lulusan", "📚 Struktur Kurikulum", 
-            "🔗 Prasyarat MK", "🌐 Program MBKM", "📝 Simulasi KRS",
-            "📊 Evaluasi OBE", "📤 Export Data", "ℹ️ Tentang MNCU"
-        ]
-    
-    menu = st.selectbox("Pilih Menu:", menu_options)
-    
-    st.markdown("---")
-    
-    # Quick Stats
-    st.markdown("### 📊 Statistik Cepat")
-    
-    try:
-        data = load_all_data()
-        pl_count = len(data['pl_data'])
-        cpl_count = len(data['cpl_data'])
-        mk_count = len(data['mk_wajib'])
-        peminatan_count = sum(len(mk_list) for mk_list in data['peminatan_data'].values())
-        
-        st.metric("Profil Lulusan", pl_count)
-        st.metric("CPL", cpl_count)
-        st.metric("Mata Kuliah", mk_count + peminatan_count)
-    except:
-        st.metric("Profil Lulusan", "5")
-        st.metric("CPL", "17")
-        st.metric("Mata Kuliah", "50+")
-    
-    st.markdown("---")
-    st.caption(f"📅 {datetime.now().strftime('%d %B %Y')}")
-    st.caption("Kurikulum OBE 2025 - Prodi Ilmu Komputer")
-
 # ==================== SISTEM PENYIMPANAN DATA ====================
-DATA_FILES = {
-    'pl_data': 'data/profil_lulusan.json',
-    'cpl_data': 'data/cpl.json',
-    'mk_wajib': 'data/mata_kuliah_wajib.json',
-    'peminatan_data': 'data/peminatan.json',
-    'prasyarat_data': 'data/prasyarat.json',
-    'mbkm_data': 'data/mbkm.json',
-    'bk_data': 'data/bahan_kajian.json',
-    'cpmk_data': 'data/cpmk.json'
-}
+# DATA_FILES dan backend (JSON / SQLite) didefinisikan di storage.py
 
 def ensure_data_directory():
-    """Membuat direktori data jika belum ada"""
-    if not os.path.exists('data'):
-        os.makedirs('data')
-    
-    # Buat file default jika belum ada
-    for filepath in DATA_FILES.values():
-        if not os.path.exists(filepath):
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump([], f, ensure_ascii=False, indent=2)
+    """Membuat direktori data / database jika belum ada"""
+    get_backend().ensure()
 
 def get_default_data():
     """Data default untuk inisialisasi"""
@@ -221,68 +171,352 @@ def get_default_data():
         ]
     }
 
-@st.cache_data(ttl=60)
+def data_versions(*keys):
+    """Stamp versi per koleksi (semua koleksi jika keys kosong)"""
+    backend = get_backend()
+    return tuple((key, backend.version(key)) for key in (keys or DATA_FILES))
+
+@st.cache_resource(max_entries=64)
+def load_collection(key, version):
+    """Load satu koleksi sebagai data read-only bersama; cache per (koleksi, versi).
+
+    Satu salinan per proses untuk semua sesi (tanpa pickle/copy per pemanggil),
+    dan save hanya meng-invalidasi koleksi yang disimpan.
+    """
+    # Default hanya untuk data yang belum ada; data rusak dilaporkan (StorageError), bukan diganti diam-diam
+    default_data = get_default_data()
+    data = get_backend().load(key, default_data.get(key, []))
+    
+    # File lama berisi [] padahal prasyarat_data/peminatan_data berbentuk dict
+    # (peminatan sudah disimpan bersarang, jadi tidak perlu dibentuk ulang di sini)
+    if key in DICT_COLLECTIONS and data == []:
+        data = {}
+    
+    # Koleksi besar berbentuk list disimpan sebagai model __slots__ (Mapping read-only)
+    model = COLLECTION_MODELS.get(key)
+    if model is not None and isinstance(data, list):
+        return tuple(model.from_dict(row) if isinstance(row, Mapping) else freeze(row) for row in data)
+    return freeze(data)
+
+def _load_or_stop(key, version):
+    try:
+        return load_collection(key, version)
+    except StorageError as e:
+        st.error(f"❌ Data tidak dapat dibaca: {e}")
+        st.stop()
+
+def load_current(key):
+    """Koleksi read-only bersama untuk versi saat ini"""
+    return _load_or_stop(key, get_backend().version(key))
+
+def load_snapshot():
+    """Snapshot read-only bersama untuk halaman viewer (koleksi di-load saat diakses, tanpa copy)"""
+    ensure_data_directory()
+    return LazySnapshot(load_current, DATA_FILES)
+
 def load_all_data():
-    """Load semua data dari file JSON"""
+    """Load data untuk diedit: tiap koleksi disalin saat pertama kali diakses (copy-on-write)"""
+    ensure_data_directory()
+    return EditSession(load_current, DATA_FILES)
+
+def collection_summary(key, data):
+    """Ringkasan kecil satu koleksi untuk manifest (jumlah record)"""
+    if key == 'peminatan_data' and isinstance(data, Mapping):
+        return {'count': sum(len(mk_list) for mk_list in data.values()), 'groups': len(data)}
+    return {'count': len(data)}
+
+def get_counts(*keys):
+    """Ringkasan per koleksi dari manifest; dihitung ulang hanya untuk koleksi yang versinya berubah"""
     ensure_data_directory()
-    data = {}
+    manifest = read_manifest()
+    backend = get_backend()
+    counts = {}
+    stale = {}
+    for key in keys:
+        version = manifest_version(backend.version(key))
+        entry = manifest.get(key)
+        if not entry or entry.get('version') != version:
+            entry = {'version': version, **collection_summary(key, load_current(key))}
+            stale[key] = entry
+        counts[key] = entry
+    if stale:
+        update_manifest(stale)
+    return counts
+
+# Index bersama hanya dipakai untuk versi data terbaru; satu slot cadangan untuk sesi
+# yang masih rerun dengan versi sebelumnya. Batas ini berlaku per fungsi.
+INDEX_CACHE_ENTRIES = 2
+
+def depends_on(*keys, resource=False, **cache_kwargs):
+    """Decorator cache untuk hasil turunan (layout graph, agregat, figure).
+
+    Fungsi yang didekorasi menerima koleksi `keys` sebagai argumen pertama
+    dan hanya dihitung ulang jika versi salah satu koleksi tersebut berubah.
+    resource=True menyimpan satu objek bersama (st.cache_resource) tanpa copy.
+    """
+    cache = st.cache_resource if resource else st.cache_data
     
-    for key, filepath in DATA_FILES.items():
+    def decorator(func):
+        def cached(versions, *args, **kwargs):
+            collections = [load_collection(key, version) for key, version in versions]
+            return func(*collections, *args, **kwargs)
+        
+        # Streamlit membedakan cache per module + qualname; tanpa ini semua fungsi
+        # yang didekorasi berbagi satu cache (dan satu batas max_entries/ttl)
+        cached.__module__ = func.__module__
+        cached.__qualname__ = f"{func.__qualname__}.<depends_on>"
+        cached = cache(**cache_kwargs)(cached)
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return cached(data_versions(*keys), *args, **kwargs)
+        
+        wrapper.depends_on = keys
+        return wrapper
+    return decorator
+
+@depends_on('mk_wajib', 'peminatan_data', 'cpmk_data', resource=True, max_entries=INDEX_CACHE_ENTRIES)
+def get_curriculum_index(mk_wajib, peminatan_data, cpmk_data):
+    """CurriculumIndex bersama untuk versi data saat ini (read-only)"""
+    return CurriculumIndex(mk_wajib, peminatan_data, cpmk_data)
+
+@depends_on('prasyarat_data', resource=True, max_entries=INDEX_CACHE_ENTRIES)
+def get_reachability_index(prasyarat_data):
+    """Transitive closure prasyarat bersama untuk versi data saat ini (read-only)"""
+    return build_reachability_index(prasyarat_data)
+
+def build_reachability_index(prasyarat_data):
+    return ReachabilityIndex(prasyarat_data if isinstance(prasyarat_data, Mapping) else {})
+
+@depends_on('prasyarat_data', 'mk_wajib', 'peminatan_data', resource=True, max_entries=INDEX_CACHE_ENTRIES)
+def get_graph_analytics(prasyarat_data, mk_wajib, peminatan_data):
+    """Analitik graph prasyarat (kedalaman, fan-in/out, betweenness, jalur kritis) per versi data.
+
+    Dibangun dari koleksi versi yang sama dengan kunci cache-nya, bukan dari
+    index bersama yang bisa sudah berpindah ke versi lebih baru.
+    """
+    return GraphAnalytics(build_reachability_index(prasyarat_data), CurriculumIndex(mk_wajib, peminatan_data))
+
+@depends_on('cpmk_data', 'cpl_data', resource=True, max_entries=INDEX_CACHE_ENTRIES)
+def get_cpmk_cpl_matrix(cpmk_data, cpl_data):
+    """Bobot CPMK x CPL dan MK x CPL turunannya untuk versi data saat ini (read-only)"""
+    cpl_codes = [cpl['kode'] for cpl in cpl_data or [] if cpl.get('kode')]
+    return CpmkCplMatrix(cpmk_data, cpl_codes or None)
+
+@depends_on('mk_wajib', 'peminatan_data', 'prasyarat_data')
+def impact_report(mk_wajib, peminatan_data, prasyarat_data, kode, aksi, semester_baru=None):
+    """Analisis dampak satu usulan perubahan (cache per versi data dan per query)"""
+    return analyze_impact(get_curriculum_index(), get_reachability_index(), kode, aksi, semester_baru)
+
+@st.cache_resource
+def prasyarat_order_state():
+    """Urutan topologis prasyarat yang dipertahankan antar edit (satu per proses)"""
+    return {'version': None, 'order': None, 'lock': threading.Lock()}
+
+def set_prasyarat(kode, prereqs):
+    """Simpan prasyarat satu MK jika tidak membentuk siklus.
+
+    Urutan topologis diperbarui secara inkremental (Pearce–Kelly); hanya
+    jika data diubah dari luar proses ini urutan dibangun ulang dari awal.
+    Mengembalikan siklus yang terbentuk, atau None jika berhasil disimpan.
+    """
+    state = prasyarat_order_state()
+    with state['lock']:
+        version = data_versions('prasyarat_data')
+        if state['order'] is None or state['version'] != version:
+            prasyarat_data = load_current('prasyarat_data')
+            state['order'] = PrerequisiteOrder.from_data(
+                prasyarat_data if isinstance(prasyarat_data, Mapping) else {})
+        
+        cycle = state['order'].set_prerequisites(kode, prereqs)
+        if cycle:
+            state['version'] = version
+            return cycle
+        
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data[key] = json.load(f)
-        except:
-            # Jika file tidak ada atau error, gunakan default
-            default_data = get_default_data()
-            if key in default_data:
-                data[key] = default_data[key]
-            else:
-                data[key] = []
-    
-    # Pastikan struktur peminatan_data benar
-    if 'peminatan_data' in data and isinstance(data['peminatan_data'], list):
-        # Konversi dari list ke dict jika diperlukan
-        peminatan_dict = {}
-        for item in data['peminatan_data']:
-            if 'nama_peminatan' in item:
-                peminatan = item['nama_peminatan']
-                if peminatan not in peminatan_dict:
-                    peminatan_dict[peminatan] = []
-                mk_item = {k: v for k, v in item.items() if k != 'nama_peminatan'}
-                peminatan_dict[peminatan].append(mk_item)
-        data['peminatan_data'] = peminatan_dict
-    
-    return data
+            if prereqs:
+                save_record('prasyarat_data', list(prereqs), rk=kode)
+            elif kode in load_current('prasyarat_data'):
+                delete_record('prasyarat_data', kode)
+        except Exception:
+            state['order'] = None  # urutan sudah memuat edit yang gagal disimpan
+            raise
+        state['version'] = data_versions('prasyarat_data')
+        return None
+
+@depends_on('mk_wajib', 'peminatan_data', 'cpl_data', resource=True, max_entries=INDEX_CACHE_ENTRIES)
+def get_attainment_engine(mk_wajib, peminatan_data, cpl_data):
+    """Bobot MK x CPL bersama untuk versi data saat ini (read-only)"""
+    cpl_codes = [cpl['kode'] for cpl in cpl_data or [] if cpl.get('kode')]
+    return AttainmentEngine(get_curriculum_index(), cpl_codes or None)
+
+@st.cache_resource
+def cpl_aggregates_state():
+    """Agregat capaian CPL yang diperbarui per batch nilai (satu per proses)"""
+    return {'version': None, 'aggregates': None, 'snapshot': None, 'lock': threading.Lock()}
+
+def _current_aggregates(state):
+    version = data_versions('nilai_agregat')
+    if state['aggregates'] is None or state['version'] != version:
+        # Pertama kali, atau diubah dari luar proses ini: bangun dari record batch tersimpan
+        state['aggregates'] = CplAggregates(load_current('nilai_agregat'))
+        state['snapshot'] = None
+        state['version'] = version
+    return state['aggregates']
+
+def get_cpl_aggregates():
+    """Agregat CPL x angkatan x semester untuk dashboard (dibaca langsung, tanpa hitung ulang nilai).
+
+    Yang dikembalikan salinan yang tidak diubah lagi, jadi aman dibaca di luar lock
+    sementara sesi lain menyimpan/menghapus batch; salinan dibuat sekali per perubahan.
+    """
+    state = cpl_aggregates_state()
+    with state['lock']:
+        aggregates = _current_aggregates(state)
+        if state['snapshot'] is None:
+            state['snapshot'] = aggregates.copy()
+        return state['snapshot']
+
+def save_grade_batch(kode, semester, grades):
+    """Tambah/ganti nilai satu MK pada satu semester; hanya baris CPL MK itu yang diperbarui"""
+    record = batch_contribution(get_attainment_engine(), kode, semester, grades)
+    state = cpl_aggregates_state()
+    with state['lock']:
+        aggregates = _current_aggregates(state)
+        save_record('nilai_agregat', record)
+        touched = aggregates.apply(record)
+        state['snapshot'] = None
+        state['version'] = data_versions('nilai_agregat')
+    return touched
+
+def delete_grade_batch(batch):
+    """Hapus nilai satu batch (id) dari agregat"""
+    state = cpl_aggregates_state()
+    with state['lock']:
+        aggregates = _current_aggregates(state)
+        delete_record('nilai_agregat', batch)
+        touched = aggregates.remove(batch)
+        state['snapshot'] = None
+        state['version'] = data_versions('nilai_agregat')
+    return touched
+
+@depends_on('mk_wajib', 'peminatan_data', 'prasyarat_data', resource=True, max_entries=INDEX_CACHE_ENTRIES)
+def get_study_planner(mk_wajib, peminatan_data, prasyarat_data):
+    """Perencana studi bersama untuk versi data saat ini (rencana di-cache per transkrip)"""
+    return StudyPlanner(get_curriculum_index(), get_reachability_index())
 
 def save_data(key, data):
-    """Simpan data ke file JSON"""
+    """Simpan data ke backend penyimpanan (file JSON atau SQLite)"""
     ensure_data_directory()
-    filepath = DATA_FILES.get(key)
-    
-    if filepath:
-        # Jika key adalah peminatan_data dan berupa dict, konversi ke list
-        if key == 'peminatan_data' and isinstance(data, dict):
-            data_to_save = []
-            for peminatan, mk_list in data.items():
-                for mk in mk_list:
-                    mk_copy = mk.copy()
-                    mk_copy['nama_peminatan'] = peminatan
-                    data_to_save.append(mk_copy)
-        else:
-            data_to_save = data
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data_to_save, f, ensure_ascii=False, indent=2)
+    
+    if key in DATA_FILES:
+        # peminatan_data disimpan bersarang apa adanya; list datar (backup lama) dikonversi
+        if key == 'peminatan_data' and isinstance(data, list):
+            data = nest_peminatan(data)
+        data_to_save = data
         
-        # Clear cache agar data terbaru di-load
-        st.cache_data.clear()
+        # Versi koleksi ini berubah, jadi hanya cache yang bergantung padanya yang di-load ulang
+        get_backend().save(key, data_to_save)
+        refresh_manifest(key, data)
         return True
     return False
 
+def refresh_manifest(key, data=None):
+    """Tulis ringkasan koleksi untuk versi barunya; tanpa data, koleksi dibaca lewat cache versi itu"""
+    version = get_backend().version(key)
+    if data is None:
+        data = _load_or_stop(key, version)
+    update_manifest({key: {'version': manifest_version(version), **collection_summary(key, data)}})
+
+def save_record(key, record, rk=None):
+    """Tambah/ubah satu record (upsert berdasarkan id/Kode, atau rk untuk koleksi dict).
+
+    Pada mode journal hanya satu baris log yang ditulis, bukan seluruh koleksi.
+    """
+    ensure_data_directory()
+    rk = rk if rk is not None else record_key(key, record)
+    if rk is None:
+        raise ValueError(f"Record {key} tidak memiliki kunci (id/Kode)")
+    get_backend().upsert(key, rk, record)
+    refresh_manifest(key)
+
+def delete_record(key, rk):
+    """Hapus satu record berdasarkan kuncinya"""
+    ensure_data_directory()
+    get_backend().delete(key, rk)
+    refresh_manifest(key)
+
+# Sidebar
+with st.sidebar:
+    st.image("https://mncu.ac.id/Images/navbar_logo.png", width=200)
+    
+    st.markdown("---")
+    st.markdown("<h2 style='color: #0056A4;'>Navigasi Kurikulum</h2>", unsafe_allow_html=True)
+    
+    # Mode Admin
+    admin_mode = st.checkbox("🔐 Mode Admin", value=False)
+    
+    if admin_mode:
+        st.markdown('<div class="admin-badge">ADMIN MODE AKTIF</div>', unsafe_allow_html=True)
+        menu_options = [
+            "🏠 Dashboard", "👥 Kelola Profil Lulusan", "🎓 Kelola CPL", 
+            "📚 Kelola Mata Kuliah", "🔗 Kelola Prasyarat", "🌐 Kelola MBKM",
+            "📊 Kelola Evaluasi OBE", "📝 Validasi KRS", "📤 Export/Import Data", "ℹ️ Tentang MNCU"
+        ]
+    else:
+        menu_options = [
+            "🏠 Dashboard", "👥 Profil Lulusan", "📚 Struktur Kurikulum", 
+            "🔗 Prasyarat MK", "🌐 Program MBKM", "📝 Simulasi KRS",
+            "📊 Evaluasi OBE", "📤 Export Data", "ℹ️ Tentang MNCU"
+        ]
+    
+    menu = st.selectbox("Pilih Menu:", menu_options)
+    
+    st.markdown("---")
+    
+    # Quick Stats
+    st.markdown("### 📊 Statistik Cepat")
+    
+    try:
+        # Hanya membaca manifest kecil, bukan seluruh koleksi
+        counts = get_counts('pl_data', 'cpl_data', 'mk_wajib', 'peminatan_data')
+        
+        st.metric("Profil Lulusan", counts['pl_data']['count'])
+        st.metric("CPL", counts['cpl_data']['count'])
+        st.metric("Mata Kuliah", counts['mk_wajib']['count'] + counts['peminatan_data']['count'])
+    except StorageError:
+        st.metric("Profil Lulusan", "5")
+        st.metric("CPL", "17")
+        st.metric("Mata Kuliah", "50+")
+    
+    st.markdown("---")
+    st.caption(f"📅 {datetime.now().strftime('%d %B %Y')}")
+    st.caption("Kurikulum OBE 2025 - Prodi Ilmu Komputer")
+
 # ==================== DASHBOARD ====================
+@depends_on('pl_data')
+def figure_distribusi_pl(pl_data):
+    """Bar chart profil lulusan (cache per versi pl_data)"""
+    pl_df = pd.DataFrame(pl_data)
+    if pl_df.empty:
+        return None
+    return px.bar(pl_df, x='profil', y='kode', 
+                  color='profil',
+                  title="",
+                  color_discrete_sequence=px.colors.qualitative.Set3)
+
+@depends_on('cpl_data')
+def figure_domain_cpl(cpl_data):
+    """Pie chart domain CPL (cache per versi cpl_data)"""
+    cpl_df = pd.DataFrame(cpl_data)
+    if cpl_df.empty:
+        return None
+    domain_counts = cpl_df['domain'].value_counts()
+    return px.pie(values=domain_counts.values, 
+                  names=domain_counts.index,
+                  hole=0.4)
+
 def show_dashboard():
-    data = load_all_data()
-    
     col1, col2 = st.columns([3, 1])
     with col1:
         st.markdown('<h1 class="main-header">🎓 KURIKULUM OBE ILMU KOMPUTER MNCU</h1>', unsafe_allow_html=True)
@@ -290,19 +524,20 @@ def show_dashboard():
     with col2:
         st.image("https://mncu.ac.id/Images/navbar_logo.png", width=150)
     
-    # Metrics
+    # Metrics (dari manifest ringkasan)
+    counts = get_counts('pl_data', 'cpl_data', 'mk_wajib', 'peminatan_data', 'mbkm_data')
     col1, col2, col3, col4, col5 = st.columns(5)
     with col1:
-        total_mk = len(data['mk_wajib']) + sum(len(mk_list) for mk_list in data['peminatan_data'].values())
+        total_mk = counts['mk_wajib']['count'] + counts['peminatan_data']['count']
         st.metric("Total MK", str(total_mk))
     with col2:
-        st.metric("Profil Lulusan", len(data['pl_data']))
+        st.metric("Profil Lulusan", counts['pl_data']['count'])
     with col3:
-        st.metric("CPL", len(data['cpl_data']))
+        st.metric("CPL", counts['cpl_data']['count'])
     with col4:
-        st.metric("Peminatan", len(data['peminatan_data']))
+        st.metric("Peminatan", counts['peminatan_data'].get('groups', 0))
     with col5:
-        st.metric("MBKM", len(data.get('mbkm_data', [])))
+        st.metric("MBKM", counts['mbkm_data']['count'])
     
     # Visualisasi
     col1, col2 = st.columns(2)
@@ -310,25 +545,25 @@ def show_dashboard():
     with col1:
         st.markdown('<div class="sub-header">📊 Distribusi Profil Lulusan</div>', unsafe_allow_html=True)
         
-        pl_df = pd.DataFrame(data['pl_data'])
-        if not pl_df.empty:
-            fig = px.bar(pl_df, x='profil', y='kode', 
-                        color='profil',
-                        title="",
-                        color_discrete_sequence=px.colors.qualitative.Set3)
+        fig = figure_distribusi_pl()
+        if fig is not None:
             st.plotly_chart(fig, use_container_width=True)
     
     with col2:
         st.markdown('<div class="sub-header">🎯 Domain CPL</div>', unsafe_allow_html=True)
         
-        cpl_df = pd.DataFrame(data['cpl_data'])
-        if not cpl_df.empty:
-            domain_counts = cpl_df['domain'].value_counts()
-            fig = px.pie(values=domain_counts.values, 
-                        names=domain_counts.index,
-                        hole=0.4)
+        fig = figure_domain_cpl()
+        if fig is not None:
             st.plotly_chart(fig, use_container_width=True)
     
+    # Capaian CPL dari agregat nilai (tanpa membaca ulang nilai mahasiswa)
+    cpl_means = get_cpl_aggregates().cpl_means()
+    if cpl_means:
+        st.markdown('<div class="sub-header">📈 Rata-rata Capaian CPL</div>', unsafe_allow_html=True)
+        fig = px.bar(x=list(cpl_means), y=list(cpl_means.values()), range_y=[0, 100],
+                     labels={'x': 'CPL', 'y': 'Rata-rata capaian'})
+        st.plotly_chart(fig, use_container_width=True)
+    
     # Quick Actions
     st.markdown("---")
     st.markdown('<div class="sub-header">⚡ Akses Cepat</div>', unsafe_allow_html=True)
@@ -426,8 +661,7 @@ def admin_kelola_pl():
                             "icon": icon,
                             "warna": warna
                         }
-                        pl_data.append(new_pl)
-                        save_data('pl_data', pl_data)
+                        save_record('pl_data', new_pl)
                         st.success(f"✅ Profil '{profil}' berhasil ditambahkan!")
                         st.rerun()
     
@@ -518,8 +752,7 @@ def admin_kelola_cpl():
                             "kode": kode,
                             "deskripsi": deskripsi
                         }
-                        cpl_data.append(new_cpl)
-                        save_data('cpl_data', cpl_data)
+                        save_record('cpl_data', new_cpl)
                         st.success(f"✅ CPL '{kode}' berhasil ditambahkan!")
                         st.rerun()
     
@@ -554,12 +787,11 @@ def admin_kelola_cpl():
                                 if st.form_submit_button("💾 Update"):
                                     bk['nama'] = new_nama
                                     bk['deskripsi'] = new_deskripsi
-                                    save_data('bk_data', bk_data)
+                                    save_record('bk_data', bk)
                                     st.success("✅ BK berhasil diupdate!")
                             with col_d:
                                 if st.form_submit_button("🗑️ Hapus", type="secondary"):
-                                    bk_data.remove(bk)
-                                    save_data('bk_data', bk_data)
+                                    delete_record('bk_data', record_key('bk_data', bk))
                                     st.success("✅ BK berhasil dihapus!")
                                     st.rerun()
             else:
@@ -581,8 +813,7 @@ def admin_kelola_cpl():
                             "nama": nama_bk,
                             "deskripsi": deskripsi_bk
                         }
-                        bk_data.append(new_bk)
-                        save_data('bk_data', bk_data)
+                        save_record('bk_data', new_bk)
                         st.success("✅ Bahan Kajian berhasil ditambahkan!")
                         st.rerun()
     
@@ -602,8 +833,7 @@ def admin_kelola_cpl():
                 mk_kode = selected_mk.split(" - ")[0]
                 
                 # Load CPMK untuk MK ini
-                cpmk_data = data.get('cpmk_data', [])
-                mk_cpmk = [cpmk for cpmk in cpmk_data if cpmk.get('mk_kode') == mk_kode]
+                mk_cpmk = get_curriculum_index().cpmk_for(mk_kode)
                 
                 st.markdown(f"**CPMK untuk {selected_mk}**")
                 
@@ -615,13 +845,18 @@ def admin_kelola_cpl():
                     with col2:
                         deskripsi_cpmk = st.text_area("Deskripsi CPMK")
                     
-                    # Pilih CPL yang dicapai
+                    # Pilih CPL yang dicapai (disimpan sebagai kode CPL, label hanya untuk tampilan)
                     st.markdown("**CPL yang Dicapai:**")
-                    cpl_options = [f"{cpl['kode']} - {cpl['deskripsi'][:50]}..." for cpl in cpl_data]
-                    selected_cpl = st.multiselect("Pilih CPL:", cpl_options)
+                    cpl_labels = {cpl['kode']: f"{cpl['kode']} - {cpl['deskripsi'][:50]}..." for cpl in cpl_data}
+                    selected_cpl = st.multiselect("Pilih CPL:", list(cpl_labels), format_func=cpl_labels.get)
+                    bobot_cpl = st.text_input("Bobot CPL (opsional):", placeholder="contoh: KK1=2, P2=1",
+                                              help="Default bobot 1 untuk setiap CPL terpilih")
                     
                     if st.form_submit_button("➕ Tambah CPMK"):
-                        if kode_cpmk and deskripsi_cpmk:
+                        kode_cpmk = kode_cpmk.strip()
+                        if any(cpmk.get('kode') == kode_cpmk for cpmk in mk_cpmk):
+                            st.warning(f"⚠️ {kode_cpmk} sudah ada untuk {mk_kode}!")
+                        elif kode_cpmk and deskripsi_cpmk:
                             new_cpmk = {
                                 "id": str(uuid.uuid4())[:8],
                                 "mk_kode": mk_kode,
@@ -629,8 +864,10 @@ def admin_kelola_cpl():
                                 "deskripsi": deskripsi_cpmk,
                                 "cpl_terkait": selected_cpl
                             }
-                            cpmk_data.append(new_cpmk)
-                            save_data('cpmk_data', cpmk_data)
+                            weights = {code: w for code, w in parse_cpl_weights(bobot_cpl).items() if code in selected_cpl}
+                            if weights:
+                                new_cpmk["cpl_bobot"] = weights
+                            save_record('cpmk_data', new_cpmk)
                             st.success("✅ CPMK berhasil ditambahkan!")
                             st.rerun()
                 
@@ -640,11 +877,13 @@ def admin_kelola_cpl():
                     for cpmk in mk_cpmk:
                         with st.expander(f"{cpmk['kode']} - {cpmk['deskripsi'][:100]}..."):
                             st.write(f"**Deskripsi Lengkap:** {cpmk['deskripsi']}")
-                            st.write(f"**CPL Terkait:** {', '.join(cpmk.get('cpl_terkait', []))}")
+                            bobot = cpmk.get('cpl_bobot') or {}
+                            cpl_terkait = [f"{code} (bobot {bobot[code]:g})" if code in bobot else code
+                                           for code in map(cpl_code, cpmk.get('cpl_terkait', []))]
+                            st.write(f"**CPL Terkait:** {', '.join(cpl_terkait)}")
                             
                             if st.button(f"🗑️ Hapus {cpmk['kode']}", key=f"del_{cpmk['id']}"):
-                                cpmk_data.remove(cpmk)
-                                save_data('cpmk_data', cpmk_data)
+                                delete_record('cpmk_data', cpmk['id'])
                                 st.success("✅ CPMK berhasil dihapus!")
                                 st.rerun()
         else:
@@ -721,8 +960,7 @@ def admin_kelola_mk():
                             "CPL": cpl,
                             "Prasyarat": prasyarat
                         }
-                        mk_wajib.append(new_mk)
-                        save_data('mk_wajib', mk_wajib)
+                        save_record('mk_wajib', new_mk)
                         st.success(f"✅ MK '{nama}' berhasil ditambahkan!")
                         st.rerun()
     
@@ -745,8 +983,7 @@ def admin_kelola_mk():
                         
                         # Hapus peminatan
                         if st.button(f"🗑️ Hapus Peminatan {peminatan}", key=f"del_{peminatan}"):
-                            del peminatan_data[peminatan]
-                            save_data('peminatan_data', peminatan_data)
+                            delete_record('peminatan_data', peminatan)
                             st.success(f"✅ Peminatan '{peminatan}' dihapus!")
                             st.rerun()
             else:
@@ -762,8 +999,7 @@ def admin_kelola_mk():
                 if st.form_submit_button("➕ Buat Peminatan Baru"):
                     if nama_peminatan:
                         if nama_peminatan not in peminatan_data:
-                            peminatan_data[nama_peminatan] = []
-                            save_data('peminatan_data', peminatan_data)
+                            save_record('peminatan_data', [], rk=nama_peminatan)
                             st.success(f"✅ Peminatan '{nama_peminatan}' berhasil dibuat!")
                             st.rerun()
                         else:
@@ -797,31 +1033,32 @@ def admin_kelola_mk():
                                 "CPL": cpl_mk,
                                 "Prasyarat": prasyarat_mk
                             }
-                            peminatan_data[selected_peminatan].append(new_mk)
-                            save_data('peminatan_data', peminatan_data)
+                            # Hanya grup peminatan ini yang ditulis ulang
+                            save_record('peminatan_data', peminatan_data[selected_peminatan] + [new_mk],
+                                        rk=selected_peminatan)
                             st.success(f"✅ MK '{nama_mk}' berhasil ditambahkan ke '{selected_peminatan}'!")
                             st.rerun()
 
 # ==================== ADMIN: KELOLA PRASYARAT ====================
+@depends_on('prasyarat_data', 'mk_wajib', 'peminatan_data')
+def prasyarat_graph_layout(prasyarat_data, mk_wajib, peminatan_data):
+    """Posisi node graph prasyarat berlapis per semester (juga di-cache per hash graph di disk)"""
+    if not isinstance(prasyarat_data, Mapping):
+        prasyarat_data = {}
+    return prasyarat_layout(prasyarat_data, get_curriculum_index())
+
 def admin_kelola_prasyarat():
     st.markdown('<h1 class="main-header">🔗 Kelola Prasyarat Mata Kuliah</h1>', unsafe_allow_html=True)
     
     data = load_all_data()
-    mk_wajib = data['mk_wajib']
-    peminatan_data = data['peminatan_data']
     prasyarat_data = data.get('prasyarat_data', {})
     
-    # Kumpulkan semua MK
-    all_mk = []
-    for mk in mk_wajib:
-        all_mk.append(mk['Kode'])
-    
-    for mk_list in peminatan_data.values():
-        for mk in mk_list:
-            all_mk.append(mk['Kode'])
+    # Semua kode MK (wajib + peminatan) dari index
+    all_mk = get_curriculum_index().all_codes
     
     if all_mk:
-        tab1, tab2 = st.tabs(["🧭 Editor Prasyarat", "🌳 Visualisasi Graph"])
+        tab1, tab2, tab3, tab4 = st.tabs(["🧭 Editor Prasyarat", "🌳 Visualisasi Graph", "📉 Analisis Dampak",
+                                          "📊 Analitik Graph"])
         
         with tab1:
             col1, col2 = st.columns(2)
@@ -835,6 +1072,9 @@ def admin_kelola_prasyarat():
                     current_prereqs = prasyarat_data.get(selected_mk, [])
                     
                     st.markdown(f"**Prasyarat untuk {selected_mk}:**")
+                    chain = get_reachability_index().all_prerequisites(selected_mk)
+                    if chain:
+                        st.caption(f"Rantai prasyarat lengkap: {', '.join(chain)}")
                     
                     # Multi-select untuk prasyarat
                     available_prereqs = [mk for mk in all_mk if mk != selected_mk]
@@ -845,13 +1085,11 @@ def admin_kelola_prasyarat():
                     )
                     
                     if st.button("💾 Simpan Prasyarat", type="primary"):
-                        if new_prereqs:
-                            prasyarat_data[selected_mk] = new_prereqs
-                        elif selected_mk in prasyarat_data:
-                            del prasyarat_data[selected_mk]
-                        
-                        save_data('prasyarat_data', prasyarat_data)
-                        st.success("✅ Prasyarat berhasil disimpan!")
+                        cycle = set_prasyarat(selected_mk, new_prereqs)
+                        if cycle:
+                            st.error(f"❌ Prasyarat membentuk siklus: {' → '.join(cycle)}")
+                        else:
+                            st.success("✅ Prasyarat berhasil disimpan!")
             
             with col2:
                 st.markdown("### Tabel Prasyarat")
@@ -874,65 +1112,88 @@ def admin_kelola_prasyarat():
             st.markdown("### 🌳 Visualisasi Graph Prasyarat")
             
             if prasyarat_data:
-                # Buat graph
-                G = nx.DiGraph()
-                
-                # Tambahkan node dan edges
-                for mk, prereqs in prasyarat_data.items():
-                    for prereq in prereqs:
-                        G.add_edge(prereq, mk)
-                
-                # Buat visualisasi dengan plotly
-                pos = nx.spring_layout(G, seed=42)
-                
-                edge_x = []
-                edge_y = []
-                for edge in G.edges():
-                    x0, y0 = pos[edge[0]]
-                    x1, y1 = pos[edge[1]]
-                    edge_x.extend([x0, x1, None])
-                    edge_y.extend([y0, y1, None])
-                
-                edge_trace = go.Scatter(
-                    x=edge_x, y=edge_y,
-                    line=dict(width=1, color='#888'),
-                    hoverinfo='none',
-                    mode='lines')
-                
-                node_x = []
-                node_y = []
-                node_text = []
-                for node in G.nodes():
-                    x, y = pos[node]
-                    node_x.append(x)
-                    node_y.append(y)
-                    node_text.append(node)
+                # Layout di-cache per versi prasyarat_data (dan per hash graph di disk)
+                pos = prasyarat_graph_layout()
+                edges = prasyarat_edges(prasyarat_data)
                 
-                node_trace = go.Scatter(
-                    x=node_x, y=node_y,
-                    mode='markers+text',
-                    hoverinfo='text',
-                    text=node_text,
-                    textposition="top center",
-                    marker=dict(
-                        showscale=True,
-                        colorscale='Blues',
-                        size=25,
-                        color=list(range(len(G.nodes()))),
-                        line_width=2))
-                
-                fig = go.Figure(data=[edge_trace, node_trace],
-                              layout=go.Layout(
-                                  title='',
-                                  showlegend=False,
-                                  hovermode='closest',
-                                  margin=dict(b=20,l=5,r=5,t=40),
-                                  xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-                                  yaxis=dict(showgrid=False, zeroline=False, showticklabels=False)))
-                
-                st.plotly_chart(fig, use_container_width=True)
+                if is_large_graph(pos):
+                    show_large_prasyarat_graph(pos, edges, get_curriculum_index(), get_reachability_index(),
+                                               colorscale='Blues')
+                else:
+                    fig = prasyarat_figure(pos, edges, colorscale='Blues', size=25, edge_width=1)
+                    st.plotly_chart(fig, use_container_width=True)
             else:
                 st.info("Tidak ada data prasyarat untuk divisualisasikan.")
+        
+        with tab3:
+            st.markdown("### 📉 Analisis Dampak Perubahan MK")
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                impact_mk = st.selectbox("Mata Kuliah:", sorted(set(all_mk)), key="impact_mk")
+            with col2:
+                aksi = st.radio("Usulan:", ["Hapus MK", "Pindah Semester"], key="impact_aksi")
+            with col3:
+                semester_baru = st.number_input("Semester Baru:", 1, 8, 1, key="impact_semester",
+                                                disabled=aksi != "Pindah Semester")
+            
+            report = impact_report(impact_mk, HAPUS if aksi == "Hapus MK" else PINDAH,
+                                   semester_baru if aksi == "Pindah Semester" else None)
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("MK Turunan", len(report["turunan"]))
+            with col2:
+                st.metric("Peminatan Terdampak", len(report["peminatan"]))
+            with col3:
+                st.metric("Pelanggaran Semester", len(report["pelanggaran_semester"]))
+            with col4:
+                st.metric("CPL Kehilangan MK", len(report["cpl_hilang"]))
+            
+            if report["turunan"]:
+                st.markdown("**MK yang terdampak:**")
+                st.dataframe(pd.DataFrame([{
+                    "Kode": kode,
+                    "Relasi": "Langsung" if kode in report["turunan_langsung"] else "Tidak langsung"
+                } for kode in report["turunan"]]), use_container_width=True, hide_index=True)
+            else:
+                st.info("Tidak ada MK lain yang bergantung pada MK ini.")
+            
+            if report["peminatan"]:
+                st.write(f"**Peminatan terdampak:** {', '.join(report['peminatan'])}")
+            if report["pelanggaran_semester"]:
+                st.error(f"❌ Memindahkan {impact_mk} ke semester {semester_baru} merusak urutan prasyarat:")
+                st.dataframe(pd.DataFrame(report["pelanggaran_semester"]), use_container_width=True, hide_index=True)
+            if report["cpl_hilang"]:
+                st.error(f"❌ CPL tanpa MK pendukung jika {impact_mk} dihapus: {', '.join(report['cpl_hilang'])}")
+            if report["cpl_terdampak"]:
+                with st.expander("CPL yang didukung MK ini dan turunannya"):
+                    st.dataframe(pd.DataFrame([{"CPL": cpl, "MK": ", ".join(codes)}
+                                               for cpl, codes in report["cpl_terdampak"].items()]),
+                                 use_container_width=True, hide_index=True)
+        
+        with tab4:
+            st.markdown("### 📊 Analitik Graph Prasyarat")
+            analytics = get_graph_analytics()
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Rantai Terpanjang", f"{analytics.max_depth()} semester")
+            with col2:
+                st.metric("MK dalam Graph", len(analytics.reach.codes))
+            with col3:
+                bottlenecks = analytics.bottlenecks(1)
+                st.metric("Leher Botol Utama", bottlenecks[0]["Kode"] if bottlenecks else "-")
+            
+            st.markdown("**Jalur kritis menuju capstone peminatan:**")
+            if analytics.critical_paths:
+                for peminatan, path in analytics.critical_paths.items():
+                    st.write(f"- **{peminatan}:** {' → '.join(path)}")
+            else:
+                st.info("Belum ada MK peminatan di graph prasyarat.")
+            
+            st.markdown("**Statistik per MK** (urut dari betweenness tertinggi):")
+            st.dataframe(pd.DataFrame(analytics.rows()), use_container_width=True, hide_index=True)
     else:
         st.info("Belum ada Mata Kuliah. Tambahkan MK terlebih dahulu.")
 
@@ -973,20 +1234,28 @@ def admin_kelola_mbkm():
                             col_sub1, col_sub2 = st.columns(2)
                             with col_sub1:
                                 if st.form_submit_button("💾 Update"):
-                                    mbkm_data[i] = {
+                                    updated_mbkm = {
                                         "Kegiatan": kegiatan,
                                         "SKS": sks,
                                         "Semester": semester,
                                         "Deskripsi": deskripsi,
                                         "Jenis": mbkm.get('Jenis', 'Kegiatan')
                                     }
-                                    save_data('mbkm_data', mbkm_data)
+                                    # Nama kegiatan adalah kunci record; jika diganti, record lama dihapus
+                                    old_key = record_key('mbkm_data', mbkm)
+                                    if old_key and old_key != record_key('mbkm_data', updated_mbkm):
+                                        delete_record('mbkm_data', old_key)
+                                    save_record('mbkm_data', updated_mbkm)
                                     st.success("✅ MBKM berhasil diupdate!")
                                     st.rerun()
                             with col_sub2:
                                 if st.form_submit_button("🗑️ Hapus"):
-                                    mbkm_data.pop(i)
-                                    save_data('mbkm_data', mbkm_data)
+                                    mbkm_key = record_key('mbkm_data', mbkm)
+                                    if mbkm_key:
+                                        delete_record('mbkm_data', mbkm_key)
+                                    else:
+                                        mbkm_data.pop(i)
+                                        save_data('mbkm_data', mbkm_data)
                                     st.success("✅ MBKM berhasil dihapus!")
                                     st.rerun()
         else:
@@ -1014,8 +1283,7 @@ def admin_kelola_mbkm():
                         "Deskripsi": deskripsi,
                         "Jenis": jenis
                     }
-                    mbkm_data.append(new_mbkm)
-                    save_data('mbkm_data', mbkm_data)
+                    save_record('mbkm_data', new_mbkm)
                     st.success("✅ Kegiatan MBKM berhasil ditambahkan!")
                     st.rerun()
 
@@ -1025,7 +1293,8 @@ def admin_kelola_evaluasi():
     
     data = load_all_data()
     
-    tab1, tab2, tab3 = st.tabs(["📈 Template Evaluasi", "🎯 Rubrik Penilaian", "📋 Laporan OBE"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📈 Template Evaluasi", "🎯 Rubrik Penilaian", "📋 Laporan OBE",
+                                            "🧮 Capaian CPL dari CPMK", "📥 Nilai per MK"])
     
     with tab1:
         st.markdown("### 📈 Template Evaluasi Pembelajaran")
@@ -1131,6 +1400,181 @@ def admin_kelola_evaluasi():
                 - **Tanggal:** """ + datetime.now().strftime("%d %B %Y") + """
                 - **Status:** Lengkap
                 """)
+    
+    with tab4:
+        st.markdown("### 🧮 Capaian CPL dari Nilai CPMK")
+        
+        matrix = get_cpmk_cpl_matrix()
+        if not matrix.cpmk_keys:
+            st.info("Belum ada CPMK. Tambahkan CPMK dan CPL terkaitnya di menu Kelola CPL.")
+        else:
+            st.caption(f"{len(matrix.cpmk_keys)} CPMK, {len(matrix.cpls)} CPL, "
+                       f"{int((matrix.weights != 0).sum())} relasi CPMK → CPL")
+            with st.expander("Bobot MK × CPL (jumlah bobot CPMK)"):
+                st.dataframe(matrix.course_frame())
+            
+            scores_file = st.file_uploader("Nilai CPMK (kolom NIM, Kode, CPMK, Nilai):", type=['csv', 'xlsx'],
+                                           key="cpmk_scores_file")
+            if scores_file:
+                try:
+                    chunks = [cpmk_scores_long(chunk)
+                              for chunk, _ in iter_table_chunks(scores_file, scores_file.name) if not chunk.empty]
+                except (ValueError, pd.errors.ParserError) as e:
+                    st.error(f"❌ {e}")
+                else:
+                    scores = pd.concat(chunks, ignore_index=True) if chunks else cpmk_scores_long(
+                        pd.DataFrame(columns=['NIM', 'Kode', 'CPMK', 'Nilai']))
+                    attainment = matrix.rollup(scores)
+                    if attainment.empty:
+                        st.warning("Tidak ada nilai untuk CPMK yang terdaftar.")
+                    else:
+                        rata_rata = attainment.mean().dropna()
+                        fig = px.bar(x=rata_rata.index, y=rata_rata.values, range_y=[0, 100],
+                                     labels={'x': 'CPL', 'y': 'Rata-rata capaian'})
+                        st.plotly_chart(fig, use_container_width=True)
+                        st.dataframe(attainment.round(1))
+    
+    with tab5:
+        st.markdown("### 📥 Nilai per Mata Kuliah")
+        st.caption("Nilai satu MK pada satu semester disimpan sebagai satu batch. Upload ulang mengganti batch "
+                   "tersebut; agregat capaian CPL hanya diperbarui untuk CPL yang didukung MK itu.")
+        
+        engine = get_attainment_engine()
+        col1, col2 = st.columns(2)
+        with col1:
+            kode_mk = st.selectbox("Mata Kuliah:", engine.courses, key="batch_mk")
+        with col2:
+            semester_akademik = st.text_input("Semester Akademik:", value="2024/2025 Ganjil", key="batch_semester")
+        
+        batch_file = st.file_uploader("Nilai (kolom NIM, Nilai; opsional Angkatan):", type=['csv'], key="batch_file")
+        if batch_file and semester_akademik and st.button("💾 Simpan Nilai MK", type="primary"):
+            try:
+                grades = grades_long(pd.read_csv(batch_file, dtype=str).assign(Kode=kode_mk))
+            except (ValueError, pd.errors.ParserError) as e:
+                st.error(f"❌ {e}")
+            else:
+                touched = save_grade_batch(kode_mk, semester_akademik.strip(), grades)
+                st.success(f"✅ {len(grades)} nilai {kode_mk} disimpan ({len(touched)} baris agregat diperbarui)")
+        
+        aggregates = get_cpl_aggregates()
+        if aggregates.batches:
+            st.markdown("#### Batch Nilai Tersimpan")
+            batches = pd.DataFrame([{k: record[k] for k in ('id', 'Kode', 'Semester', 'Mahasiswa')}
+                                    for record in aggregates.batches.values()])
+            st.dataframe(batches.drop(columns='id'), hide_index=True)
+            
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                hapus_batch = st.selectbox("Hapus batch:", list(batches['id']),
+                                           format_func=lambda b: b.replace('|', ' — '))
+            with col2:
+                st.write("")
+                if st.button("🗑️ Hapus Batch"):
+                    delete_grade_batch(hapus_batch)
+                    st.rerun()
+            
+            st.markdown("#### Agregat Capaian CPL")
+            st.dataframe(aggregates.frame().round(1), hide_index=True)
+        else:
+            st.info("Belum ada nilai yang disimpan.")
+
+# ==================== ADMIN: VALIDASI KRS ====================
+def admin_validasi_krs():
+    st.markdown('<h1 class="main-header">📝 Validasi KRS Massal</h1>', unsafe_allow_html=True)
+    
+    tab1, tab2 = st.tabs(["✅ Validasi KRS", "🧭 Rencana Studi Massal"])
+    
+    with tab1:
+        st.markdown("""
+        Upload rencana KRS satu angkatan dan transkripnya. Setiap KRS dicek terhadap batas SKS,
+        prasyarat, ketersediaan semester (ganjil/genap) dan keanggotaan peminatan.
+    
+        - **KRS (CSV):** `NIM, Kode` (boleh `Kode` berisi beberapa MK dipisah koma), opsional `Semester`, `Peminatan`
+        - **Transkrip (CSV):** `NIM, Kode` untuk MK yang sudah lulus
+        """)
+    
+        col1, col2 = st.columns(2)
+        with col1:
+            krs_file = st.file_uploader("Rencana KRS:", type=['csv'], key="krs_batch_file")
+        with col2:
+            transcript_file = st.file_uploader("Transkrip:", type=['csv'], key="krs_transcript_file")
+    
+        if krs_file and st.button("▶️ Validasi KRS", type="primary"):
+            try:
+                krs = read_krs_csv(krs_file)
+                transcripts = (read_transcript_csv(transcript_file) if transcript_file
+                               else pd.DataFrame(columns=['NIM', 'Kode']))
+            except ValueError as e:
+                st.error(f"❌ File tidak valid: {e}")
+                return
+        
+            report = validate_krs_batch(krs, transcripts, get_curriculum_index(), load_current('prasyarat_data'))
+            summary = summarize_report(report, krs)
+        
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Mahasiswa", len(summary))
+            with col2:
+                st.metric("KRS Valid", int(summary['Valid'].sum()))
+            with col3:
+                st.metric("Pelanggaran", len(report))
+        
+            if len(report):
+                st.dataframe(report['Jenis'].value_counts().rename_axis('Jenis').reset_index(name='Jumlah'),
+                             hide_index=True)
+                st.dataframe(report.head(1000), use_container_width=True, hide_index=True)
+                st.download_button(
+                    label="📥 Download Laporan Pelanggaran (CSV)",
+                    # Dibangun saat tombol diklik saja, bukan di setiap rerun
+                    data=lambda: report_csv_buffer(report),
+                    file_name="laporan_validasi_krs.csv",
+                    mime="text/csv"
+                )
+            else:
+                st.success("✅ Semua KRS valid!")
+    
+    with tab2:
+        st.markdown("""
+        Buat rencana studi sampai semester 8 untuk banyak mahasiswa (mis. mahasiswa tertinggal atau pindahan).
+        
+        - **Mahasiswa (CSV):** `NIM, Semester, Peminatan`, opsional `MBKM` (semester dipisah koma, mis. `5,6`)
+        - **Transkrip (CSV):** `NIM, Kode` untuk MK yang sudah lulus
+        """)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            students_file = st.file_uploader("Data Mahasiswa:", type=['csv'], key="plan_students_file")
+        with col2:
+            plan_transcript_file = st.file_uploader("Transkrip:", type=['csv'], key="plan_transcript_file")
+        
+        if students_file and st.button("▶️ Buat Rencana Studi", type="primary"):
+            try:
+                students = read_students_csv(students_file)
+                transcripts = (read_transcript_csv(plan_transcript_file) if plan_transcript_file
+                               else pd.DataFrame(columns=['NIM', 'Kode']))
+            except ValueError as e:
+                st.error(f"❌ File tidak valid: {e}")
+                return
+            
+            plans = plan_batch(get_study_planner(), students, transcripts)
+            
+            invalid = plans.loc[plans['Status'] == 'Semester tidak valid', 'NIM'].nunique()
+            failed = plans.loc[~plans['Status'].isin(['OK', 'Semester tidak valid']), 'NIM'].nunique()
+            if invalid:
+                st.warning(f"{invalid} mahasiswa dilewati karena Semester kosong atau di luar 1-8.")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Mahasiswa", plans['NIM'].nunique())
+            with col2:
+                st.metric("Tidak Dapat Selesai", failed)
+            
+            st.dataframe(plans.head(1000), use_container_width=True, hide_index=True)
+            st.download_button(
+                label="📥 Download Rencana Studi (CSV)",
+                data=plans.to_csv(index=False),
+                file_name="rencana_studi.csv",
+                mime="text/csv"
+            )
 
 # ==================== ADMIN: EXPORT/IMPORT DATA ====================
 def admin_export_import():
@@ -1200,7 +1644,7 @@ def admin_export_import():
                         elif option == "Mata Kuliah Wajib":
                             export_data['mata_kuliah_wajib'] = data['mk_wajib']
                     
-                    json_str = json.dumps(export_data, indent=2, ensure_ascii=False)
+                    json_str = json_text(export_data)
                     
                     st.download_button(
                         label="📥 Download JSON File",
@@ -1236,17 +1680,19 @@ def admin_export_import():
                     st.success("✅ Data berhasil diimport!")
             
             elif file_type in ['xlsx', 'xls']:
-                df_dict = pd.read_excel(uploaded_file, sheet_name=None)
-                st.success(f"✅ File Excel berhasil dibaca! Terdapat {len(df_dict)} sheet.")
+                # Preview dibaca per baris (openpyxl read-only), bukan seluruh workbook
+                sheet_names = excel_sheet_names(uploaded_file)
+                st.success(f"✅ File Excel berhasil dibaca! Terdapat {len(sheet_names)} sheet.")
                 
-                for sheet_name, df in df_dict.items():
+                for sheet_name in sheet_names:
                     with st.expander(f"Sheet: {sheet_name}"):
-                        st.dataframe(df.head())
+                        df, _ = next(iter_table_chunks(uploaded_file, uploaded_file.name, 5, sheet_name))
+                        st.dataframe(df)
             
             elif file_type == 'csv':
-                df = pd.read_csv(uploaded_file)
+                df, _ = next(iter_table_chunks(uploaded_file, uploaded_file.name, 5))
                 st.success("✅ File CSV berhasil dibaca!")
-                st.dataframe(df.head())
+                st.dataframe(df)
     
     with tab3:
         st.markdown("### 🔄 Backup & Restore Database")
@@ -1260,18 +1706,19 @@ def admin_export_import():
             if st.button("💾 Buat Backup", type="primary"):
                 # Backup semua data
                 backup_data = {}
-                for key, filepath in DATA_FILES.items():
+                backend = get_backend()
+                for key in DATA_FILES:
                     try:
-                        with open(filepath, 'r', encoding='utf-8') as f:
-                            backup_data[key] = json.load(f)
-                    except:
-                        backup_data[key] = []
+                        backup_data[key] = backend.load(key, [])
+                    except StorageError as e:
+                        # Jangan tulis list kosong untuk data yang rusak, cukup laporkan
+                        st.warning(f"⚠️ {key} dilewati: {e}")
                 
-                # Simpan backup
-                backup_file = f"backups/{backup_name}.json"
+                # Simpan backup dengan codec aktif (.json atau .msgpack)
+                codec = get_codec()
+                backup_file = f"backups/{backup_name}{codec.extension}"
                 os.makedirs("backups", exist_ok=True)
-                with open(backup_file, 'w', encoding='utf-8') as f:
-                    json.dump(backup_data, f, ensure_ascii=False, indent=2)
+                atomic_write_bytes(backup_file, codec.dumps(backup_data))
                 
                 st.success(f"✅ Backup '{backup_name}' berhasil dibuat!")
         
@@ -1281,7 +1728,8 @@ def admin_export_import():
             # List backup yang ada
             backup_files = []
             if os.path.exists("backups"):
-                backup_files = [f for f in os.listdir("backups") if f.endswith('.json')]
+                backup_files = sorted(f for f in os.listdir("backups")
+                                      if f.endswith((JsonCodec.extension, MsgpackCodec.extension)))
             
             if backup_files:
                 selected_backup = st.selectbox("Pilih Backup:", backup_files)
@@ -1289,8 +1737,8 @@ def admin_export_import():
                 if st.button("🔄 Restore Backup", type="primary"):
                     backup_path = f"backups/{selected_backup}"
                     try:
-                        with open(backup_path, 'r', encoding='utf-8') as f:
-                            backup_data = json.load(f)
+                        with open(backup_path, 'rb') as f:
+                            backup_data = codec_for_path(backup_path).loads(f.read())
                         
                         # Restore data
                         for key, data in backup_data.items():
@@ -1306,7 +1754,7 @@ def admin_export_import():
 # ==================== FUNGSI UNTUK USER BIASA ====================
 def show_profil_lulusan_user():
     """Tampilan Profil Lulusan untuk user biasa"""
-    data = load_all_data()
+    data = load_snapshot()
     pl_data = data['pl_data']
     
     st.markdown('<h1 class="main-header">👥 Profil Lulusan Ilmu Komputer MNCU</h1>', unsafe_allow_html=True)
@@ -1338,7 +1786,8 @@ def show_profil_lulusan_user():
 
 def show_struktur_kurikulum_user():
     """Tampilan Struktur Kurikulum untuk user biasa"""
-    data = load_all_data()
+    data = load_snapshot()
+    index = get_curriculum_index()
     
     st.markdown('<h1 class="main-header">📚 Struktur Kurikulum Ilmu Komputer MNCU</h1>', unsafe_allow_html=True)
     
@@ -1347,7 +1796,7 @@ def show_struktur_kurikulum_user():
     
     if semester <= 4:
         # Mata kuliah wajib
-        mk_semester = [mk for mk in data['mk_wajib'] if mk['Semester'] == semester]
+        mk_semester = index.wajib_semester(semester)
         
         st.markdown(f"### Semester {semester} - Mata Kuliah Wajib")
         
@@ -1370,7 +1819,7 @@ def show_struktur_kurikulum_user():
             selected_peminatan = st.selectbox("Pilih Peminatan:", list(data['peminatan_data'].keys()))
             
             if selected_peminatan:
-                mk_peminatan = [mk for mk in data['peminatan_data'][selected_peminatan] if mk['Semester'] == semester]
+                mk_peminatan = index.peminatan_semester(selected_peminatan, semester)
                 
                 for mk in mk_peminatan:
                     with st.expander(f"{mk['Kode']} - {mk['Nama']} ({mk['SKS']} SKS)"):
@@ -1400,6 +1849,8 @@ def main():
             admin_kelola_mbkm()
         elif menu == "📊 Kelola Evaluasi OBE":
             admin_kelola_evaluasi()
+        elif menu == "📝 Validasi KRS":
+            admin_validasi_krs()
         elif menu == "📤 Export/Import Data":
             admin_export_import()
         elif menu == "ℹ️ Tentang MNCU":
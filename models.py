@@ -0,0 +1,235 @@
+"""Model record kurikulum yang ringkas (dataclass dengan __slots__).
+
+Field CPL dan Prasyarat MK ("S1,KU2") diparse sekali menjadi tuple kode
+yang di-intern, sehingga tidak perlu di-split ulang oleh setiap pemakai.
+Konversi from_dict/to_dict lossless terhadap skema JSON yang ada: key yang
+tidak dikenal dan nilai yang bentuknya tidak kanonik disimpan di `extra`.
+
+Model juga berperilaku sebagai Mapping read-only dengan key JSON
+(mk['Kode'], mk.get('CPL')), sehingga load_collection di main.py bisa
+menyimpan model ini menggantikan dict yang dibekukan tanpa mengubah pemakainya.
+"""
+import sys
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+from snapshot import freeze, thaw
+
+_codes_cache = {}
+
+
+def parse_codes(value):
+    """'S1, KU2' -> ('S1', 'KU2'); tuple yang sama dipakai ulang untuk string yang sama"""
+    if not value or not isinstance(value, str):
+        return ()
+    codes = _codes_cache.get(value)
+    if codes is None:
+        codes = tuple(sys.intern(code.strip()) for code in value.split(',') if code.strip())
+        _codes_cache[value] = codes
+    return codes
+
+
+def cpl_code(value):
+    """Label tampilan lama "KK1 - Mengembangkan..." -> kode CPL "KK1" (kode tetap kode)"""
+    if not isinstance(value, str):
+        return value
+    return sys.intern(value.split(' - ', 1)[0].strip())
+
+
+def parse_cpl_weights(value):
+    """'KK1=2, P2=0.5' -> {'KK1': 2.0, 'P2': 0.5}; entri yang tidak valid diabaikan"""
+    weights = {}
+    for part in str(value or '').split(','):
+        code, _, weight = part.partition('=')
+        code = code.strip()
+        try:
+            weight = float(weight)
+        except ValueError:
+            continue
+        if code and weight > 0:
+            weights[sys.intern(code)] = weight
+    return weights
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class _Record(Mapping):
+    """Konversi umum dict <-> model berdasarkan FIELDS, plus akses Mapping read-only"""
+
+    __slots__ = ()
+
+    # (atribut, key JSON)
+    FIELDS = ()
+    # atribut berisi kode: 'comma' = string dipisah koma, 'list' = list JSON
+    CODE_FIELDS = {}
+    # atribut pendek yang sering berulang (kode, domain) di-intern
+    INTERNED = ()
+
+    @classmethod
+    def from_dict(cls, data):
+        attr_by_key = cls._attr_by_key()
+        values = {}
+        extra = {}
+        for key, value in data.items():
+            attr = attr_by_key.get(key)
+            if attr is None or value is None:
+                extra[key] = value
+                continue
+
+            kind = cls.CODE_FIELDS.get(attr)
+            if kind == 'comma':
+                if not isinstance(value, str):
+                    extra[key] = value
+                    continue
+                codes = parse_codes(value)
+                if ','.join(codes) != value:
+                    # Simpan bentuk asli (mis. "S1, KU2") agar to_dict tetap identik
+                    extra[key] = value
+                values[attr] = codes
+            elif kind == 'list':
+                if not isinstance(value, (list, tuple)) or not all(isinstance(v, str) for v in value):
+                    extra[key] = freeze(value)
+                    continue
+                values[attr] = tuple(sys.intern(v) for v in value)
+            else:
+                values[attr] = _intern(value) if attr in cls.INTERNED else freeze(value)
+
+        if extra:
+            values['extra'] = {key: freeze(value) for key, value in extra.items()}
+        return cls(**values)
+
+    def to_dict(self):
+        """Dict biasa sesuai skema JSON (list/dict bersarang bisa diubah)"""
+        return {key: thaw(value) for key, value in self.items()}
+
+    # ---------- Mapping read-only (key JSON) ----------
+    def __getitem__(self, key):
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        attr = self._attr_by_key().get(key)
+        value = getattr(self, attr) if attr is not None else None
+        if value is None:
+            raise KeyError(key)
+        if self.CODE_FIELDS.get(attr) == 'comma':
+            return ','.join(value)
+        return value
+
+    def __iter__(self):
+        for attr, key in self.FIELDS:
+            if getattr(self, attr) is not None and not (self.extra and key in self.extra):
+                yield key
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    @classmethod
+    def _attr_by_key(cls):
+        mapping = cls.__dict__.get('_ATTR_BY_KEY')
+        if mapping is None:
+            mapping = {key: attr for attr, key in cls.FIELDS}
+            setattr(cls, '_ATTR_BY_KEY', mapping)
+        return mapping
+
+
+@dataclass(slots=True, eq=False)
+class MataKuliah(_Record):
+    kode: str = None
+    nama: str = None
+    sks: int = None
+    semester: int = None
+    jenis: str = None
+    cpl: tuple = None
+    prasyarat: tuple = None
+    peminatan: str = None
+    extra: dict = None
+
+    FIELDS = (
+        ('kode', 'Kode'), ('nama', 'Nama'), ('sks', 'SKS'), ('semester', 'Semester'),
+        ('jenis', 'Jenis'), ('cpl', 'CPL'), ('prasyarat', 'Prasyarat'),
+        ('peminatan', 'nama_peminatan')
+    )
+    CODE_FIELDS = {'cpl': 'comma', 'prasyarat': 'comma'}
+    INTERNED = ('kode', 'jenis', 'peminatan')
+
+
+@dataclass(slots=True, eq=False)
+class CPL(_Record):
+    id: str = None
+    domain: str = None
+    kode: str = None
+    deskripsi: str = None
+    extra: dict = None
+
+    FIELDS = (('id', 'id'), ('domain', 'domain'), ('kode', 'kode'), ('deskripsi', 'deskripsi'))
+    INTERNED = ('id', 'domain', 'kode')
+
+
+@dataclass(slots=True, eq=False)
+class ProfilLulusan(_Record):
+    id: str = None
+    kode: str = None
+    profil: str = None
+    deskripsi: str = None
+    icon: str = None
+    warna: str = None
+    extra: dict = None
+
+    FIELDS = (
+        ('id', 'id'), ('kode', 'kode'), ('profil', 'profil'),
+        ('deskripsi', 'deskripsi'), ('icon', 'icon'), ('warna', 'warna')
+    )
+    INTERNED = ('id', 'kode', 'icon', 'warna')
+
+
+@dataclass(slots=True, eq=False)
+class CPMK(_Record):
+    id: str = None
+    mk_kode: str = None
+    kode: str = None
+    deskripsi: str = None
+    cpl_terkait: tuple = None
+    cpl_bobot: dict = None
+    extra: dict = None
+
+    FIELDS = (
+        ('id', 'id'), ('mk_kode', 'mk_kode'), ('kode', 'kode'),
+        ('deskripsi', 'deskripsi'), ('cpl_terkait', 'cpl_terkait'), ('cpl_bobot', 'cpl_bobot')
+    )
+    CODE_FIELDS = {'cpl_terkait': 'list'}
+    INTERNED = ('id', 'mk_kode', 'kode')
+
+
+@dataclass(slots=True, eq=False)
+class BahanKajian(_Record):
+    id: str = None
+    kode: str = None
+    nama: str = None
+    deskripsi: str = None
+    extra: dict = None
+
+    FIELDS = (('id', 'id'), ('kode', 'kode'), ('nama', 'nama'), ('deskripsi', 'deskripsi'))
+    INTERNED = ('id', 'kode')
+
+
+# Model per koleksi (koleksi lain tetap berupa dict)
+COLLECTION_MODELS = {
+    'pl_data': ProfilLulusan,
+    'cpl_data': CPL,
+    'mk_wajib': MataKuliah,
+    'bk_data': BahanKajian,
+    'cpmk_data': CPMK
+}
+
+
+def to_models(model, rows):
+    """List dict -> list model"""
+    return [model.from_dict(row) for row in rows]
+
+
+def to_records(models):
+    """List model -> list dict sesuai skema JSON"""
+    return [m.to_dict() for m in models]
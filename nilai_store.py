@@ -0,0 +1,391 @@
+"""Penyimpanan nilai mahasiswa berformat kolom di disk (dibaca lewat memory map).
+
+Nilai dipartisi per tahun akademik dan MK:
+
+    data/nilai/tahun=2024-2025/kode=ILK101/part-<sesi>-00000.arrow
+
+Setiap part hanya berisi satu semester akademik. Upload bersemester
+mengganti part (semester, MK) yang sama saja; semester lain di tahun yang
+sama tetap ada. Upload tanpa kolom Semester digabung per NIM: nilai baru
+menggantikan nilai lama mahasiswa yang sama untuk MK itu.
+
+NIM, kode MK, semester akademik dan angkatan disimpan sebagai kode integer
+(dictionary encoding, kamus bersama di kamus.json, hanya bertambah), nilai
+sebagai float32. Dengan pyarrow setiap part berupa file Arrow IPC tanpa
+kompresi sehingga bisa di-memory-map tanpa salinan; tanpa pyarrow setiap
+part berupa direktori file .npy per kolom yang dibuka dengan np.load(mmap_mode='r').
+Pembaca hanya membuka kolom dan partisi yang dibutuhkan.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from storage import DATA_DIR, atomic_write_json, file_lock
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:  # fallback: kolom .npy + memmap
+    pa = None
+
+GRADE_STORE_DIR = os.path.join(DATA_DIR, 'nilai')
+FORMAT = os.environ.get('OBE_GRADE_FORMAT', 'arrow' if pa is not None else 'numpy').lower()
+
+# kolom -> dtype; nim/kode/semester/angkatan berisi kode kamus
+COLUMNS = {'nim': np.int32, 'kode': np.int32, 'semester': np.int32, 'angkatan': np.int32, 'nilai': np.float32}
+DICTIONARY_COLUMNS = ('nim', 'kode', 'semester', 'angkatan')
+NO_YEAR = '-'
+BUFFER_ROWS = int(os.environ.get('OBE_GRADE_BUFFER_ROWS', '200000'))  # baris tertahan sebelum part ditulis
+# Part yang sudah diganti baru dihapus oleh writer berikutnya setelah jeda ini,
+# agar pembaca yang masih memegang manifest lama tidak kehilangan file-nya
+OBSOLETE_GRACE_SECONDS = 60
+
+_YEAR_PATTERN = re.compile(r'(\d{4})\s*/\s*(\d{4})')
+
+
+def academic_year(semester):
+    """'2024/2025 Ganjil' -> '2024/2025'; NO_YEAR jika tidak ada tahun akademik"""
+    match = _YEAR_PATTERN.search(str(semester or ''))
+    return f"{match.group(1)}/{match.group(2)}" if match else NO_YEAR
+
+
+def _safe(value):
+    return re.sub(r'[^0-9A-Za-z_.-]', '-', str(value))
+
+
+class GradeStore:
+    """Gudang nilai berpartisi (tahun akademik, MK) di satu direktori"""
+
+    def __init__(self, root=GRADE_STORE_DIR, fmt=None):
+        self.root = root
+        self.format = (fmt or FORMAT) if pa is not None else 'numpy'
+        self._lock = threading.Lock()
+        self._cache = None  # (versi manifest, manifest, kamus)
+
+    # ---------- metadata ----------
+    @property
+    def manifest_path(self):
+        return os.path.join(self.root, 'manifest.json')
+
+    @property
+    def dictionary_path(self):
+        return os.path.join(self.root, 'kamus.json')
+
+    def version(self):
+        """Stamp versi (berubah setiap kali writer selesai); None jika gudang masih kosong"""
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        version = self.version()
+        with self._lock:
+            if self._cache is None or self._cache[0] != version:
+                manifest, dictionary = {'partitions': {}}, {column: [] for column in DICTIONARY_COLUMNS}
+                if version is not None:
+                    with open(self.manifest_path, encoding='utf-8') as f:
+                        manifest = json.load(f)
+                    for info in manifest['partitions'].values():
+                        # Manifest lama: part berupa nama saja (semester campur, dipecah oleh writer)
+                        info['parts'] = [part if isinstance(part, dict) else {'name': part, 'semester': None}
+                                         for part in info['parts']]
+                    with open(self.dictionary_path, encoding='utf-8') as f:
+                        dictionary.update(json.load(f))
+                self._cache = (version, manifest, dictionary)
+            return self._cache[1], self._cache[2]
+
+    def partitions(self, tahun=None, kode=None):
+        """[(tahun, kode, jumlah baris)] yang cocok dengan filter (None = semua)"""
+        manifest, _ = self._load()
+        result = []
+        for info in manifest['partitions'].values():
+            if (tahun is None or info['tahun'] == tahun) and (kode is None or info['kode'] == kode):
+                result.append((info['tahun'], info['kode'], info['rows']))
+        return sorted(result)
+
+    def years(self):
+        return sorted({tahun for tahun, _, _ in self.partitions()})
+
+    def dictionary(self, column):
+        """Kamus satu kolom (list; kode integer = posisi)"""
+        return self._load()[1][column]
+
+    def decode(self, column, codes):
+        return np.asarray(self.dictionary(column), dtype=object)[np.asarray(codes)]
+
+    # ---------- baca ----------
+    def iter_partitions(self, columns=('nim', 'nilai'), tahun=None, kode=None, kodes=None):
+        """(tahun, kode, {kolom: array memmap}) per partisi; hanya kolom dan partisi yang diminta dibuka.
+
+        kodes: himpunan kode MK (mis. MK kurikulum aktif) sebagai alternatif filter kode tunggal.
+        """
+        manifest, _ = self._load()
+        for info in sorted(manifest['partitions'].values(), key=lambda info: (info['tahun'], info['kode'])):
+            if (tahun is not None and info['tahun'] != tahun) or (kode is not None and info['kode'] != kode):
+                continue
+            if (kodes is not None and info['kode'] not in kodes) or not info['parts']:
+                continue
+            parts = [self._read_part(os.path.join(self.root, info['path'], part['name']), columns)
+                     for part in info['parts']]
+            if len(parts) == 1:
+                arrays = parts[0]
+            else:
+                arrays = {column: np.concatenate([part[column] for part in parts]) for column in columns}
+            yield info['tahun'], info['kode'], arrays
+
+    def _read_part(self, path, columns):
+        if path.endswith('.arrow'):
+            table = pa_ipc.open_file(pa.memory_map(path, 'r')).read_all()
+            # to_numpy tanpa salinan: buffer tetap menunjuk ke file yang di-memory-map
+            return {column: table.column(column).combine_chunks().to_numpy(zero_copy_only=True)
+                    for column in columns}
+        return {column: np.load(os.path.join(path, column + '.npy'), mmap_mode='r') for column in columns}
+
+    def read_frame(self, columns=('nim', 'kode', 'nilai'), tahun=None, kode=None, decode=True):
+        """Gabungan partisi sebagai DataFrame (kolom kamus didekode jika decode=True)"""
+        frames = [pd.DataFrame({column: np.asarray(arrays[column]) for column in columns})
+                  for _, _, arrays in self.iter_partitions(columns, tahun, kode)]
+        frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+            {column: np.empty(0, dtype=COLUMNS[column]) for column in columns})
+        if decode:
+            for column in columns:
+                if column in DICTIONARY_COLUMNS:
+                    frame[column] = self.decode(column, frame[column].to_numpy())
+        return frame
+
+    # ---------- tulis ----------
+    def writer(self):
+        """Context manager penulisan; lihat docstring modul untuk aturan ganti/gabung"""
+        return _GradeWriter(self)
+
+    def clear(self):
+        with file_lock(self.root):
+            if os.path.isdir(self.root):
+                for name in os.listdir(self.root):
+                    if name.startswith('tahun='):
+                        shutil.rmtree(os.path.join(self.root, name))
+                for path in (self.manifest_path, self.dictionary_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+
+
+class _GradeWriter:
+    """Satu sesi penulisan (mis. satu upload).
+
+    Baris ditahan per (tahun, semester, MK) lalu ditulis sebagai part bernama
+    unik per sesi. Manifest baru ditulis di akhir sesi; part yang diganti
+    hanya dicatat sebagai usang dan dihapus oleh writer berikutnya setelah
+    OBSOLETE_GRACE_SECONDS, jadi pembaca selalu melihat keadaan utuh.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.rows = 0
+        self.touched = set()
+        self.buffers = {}
+        self.buffer_rows = {}
+        self.buffered = 0
+        self.session = uuid.uuid4().hex[:8]
+        self.counter = 0
+        self.written = []
+        self.obsolete = []
+        self.merges = {}  # (tahun, kode) -> (part lama tanpa semester, [nim baru])
+
+    def __enter__(self):
+        os.makedirs(self.store.root, exist_ok=True)
+        self._lock = file_lock(self.store.root)
+        self._lock.__enter__()
+        self.store._cache = None
+        manifest, dictionary = self.store._load()
+        self.generation = manifest.get('generation', 0) + 1
+        self.manifest = {'generation': self.generation, 'partitions': dict(manifest['partitions']),
+                         'obsolete': list(manifest.get('obsolete', []))}
+        self.dictionary = {column: list(values) for column, values in dictionary.items()}
+        self.positions = {column: {value: i for i, value in enumerate(values)}
+                          for column, values in self.dictionary.items()}
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                for key in list(self.buffers):
+                    self._flush(key)
+                self._merge_unlabeled()
+            if exc_type is None and self.touched:
+                self._purge_obsolete()
+                self.manifest['obsolete'] += [[path, self.generation, time.time()] for path in self.obsolete]
+                atomic_write_json(self.store.manifest_path, self.manifest, ensure_ascii=False)
+            else:
+                for path in self.written:
+                    _remove(os.path.join(self.store.root, path))
+        finally:
+            self.store._cache = None
+            self._lock.__exit__(exc_type, exc, tb)
+        return False
+
+    def _purge_obsolete(self):
+        """Hapus part usang dari writer sebelumnya yang sudah melewati masa tenggang"""
+        cutoff = time.time() - OBSOLETE_GRACE_SECONDS
+        kept = []
+        for path, generation, since in self.manifest['obsolete']:
+            if generation < self.generation and since <= cutoff:
+                _remove(os.path.join(self.store.root, path))
+            else:
+                kept.append([path, generation, since])
+        self.manifest['obsolete'] = kept
+
+    def _encode(self, column, values):
+        """Nilai string -> kode kamus; nilai baru ditambahkan di akhir kamus"""
+        codes, uniques = pd.factorize(pd.Series(values, dtype='string').fillna(NO_YEAR), sort=False)
+        positions = self.positions[column]
+        mapping = np.empty(len(uniques), dtype=np.int32)
+        for i, value in enumerate(uniques):
+            position = positions.get(value)
+            if position is None:
+                position = positions[value] = len(self.dictionary[column])
+                self.dictionary[column].append(value)
+                self._dictionary_dirty = True
+            mapping[i] = position
+        return mapping[codes]
+
+    def write(self, grades):
+        """Tulis nilai format panjang (NIM, Kode, Nilai; opsional Semester, Angkatan)"""
+        if grades.empty:
+            return
+        self._dictionary_dirty = False
+        semester = (grades['Semester'].astype('string').str.strip().replace('', NO_YEAR)
+                    if 'Semester' in grades.columns else pd.Series(NO_YEAR, index=grades.index))
+        angkatan = grades['Angkatan'] if 'Angkatan' in grades.columns else grades['NIM'].astype(str).str[:4]
+        encoded = pd.DataFrame({
+            'nim': self._encode('nim', grades['NIM']),
+            'kode': self._encode('kode', grades['Kode']),
+            'semester': self._encode('semester', semester),
+            'angkatan': self._encode('angkatan', angkatan),
+            'nilai': grades['Nilai'].to_numpy(dtype=np.float32),
+        })
+        # Tahun akademik dihitung per entri kamus semester, bukan per baris
+        years = np.array([academic_year(value) for value in self.dictionary['semester']], dtype=object)
+        encoded['tahun'] = years[encoded['semester'].to_numpy()]
+        # Kamus ditulis sebelum part yang memakai kode barunya
+        if self._dictionary_dirty:
+            atomic_write_json(self.store.dictionary_path, self.dictionary, ensure_ascii=False)
+
+        for (tahun, semester_code, kode_code), part in encoded.groupby(['tahun', 'semester', 'kode'], sort=False):
+            key = (tahun, self.dictionary['semester'][semester_code], self.dictionary['kode'][kode_code])
+            self.buffers.setdefault(key, []).append(part.drop(columns='tahun'))
+            self.buffer_rows[key] = self.buffer_rows.get(key, 0) + len(part)
+            self.buffered += len(part)
+        self.rows += len(encoded)
+        # Buffer per partisi agar part tidak terlalu kecil; total dibatasi BUFFER_ROWS
+        while self.buffered > BUFFER_ROWS:
+            self._flush(max(self.buffer_rows, key=self.buffer_rows.get))
+
+    def _flush(self, key):
+        part = pd.concat(self.buffers.pop(key), ignore_index=True)
+        del self.buffer_rows[key]
+        self.buffered -= len(part)
+        tahun, semester, kode = key
+        if key not in self.touched:
+            self.touched.add(key)
+            old = self._take_parts(tahun, kode, semester)
+            if semester == NO_YEAR:
+                # Tanpa semester: nilai lama digabung di akhir sesi (per NIM), bukan dibuang
+                self.merges[(tahun, kode)] = (old, [])
+            else:
+                self.obsolete += old
+        if semester == NO_YEAR:
+            self.merges[(tahun, kode)][1].append(part['nim'].to_numpy())
+        self._add_part(tahun, kode, semester, part)
+
+    def _take_parts(self, tahun, kode, semester):
+        """Keluarkan part (semester) dari partisi di manifest; mengembalikan path relatifnya"""
+        info = self.manifest['partitions'].get(f"{tahun}|{kode}")
+        if info is None:
+            return []
+        if any(part['semester'] is None for part in info['parts']):
+            info = self._split_legacy(tahun, kode, info)
+        taken = [part for part in info['parts'] if part['semester'] == semester]
+        if taken:
+            parts = [part for part in info['parts'] if part['semester'] != semester]
+            self.manifest['partitions'][f"{tahun}|{kode}"] = {
+                **info, 'parts': parts, 'rows': sum(part['rows'] for part in parts)}
+        return [os.path.join(info['path'], part['name']) for part in taken]
+
+    def _split_legacy(self, tahun, kode, info):
+        """Pecah part format lama (semester campur) menjadi satu part per semester"""
+        legacy = [part for part in info['parts'] if part['semester'] is None]
+        parts = [part for part in info['parts'] if part['semester'] is not None]
+        self.manifest['partitions'][f"{tahun}|{kode}"] = {
+            **info, 'parts': parts, 'rows': sum(part['rows'] for part in parts)}
+        columns = tuple(COLUMNS)
+        for part in legacy:
+            path = os.path.join(info['path'], part['name'])
+            arrays = self.store._read_part(os.path.join(self.store.root, path), columns)
+            frame = pd.DataFrame({column: np.asarray(arrays[column]) for column in columns})
+            for semester_code, rows in frame.groupby('semester', sort=False):
+                self._add_part(tahun, kode, self.dictionary['semester'][semester_code], rows)
+            self.obsolete.append(path)
+        return self.manifest['partitions'][f"{tahun}|{kode}"]
+
+    def _add_part(self, tahun, kode, semester, part):
+        manifest_key = f"{tahun}|{kode}"
+        relative = os.path.join(f"tahun={_safe(tahun)}", f"kode={_safe(kode)}")
+        directory = os.path.join(self.store.root, relative)
+        info = self.manifest['partitions'].get(manifest_key) or {
+            'tahun': tahun, 'kode': kode, 'path': relative, 'parts': [], 'rows': 0}
+        os.makedirs(directory, exist_ok=True)
+        name = self._write_part(directory, f"part-{self.session}-{self.counter:05d}", part)
+        self.counter += 1
+        self.written.append(os.path.join(relative, name))
+        self.manifest['partitions'][manifest_key] = {
+            **info, 'parts': info['parts'] + [{'name': name, 'semester': semester, 'rows': len(part)}],
+            'rows': info['rows'] + len(part)}
+
+    def _merge_unlabeled(self):
+        """Part lama tanpa semester: simpan baris yang NIM-nya tidak ada di upload ini"""
+        columns = tuple(COLUMNS)
+        for (tahun, kode), (old, nims) in self.merges.items():
+            if not old:
+                continue
+            fresh = np.concatenate(nims)
+            for path in old:
+                arrays = self.store._read_part(os.path.join(self.store.root, path), columns)
+                keep = ~np.isin(arrays['nim'], fresh)
+                if keep.any():
+                    self._add_part(tahun, kode, NO_YEAR,
+                                   pd.DataFrame({column: np.asarray(arrays[column])[keep] for column in columns}))
+                self.obsolete.append(path)
+
+    def _write_part(self, directory, name, part):
+        arrays = {column: part[column].to_numpy(dtype=dtype) for column, dtype in COLUMNS.items()}
+        if self.store.format == 'arrow':
+            name += '.arrow'
+            table = pa.table(arrays)
+            fd, tmp_path = tempfile.mkstemp(prefix='.' + name + '.', suffix='.tmp', dir=directory)
+            os.close(fd)
+            with pa.OSFile(tmp_path, 'wb') as sink, pa_ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp_path, os.path.join(directory, name))
+            return name
+        tmp_dir = tempfile.mkdtemp(prefix='.' + name + '.', dir=directory)
+        for column, values in arrays.items():
+            np.save(os.path.join(tmp_dir, column + '.npy'), values)
+        os.replace(tmp_dir, os.path.join(directory, name))
+        return name
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,709 @@
+"""Layout graph prasyarat berlapis per semester (pengganti spring layout).
+
+Node ditempatkan di kolom sesuai semester MK, lalu urutan dalam setiap
+kolom diperbaiki dengan heuristik barycenter agar persilangan edge minimal.
+Hasilnya deterministik dan disimpan per hash graph (memori + data/cache),
+jadi graph yang tidak berubah tidak pernah di-layout dua kali.
+"""
+import hashlib
+import json
+import os
+
+import networkx as nx
+import numpy as np
+import plotly.graph_objects as go
+
+from curriculum import as_semester
+from storage import CACHE_DIR, atomic_write_json
+
+LAYOUT_SWEEPS = 8
+MAX_MEMORY_LAYOUTS = 32
+MAX_DISK_LAYOUTS = 8  # file layout di data/cache; yang paling lama tidak dipakai dihapus
+BETWEENNESS_SAMPLE = 500  # di atas jumlah node ini betweenness dihitung dari sampel sumber
+# Di atas jumlah node ini graph digambar dengan WebGL tanpa label (mode graph besar)
+LARGE_GRAPH_NODES = int(os.environ.get('OBE_LARGE_GRAPH_NODES', '300'))
+
+_layouts = {}
+
+
+def prasyarat_edges(prasyarat_data):
+    """Edge (prasyarat, mk) yang unik dan terurut"""
+    edges = set()
+    for mk, prereqs in (prasyarat_data or {}).items():
+        for prereq in prereqs or []:
+            if prereq and prereq != mk:
+                edges.add((prereq, mk))
+    return sorted(edges)
+
+
+def graph_hash(nodes, edges, semester_of):
+    """Hash isi graph: node, edge dan semester (urutan input tidak berpengaruh)"""
+    payload = json.dumps([sorted(nodes), sorted(edges), sorted(semester_of.items())],
+                         separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def assign_layers(nodes, edges, semester_of):
+    """Lapisan setiap node: semester MK, atau 1 + lapisan prasyarat terdalam"""
+    preds = {node: [] for node in nodes}
+    for u, v in edges:
+        preds[v].append(u)
+
+    layers = {}
+    visiting = set()
+
+    def layer(node):
+        if node in layers:
+            return layers[node]
+        if node in semester_of:
+            layers[node] = semester_of[node]
+            return layers[node]
+        if node in visiting:  # siklus: hentikan rekursi
+            return 0
+        visiting.add(node)
+        value = max((layer(p) + 1 for p in preds[node]), default=0)
+        visiting.discard(node)
+        layers[node] = value
+        return value
+
+    for node in nodes:
+        layer(node)
+    return layers
+
+
+def count_crossings(order, edges, layers):
+    """Jumlah persilangan antar edge yang menghubungkan pasangan lapisan yang sama"""
+    rank = {node: i for column in order.values() for i, node in enumerate(column)}
+    groups = {}
+    for u, v in edges:
+        groups.setdefault((layers[u], layers[v]), []).append((rank[u], rank[v]))
+
+    total = 0
+    for pairs in groups.values():
+        pairs.sort()
+        total += _inversions([b for _, b in pairs])
+    return total
+
+
+def _inversions(values):
+    """Jumlah pasangan terbalik (merge sort, O(n log n))"""
+    if len(values) < 2:
+        return 0
+    mid = len(values) // 2
+    left, right = values[:mid], values[mid:]
+    count = _inversions(left) + _inversions(right)
+    left.sort()
+    right.sort()
+    j = 0
+    for a in left:
+        while j < len(right) and right[j] < a:
+            j += 1
+        count += j
+    return count
+
+
+def order_layers(nodes, edges, layers, sweeps=LAYOUT_SWEEPS):
+    """Urutan node per lapisan dengan persilangan minimal (barycenter naik-turun)"""
+    neighbours = {node: [] for node in nodes}
+    for u, v in edges:
+        neighbours[u].append(v)
+        neighbours[v].append(u)
+
+    order = {}
+    for node in sorted(nodes):
+        order.setdefault(layers[node], []).append(node)
+    layer_keys = sorted(order)
+
+    def positions():
+        # Posisi dipusatkan agar kolom dengan jumlah node berbeda sebanding
+        return {node: i - (len(column) - 1) / 2
+                for column in order.values() for i, node in enumerate(column)}
+
+    best = {k: list(v) for k, v in order.items()}
+    best_crossings = count_crossings(order, edges, layers)
+
+    for sweep in range(sweeps):
+        keys = layer_keys if sweep % 2 == 0 else layer_keys[::-1]
+        for key in keys:
+            pos = positions()
+            column = order[key]
+            current = {node: i for i, node in enumerate(column)}
+
+            def barycenter(node):
+                linked = [pos[n] for n in neighbours[node] if layers[n] != key]
+                return sum(linked) / len(linked) if linked else pos[node]
+
+            column.sort(key=lambda node: (barycenter(node), current[node]))
+
+        crossings = count_crossings(order, edges, layers)
+        if crossings < best_crossings:
+            best = {k: list(v) for k, v in order.items()}
+            best_crossings = crossings
+        if best_crossings == 0:
+            break
+    return best
+
+
+def layered_layout(nodes, edges, semester_of):
+    """Posisi {node: (x, y)}: x = lapisan/semester, y = urutan dalam lapisan"""
+    layers = assign_layers(nodes, edges, semester_of)
+    order = order_layers(nodes, edges, layers)
+    pos = {}
+    for layer, column in order.items():
+        for i, node in enumerate(column):
+            pos[node] = (float(layer), float((len(column) - 1) / 2 - i))
+    return pos
+
+
+def layout_path(digest, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f"prasyarat_layout_{digest}.json")
+
+
+def prune_layouts(cache_dir=CACHE_DIR, keep=MAX_DISK_LAYOUTS):
+    """Hapus file layout lama, sisakan `keep` file yang paling baru dipakai"""
+    try:
+        names = [name for name in os.listdir(cache_dir)
+                 if name.startswith('prasyarat_layout_') and name.endswith('.json')]
+    except OSError:
+        return
+    paths = [os.path.join(cache_dir, name) for name in names]
+    stamps = {}
+    for path in paths:
+        try:
+            stamps[path] = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            pass  # sudah dihapus proses lain
+    for path in sorted(stamps, key=stamps.get, reverse=True)[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def prasyarat_layout(prasyarat_data, index=None, extra_nodes=(), cache_dir=CACHE_DIR):
+    """Layout graph prasyarat, di-cache per hash graph di memori dan di disk.
+
+    index (CurriculumIndex) memberi semester setiap MK; extra_nodes
+    menambahkan MK tanpa relasi prasyarat ke dalam graph.
+    """
+    edges = prasyarat_edges(prasyarat_data)
+    nodes = set(extra_nodes)
+    for u, v in edges:
+        nodes.update((u, v))
+
+    semester_of = {}
+    if index is not None:
+        for node in nodes:
+            mk = index.get(node)
+            semester = as_semester(mk.get('Semester')) if mk else None
+            if semester is not None:
+                semester_of[node] = semester
+
+    digest = graph_hash(nodes, edges, semester_of)
+    if digest in _layouts:
+        return _layouts[digest]
+
+    path = layout_path(digest, cache_dir)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            pos = {node: tuple(xy) for node, xy in json.load(f).items()}
+        os.utime(path)  # tandai baru dipakai agar tidak ikut dipangkas
+    except (OSError, ValueError):
+        pos = None
+
+    if pos is None or set(pos) != nodes:
+        pos = layered_layout(nodes, edges, semester_of)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            atomic_write_json(path, pos)
+        except OSError:
+            pass  # cache disk hanya optimasi; layout tetap dipakai dari memori
+        prune_layouts(cache_dir)
+
+    if len(_layouts) >= MAX_MEMORY_LAYOUTS:
+        _layouts.clear()
+    _layouts[digest] = pos
+    return pos
+
+
+class ReachabilityIndex:
+    """Transitive closure graph prasyarat dalam bentuk bitset (int Python).
+
+    Setiap MK mendapat satu bit; ancestors[i] berisi bit semua prasyarat
+    (langsung maupun tidak langsung) MK ke-i, descendants[i] kebalikannya.
+    Cek "A prasyarat dari B" menjadi satu operasi AND. Objek ini dibagi
+    antar sesi, jadi jangan diubah setelah dibangun.
+    """
+
+    def __init__(self, prasyarat_data, extra_nodes=()):
+        edges = prasyarat_edges(prasyarat_data)
+        nodes = set(extra_nodes)
+        for u, v in edges:
+            nodes.update((u, v))
+
+        preds = {node: [] for node in nodes}
+        succs = {node: [] for node in nodes}
+        for u, v in edges:
+            preds[v].append(u)
+            succs[u].append(v)
+
+        # Urutan topologis (Kahn); node dalam siklus ditaruh di akhir
+        indegree = {node: len(preds[node]) for node in nodes}
+        queue = sorted(node for node in nodes if indegree[node] == 0)
+        order = []
+        while queue:
+            node = queue.pop()
+            order.append(node)
+            for succ in succs[node]:
+                indegree[succ] -= 1
+                if indegree[succ] == 0:
+                    queue.append(succ)
+        cyclic = sorted(nodes - set(order))
+        order.extend(cyclic)
+
+        self.codes = order
+        self.bit = {code: i for i, code in enumerate(order)}
+        self.has_cycle = bool(cyclic)
+
+        n = len(order)
+        self.direct = [0] * n
+        for u, v in edges:
+            self.direct[self.bit[v]] |= 1 << self.bit[u]
+
+        # Prasyarat selalu diproses sebelum MK-nya, jadi satu lintasan cukup
+        self.ancestors = [0] * n
+        for i, code in enumerate(order):
+            mask = self.direct[i]
+            for pred in preds[code]:
+                mask |= self.ancestors[self.bit[pred]]
+            self.ancestors[i] = mask
+        if cyclic:
+            self._close_cycles(preds, cyclic)
+
+        self.descendants = [0] * n
+        for i in range(n):
+            mask = self.ancestors[i]
+            while mask:
+                low = mask & -mask
+                self.descendants[low.bit_length() - 1] |= 1 << i
+                mask ^= low
+
+    def _close_cycles(self, preds, cyclic):
+        """Propagasi ulang sampai stabil untuk node yang berada dalam siklus"""
+        changed = True
+        while changed:
+            changed = False
+            for code in cyclic:
+                i = self.bit[code]
+                mask = self.ancestors[i]
+                for pred in preds[code]:
+                    mask |= self.ancestors[self.bit[pred]]
+                if mask != self.ancestors[i]:
+                    self.ancestors[i] = mask
+                    changed = True
+
+    def __contains__(self, kode):
+        return kode in self.bit
+
+    def mask_of(self, codes):
+        """Bitset dari sekumpulan kode MK (kode yang tidak dikenal diabaikan)"""
+        mask = 0
+        for code in codes:
+            i = self.bit.get(code)
+            if i is not None:
+                mask |= 1 << i
+        return mask
+
+    def codes_of(self, mask):
+        """Kode MK dari bitset, dalam urutan topologis (prasyarat lebih dulu)"""
+        return [self.codes[i] for i in range(mask.bit_length()) if mask >> i & 1]
+
+    def is_prerequisite(self, prereq, kode):
+        """True jika prereq harus lulus (langsung/tidak langsung) sebelum kode"""
+        i, j = self.bit.get(kode), self.bit.get(prereq)
+        if i is None or j is None:
+            return False
+        return bool(self.ancestors[i] >> j & 1)
+
+    def is_direct_prerequisite(self, prereq, kode):
+        i, j = self.bit.get(kode), self.bit.get(prereq)
+        if i is None or j is None:
+            return False
+        return bool(self.direct[i] >> j & 1)
+
+    def all_prerequisites(self, kode):
+        """Seluruh rantai prasyarat suatu MK"""
+        i = self.bit.get(kode)
+        return self.codes_of(self.ancestors[i]) if i is not None else []
+
+    def dependents(self, kode):
+        """Seluruh MK yang (langsung/tidak langsung) membutuhkan kode"""
+        i = self.bit.get(kode)
+        return self.codes_of(self.descendants[i]) if i is not None else []
+
+    def missing(self, kode, passed):
+        """Prasyarat yang belum lulus (seluruh rantai, urut dari yang paling dasar)"""
+        i = self.bit.get(kode)
+        if i is None:
+            return []
+        return self.codes_of(self.ancestors[i] & ~self.mask_of(passed))
+
+    def eligible(self, kode, passed):
+        """Boleh diambil jika semua prasyarat langsung sudah lulus"""
+        i = self.bit.get(kode)
+        if i is None:
+            return True
+        return not self.direct[i] & ~self.mask_of(passed)
+
+
+class PrerequisiteOrder:
+    """Urutan topologis inkremental graph prasyarat (algoritma Pearce–Kelly).
+
+    Urutan dipertahankan antar edit; menambah edge prasyarat -> mk hanya
+    memeriksa node di antara posisi keduanya, bukan seluruh graph.
+    Edge yang membentuk siklus ditolak dan siklusnya dikembalikan.
+    """
+
+    def __init__(self):
+        self.ord = {}
+        self.succ = {}
+        self.pred = {}
+        self.rejected = []  # edge data tersimpan yang membentuk siklus saat dibangun
+
+    @classmethod
+    def from_data(cls, prasyarat_data):
+        order = cls()
+        for mk, prereqs in sorted((prasyarat_data or {}).items()):
+            order.add_node(mk)
+            for prereq in prereqs or []:
+                cycle = order.add_edge(prereq, mk)
+                if cycle:
+                    order.rejected.append((prereq, mk))
+        return order
+
+    def add_node(self, node):
+        if node not in self.ord:
+            self.ord[node] = len(self.ord)
+            self.succ[node] = set()
+            self.pred[node] = set()
+
+    def add_edge(self, u, v):
+        """Tambah edge u -> v; kembalikan siklus [v, ..., u, v] jika ditolak, None jika berhasil"""
+        if u == v:
+            return [u, u]
+        self.add_node(u)
+        self.add_node(v)
+        if v in self.succ[u]:
+            return None
+
+        lower, upper = self.ord[v], self.ord[u]
+        if lower < upper:
+            # Urutan perlu diperbaiki hanya di jendela [ord(v), ord(u)]
+            forward = self._search(v, self.succ, lambda n: self.ord[n] <= upper, target=u)
+            if isinstance(forward, list):
+                return forward + [v]
+            backward = self._search(u, self.pred, lambda n: self.ord[n] >= lower)
+            self._reorder(backward, forward)
+
+        self.succ[u].add(v)
+        self.pred[v].add(u)
+        return None
+
+    def remove_edge(self, u, v):
+        """Hapus edge; urutan yang ada tetap valid"""
+        if u in self.succ:
+            self.succ[u].discard(v)
+        if v in self.pred:
+            self.pred[v].discard(u)
+
+    def set_prerequisites(self, kode, prereqs):
+        """Ganti prasyarat satu MK; jika ada siklus, tidak ada yang berubah dan siklusnya dikembalikan"""
+        self.add_node(kode)
+        old = set(self.pred[kode])
+        new = [p for p in dict.fromkeys(prereqs) if p]
+        for prereq in old - set(new):
+            self.remove_edge(prereq, kode)
+
+        added = []
+        for prereq in new:
+            if prereq in old:
+                continue
+            cycle = self.add_edge(prereq, kode)
+            if cycle:
+                for edge in added:
+                    self.remove_edge(*edge)
+                for prereq_old in old:
+                    self.add_edge(prereq_old, kode)  # graph semula asiklik, jadi selalu berhasil
+                return cycle
+            added.append((prereq, kode))
+        return None
+
+    def topological(self):
+        """Semua node, prasyarat selalu sebelum MK yang membutuhkannya"""
+        return sorted(self.ord, key=self.ord.get)
+
+    def _search(self, start, edges, within, target=None):
+        """DFS dari start di dalam jendela; list path jika target tercapai, selain itu set node"""
+        seen = {start}
+        parent = {start: None}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for nxt in edges[node]:
+                if nxt == target:
+                    path = [target, node]
+                    while parent[path[-1]] is not None:
+                        path.append(parent[path[-1]])
+                    return path[::-1]
+                if nxt not in seen and within(nxt):
+                    seen.add(nxt)
+                    parent[nxt] = node
+                    stack.append(nxt)
+        return seen
+
+    def _reorder(self, backward, forward):
+        """Node yang mencapai u ditaruh sebelum node yang dicapai v, memakai slot yang sama"""
+        backward = sorted(backward, key=self.ord.get)
+        forward = sorted(forward, key=self.ord.get)
+        slots = sorted(self.ord[n] for n in backward + forward)
+        for node, slot in zip(backward + forward, slots):
+            self.ord[node] = slot
+
+
+# ==================== ANALITIK GRAPH ====================
+class GraphAnalytics:
+    """Statistik graph prasyarat yang dihitung sekali per versi data.
+
+    - depth: panjang rantai prasyarat terpanjang sampai MK (= semester minimum)
+    - fan_in/fan_out: jumlah prasyarat langsung / MK yang langsung membutuhkannya
+    - betweenness: betweenness centrality (MK "leher botol" bernilai tinggi)
+    - critical_paths: rantai terpanjang menuju MK puncak (capstone) tiap peminatan
+    """
+
+    def __init__(self, reach, index=None, betweenness_sample=BETWEENNESS_SAMPLE):
+        self.reach = reach
+        n = len(reach.codes)
+        self.fan_in = [bin(mask).count('1') for mask in reach.direct]
+        self.fan_out = [0] * n
+        for mask in reach.direct:
+            for i in _set_bits(mask):
+                self.fan_out[i] += 1
+
+        # reach.codes sudah terurut topologis: prasyarat selalu lebih dulu
+        self.depth = [1] * n
+        self.parent = [None] * n
+        for i in range(n):
+            for j in _set_bits(reach.direct[i]):
+                if j < i and self.depth[j] + 1 > self.depth[i]:
+                    self.depth[i] = self.depth[j] + 1
+                    self.parent[i] = j
+
+        self.betweenness = self._betweenness(betweenness_sample)
+        self.critical_paths = self._critical_paths(index) if index is not None else {}
+
+    def _betweenness(self, sample):
+        graph = nx.DiGraph()
+        graph.add_nodes_from(range(len(self.reach.codes)))
+        for i, mask in enumerate(self.reach.direct):
+            graph.add_edges_from((j, i) for j in _set_bits(mask))
+        # Graph besar memakai sampel sumber (aproksimasi) agar tetap cepat
+        k = sample if sample and len(graph) > sample else None
+        values = nx.betweenness_centrality(graph, k=k, seed=42)
+        return [values[i] for i in range(len(self.reach.codes))]
+
+    def path_to(self, kode):
+        """Rantai prasyarat terpanjang yang berakhir di kode (kritis untuk kelulusan tepat waktu)"""
+        i = self.reach.bit.get(kode)
+        path = []
+        while i is not None:
+            path.append(self.reach.codes[i])
+            i = self.parent[i]
+        return path[::-1]
+
+    def _critical_paths(self, index):
+        paths = {}
+        for peminatan, rows in index.by_peminatan.items():
+            codes = [mk['Kode'] for mk in rows if mk.get('Kode') in self.reach.bit]
+            if not codes:
+                continue
+            # Capstone: MK peminatan dengan rantai terdalam (lalu semester tertinggi)
+            capstone = max(codes, key=lambda kode: (self.depth[self.reach.bit[kode]],
+                                                    as_semester(index.get(kode).get('Semester')) or 0))
+            paths[peminatan] = self.path_to(capstone)
+        return paths
+
+    def rows(self):
+        """Satu baris statistik per MK, urut dari betweenness tertinggi"""
+        rows = [{
+            "Kode": code,
+            "Kedalaman": self.depth[i],
+            "Fan-in": self.fan_in[i],
+            "Fan-out": self.fan_out[i],
+            "Total Turunan": bin(self.reach.descendants[i]).count('1'),
+            "Betweenness": round(self.betweenness[i], 4),
+        } for i, code in enumerate(self.reach.codes)]
+        return sorted(rows, key=lambda row: (-row["Betweenness"], -row["Total Turunan"], row["Kode"]))
+
+    def bottlenecks(self, top=5):
+        return [row for row in self.rows()[:top] if row["Betweenness"] > 0]
+
+    def max_depth(self):
+        return max(self.depth, default=0)
+
+
+def _set_bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+# ==================== FIGURE GRAPH ====================
+def is_large_graph(pos):
+    return len(pos) > LARGE_GRAPH_NODES
+
+
+def graph_arrays(pos, edges):
+    """Koordinat node dan segmen edge sebagai array NumPy (tanpa loop per edge).
+
+    Mengembalikan (codes, node_xy, edge_x, edge_y); edge_x/edge_y berisi
+    pasangan titik yang dipisah NaN sehingga cukup satu trace garis.
+    """
+    codes = list(pos)
+    node_xy = np.array([pos[code] for code in codes], dtype=float).reshape(-1, 2)
+    position = {code: i for i, code in enumerate(codes)}
+    pairs = np.array([(position[u], position[v]) for u, v in edges
+                      if u in position and v in position], dtype=np.intp).reshape(-1, 2)
+
+    segments = np.full((len(pairs), 3, 2), np.nan)
+    segments[:, 0] = node_xy[pairs[:, 0]]
+    segments[:, 1] = node_xy[pairs[:, 1]]
+    segments = segments.reshape(-1, 2)
+    return codes, node_xy, segments[:, 0], segments[:, 1]
+
+
+def _graph_layout(title=''):
+    return go.Layout(
+        title=title,
+        showlegend=False,
+        hovermode='closest',
+        margin=dict(b=20, l=5, r=5, t=40),
+        xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+        yaxis=dict(showgrid=False, zeroline=False, showticklabels=False))
+
+
+def prasyarat_figure(pos, edges, title='', colorscale='Viridis', size=20, edge_width=2):
+    """Graph dengan label kode pada setiap node (untuk graph kecil)"""
+    codes, node_xy, edge_x, edge_y = graph_arrays(pos, edges)
+    edge_trace = go.Scatter(
+        x=edge_x, y=edge_y,
+        line=dict(width=edge_width, color='#888'),
+        hoverinfo='none',
+        mode='lines')
+    node_trace = go.Scatter(
+        x=node_xy[:, 0], y=node_xy[:, 1],
+        mode='markers+text',
+        hoverinfo='text',
+        text=codes,
+        customdata=codes,
+        textposition="top center",
+        marker=dict(
+            showscale=True,
+            colorscale=colorscale,
+            size=size,
+            color=np.arange(len(codes)),
+            line_width=2))
+    return go.Figure(data=[edge_trace, node_trace], layout=_graph_layout(title))
+
+
+def large_prasyarat_figure(pos, edges, title='', colorscale='Viridis'):
+    """Graph besar: WebGL (Scattergl), tanpa label; hover hanya kode MK.
+
+    Detail MK tidak ikut dikirim ke browser, melainkan diambil saat node dipilih.
+    """
+    codes, node_xy, edge_x, edge_y = graph_arrays(pos, edges)
+    edge_trace = go.Scattergl(
+        x=edge_x, y=edge_y,
+        line=dict(width=0.5, color='#bbb'),
+        hoverinfo='skip',
+        mode='lines')
+    node_trace = go.Scattergl(
+        x=node_xy[:, 0], y=node_xy[:, 1],
+        mode='markers',
+        customdata=codes,
+        hovertemplate='%{customdata}<extra></extra>',
+        marker=dict(colorscale=colorscale, size=6, color=node_xy[:, 0]))
+    return go.Figure(data=[edge_trace, node_trace], layout=_graph_layout(title))
+
+
+def node_group(kode, pos, index=None):
+    """Kelompok ringkas suatu node: (semester/lapisan, peminatan atau 'Wajib')"""
+    peminatan = index.peminatan_of.get(kode) if index is not None else None
+    return int(pos[kode][0]), peminatan[0] if peminatan else 'Wajib'
+
+
+def collapsed_prasyarat_figure(pos, edges, index=None, title=''):
+    """Graph ringkas: satu node per (semester, peminatan), tebal edge = jumlah relasi"""
+    members = {}
+    for kode in pos:
+        members.setdefault(node_group(kode, pos, index), []).append(kode)
+    groups = sorted(members)
+
+    rows = {}
+    for semester, name in groups:
+        rows.setdefault(semester, []).append(name)
+    group_pos = {}
+    for semester, names in rows.items():
+        for i, name in enumerate(names):
+            group_pos[(semester, name)] = (float(semester), float((len(names) - 1) / 2 - i))
+
+    weights = {}
+    for u, v in edges:
+        if u in pos and v in pos:
+            key = (node_group(u, pos, index), node_group(v, pos, index))
+            if key[0] != key[1]:
+                weights[key] = weights.get(key, 0) + 1
+
+    edge_trace = go.Scattergl(
+        x=[c for (a, b) in weights for c in (group_pos[a][0], group_pos[b][0], None)],
+        y=[c for (a, b) in weights for c in (group_pos[a][1], group_pos[b][1], None)],
+        line=dict(width=1, color='#888'),
+        hoverinfo='skip',
+        mode='lines')
+    counts = np.array([len(members[g]) for g in groups])
+    node_trace = go.Scatter(
+        x=[group_pos[g][0] for g in groups],
+        y=[group_pos[g][1] for g in groups],
+        mode='markers+text',
+        text=[f"Sem {s} · {name}" for s, name in groups],
+        hovertext=[f"Sem {s} · {name}: {len(members[(s, name)])} MK" for s, name in groups],
+        hoverinfo='text',
+        customdata=[[s, name] for s, name in groups],
+        textposition="top center",
+        marker=dict(size=12 + 30 * np.sqrt(counts / max(counts.max(initial=0), 1)),
+                    color=counts, colorscale='Blues', line_width=1))
+    return go.Figure(data=[edge_trace, node_trace], layout=_graph_layout(title)), members
+
+
+def subgraph(pos, edges, codes):
+    """Posisi dan edge untuk sekumpulan MK beserta tetangga langsungnya"""
+    codes = set(codes)
+    kept = [(u, v) for u, v in edges if u in codes or v in codes]
+    nodes = codes.union(*kept) if kept else codes
+    return {code: pos[code] for code in pos if code in nodes}, kept
+
+
+def mk_detail(kode, index=None, reach=None):
+    """Detail satu MK untuk panel hover/pilih (dimuat hanya saat dibutuhkan)"""
+    mk = index.get(kode) if index is not None else None
+    detail = {"Kode": kode}
+    if mk:
+        detail.update({"Nama": mk.get('Nama', '-'), "SKS": mk.get('SKS', '-'),
+                       "Semester": mk.get('Semester', '-')})
+        peminatan = index.peminatan_of.get(kode)
+        if peminatan:
+            detail["Peminatan"] = ", ".join(peminatan)
+    if reach is not None:
+        detail["Rantai Prasyarat"] = ", ".join(reach.all_prerequisites(kode)) or "-"
+        detail["Dibutuhkan Oleh"] = len(reach.dependents(kode))
+    return detail
@@ -0,0 +1,41 @@
+"""Tampilan Streamlit graph prasyarat yang dipakai bersama main.py dan app.py.
+
+Figure-nya sendiri dibangun di prasyarat.py (tanpa ketergantungan Streamlit).
+"""
+import pandas as pd
+import streamlit as st
+
+from prasyarat import collapsed_prasyarat_figure, is_large_graph, large_prasyarat_figure, mk_detail, prasyarat_figure, subgraph
+
+
+def show_large_prasyarat_graph(pos, edges, index, reach, key="prasyarat_graph", colorscale='Viridis'):
+    """Mode graph besar: WebGL tanpa label, ringkas per semester/peminatan, detail dimuat saat dipilih"""
+    st.caption(f"Mode graph besar: {len(pos)} MK digambar dengan WebGL tanpa label. "
+               "Pilih node untuk melihat detailnya.")
+    view = st.radio("Tampilan:", ["Ringkas (per semester/peminatan)", "Semua MK"],
+                    horizontal=True, key=f"{key}_view")
+
+    if view == "Semua MK":
+        fig = large_prasyarat_figure(pos, edges, colorscale=colorscale)
+    else:
+        fig, members = collapsed_prasyarat_figure(pos, edges, index)
+        event = st.plotly_chart(fig, use_container_width=True, on_select="rerun",
+                                selection_mode="points", key=f"{key}_groups")
+        groups = [p["customdata"] for p in event.selection.points if p.get("customdata")]
+        if not groups:
+            st.info("Pilih satu kelompok untuk membuka MK di dalamnya.")
+            return
+        semester, name = groups[0]
+        st.markdown(f"**Semester {semester} · {name}**")
+        sub_pos, sub_edges = subgraph(pos, edges, members[(semester, name)])
+        if is_large_graph(sub_pos):
+            fig = large_prasyarat_figure(sub_pos, sub_edges, colorscale=colorscale)
+        else:
+            fig = prasyarat_figure(sub_pos, sub_edges, colorscale=colorscale, size=14, edge_width=1)
+
+    event = st.plotly_chart(fig, use_container_width=True, on_select="rerun",
+                            selection_mode="points", key=f"{key}_nodes")
+    selected = [p["customdata"] for p in event.selection.points if isinstance(p.get("customdata"), str)]
+    if selected:
+        st.dataframe(pd.DataFrame([mk_detail(kode, index, reach) for kode in selected]),
+                     use_container_width=True, hide_index=True)
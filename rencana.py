@@ -0,0 +1,287 @@
+"""Generator rencana studi per semester (untuk mahasiswa tertinggal atau pindahan).
+
+Rencana menghormati prasyarat, batas SKS per semester, peminatan yang
+dipilih, semester ganjil/genap pembukaan MK dan semester yang dicadangkan
+untuk MBKM. Pencarian berupa branch-and-bound: setiap semester mencoba
+paket MK seimbang dan penuh lebih dulu, lalu semua paket maksimal lainnya;
+cabang yang secara batas bawah (rantai prasyarat terpanjang, sisa SKS) tidak
+mungkin selesai dipangkas, dan state (semester, sisa MK) yang sudah terbukti
+gagal diingat.
+"""
+import functools
+
+import pandas as pd
+
+from curriculum import as_semester
+from krs import SKS_MAX
+
+TOTAL_SEMESTERS = 8
+MBKM_SKS = 20  # SKS yang dipakai kegiatan MBKM pada semester yang dicadangkan
+PLAN_CACHE_SIZE = 1024
+
+
+class StudyPlanner:
+    """Perencana studi, dibangun sekali per versi data kurikulum/prasyarat (read-only)"""
+
+    def __init__(self, index, reach, sks_max=SKS_MAX, total_semesters=TOTAL_SEMESTERS,
+                 mbkm_sks=MBKM_SKS, respect_parity=True):
+        self.index = index
+        self.reach = reach
+        self.sks_max = sks_max
+        self.total_semesters = total_semesters
+        self.mbkm_sks = mbkm_sks
+        self.respect_parity = respect_parity
+        self._plan = functools.lru_cache(maxsize=PLAN_CACHE_SIZE)(self._plan_uncached)
+
+    def required_codes(self, peminatan, passed=()):
+        """MK wajib + MK peminatan + prasyarat yang dibutuhkan, dikurangi yang sudah lulus"""
+        codes = list(self.index.wajib_codes)
+        codes += [mk['Kode'] for mk in self.index.by_peminatan.get(peminatan, []) if mk.get('Kode')]
+        needed = dict.fromkeys(codes)
+        for kode in codes:
+            needed.update(dict.fromkeys(self.reach.all_prerequisites(kode)))
+        passed = set(passed)
+        return [kode for kode in needed if kode not in passed]
+
+    def plan(self, passed=(), peminatan=None, current_semester=1, mbkm_semesters=()):
+        """Rencana [{"Semester", "MK", "SKS", "MBKM"}] atau None jika tidak mungkin selesai tepat waktu"""
+        return self._plan(frozenset(passed), peminatan, int(current_semester), frozenset(mbkm_semesters))
+
+    def _plan_uncached(self, passed, peminatan, current_semester, mbkm_semesters):
+        codes = self.required_codes(peminatan, passed)
+        semesters = list(range(current_semester, self.total_semesters + 1))
+        search = _PlanSearch(self, codes, semesters, mbkm_semesters)
+        selections = search.run()
+        if selections is None:
+            return None
+        return [
+            {"Semester": semester, "MK": [codes[i] for i in _bits(mask)],
+             "SKS": sum(search.sks[i] for i in _bits(mask)), "MBKM": semester in mbkm_semesters}
+            for semester, mask in zip(semesters, selections)
+        ]
+
+    def cache_info(self):
+        return self._plan.cache_info()
+
+
+class _PlanSearch:
+    """Satu pencarian branch-and-bound; MK diberi indeks lokal 0..n-1 (bitset int)"""
+
+    def __init__(self, planner, codes, semesters, mbkm_semesters):
+        self.codes = codes
+        self.semesters = semesters
+        local = {kode: i for i, kode in enumerate(codes)}
+        n = len(codes)
+
+        self.sks = [int(planner.index.sks(kode) or 0) for kode in codes]
+        self.parity = []
+        for kode in codes:
+            mk = planner.index.get(kode)
+            semester = as_semester(mk.get('Semester')) if mk else None
+            self.parity.append(semester % 2 if planner.respect_parity and semester is not None else None)
+        self.curriculum_semester = [
+            as_semester((planner.index.get(kode) or {}).get('Semester')) or 0 for kode in codes]
+
+        # Prasyarat langsung yang masih harus diambil (MK lain yang sudah lulus diabaikan)
+        self.prereq = [0] * n
+        self.dependents = [[] for _ in range(n)]
+        reach = planner.reach
+        for kode, i in local.items():
+            if kode not in reach:
+                continue
+            for prereq in reach.codes_of(reach.direct[reach.bit[kode]]):
+                j = local.get(prereq)
+                if j is not None:
+                    self.prereq[i] |= 1 << j
+                    self.dependents[j].append(i)
+
+        # Panjang rantai terpanjang yang dimulai dari setiap MK (batas bawah jumlah semester)
+        self.height = [0] * n
+        self.order = self._topological(n)
+        for i in self.order:
+            self.height[i] = 1 + max((self.height[d] for d in self.dependents[i]), default=0)
+        self.order.reverse()  # prasyarat lebih dulu, untuk _earliest_ok
+
+        self.capacity = [planner.sks_max - (planner.mbkm_sks if s in mbkm_semesters else 0)
+                         for s in semesters]
+        self.priority = sorted(range(n), key=lambda i: (-self.height[i], self.curriculum_semester[i],
+                                                        -self.sks[i], codes[i]))
+        self.failed = set()
+
+    def _topological(self, n):
+        """Urutan terbalik (dependents lebih dulu) agar height bisa dihitung satu lintasan"""
+        order, seen = [], set()
+        for start in range(n):
+            if start in seen:
+                continue
+            stack = [(start, iter(self.dependents[start]))]
+            seen.add(start)
+            while stack:
+                node, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    order.append(node)
+                    stack.pop()
+                elif child not in seen:
+                    seen.add(child)
+                    stack.append((child, iter(self.dependents[child])))
+        return order
+
+    def run(self):
+        return self._search(0, (1 << len(self.codes)) - 1)
+
+    def _lower_bound_ok(self, step, remaining):
+        left = len(self.semesters) - step
+        if left <= 0:
+            return False
+        height = max((self.height[i] for i in _bits(remaining)), default=0)
+        if height > left:
+            return False
+        sks = [0, 0, 0]  # SKS per paritas (ganjil/genap/bebas)
+        for i in _bits(remaining):
+            sks[2 if self.parity[i] is None else self.parity[i]] += self.sks[i]
+        room = [0, 0]
+        for semester, capacity in zip(self.semesters[step:], self.capacity[step:]):
+            room[semester % 2] += capacity
+        if sks[0] > room[0] or sks[1] > room[1] or sum(sks) > sum(room):
+            return False
+        return self._earliest_ok(step, remaining)
+
+    def _earliest_ok(self, step, remaining):
+        """Setiap MK sisa harus punya semester paling awal (rantai prasyarat + paritas) dalam batas"""
+        last = len(self.semesters)
+        earliest = {}
+        for i in self.order:
+            if not remaining >> i & 1:
+                continue
+            k = max((earliest[j] + 1 for j in _bits(self.prereq[i] & remaining)), default=step)
+            while k < last and (self.capacity[k] < self.sks[i]
+                                or self.parity[i] not in (None, self.semesters[k] % 2)):
+                k += 1
+            if k >= last:
+                return False
+            earliest[i] = k
+        return True
+
+    def _search(self, step, remaining):
+        if not remaining:
+            return [0] * (len(self.semesters) - step)
+        if (step, remaining) in self.failed or not self._lower_bound_ok(step, remaining):
+            return None
+
+        parity = self.semesters[step] % 2
+        available = [i for i in self.priority
+                     if remaining >> i & 1 and not self.prereq[i] & remaining
+                     and self.parity[i] in (None, parity)]
+
+        for selection in self._candidates(step, remaining, available):
+            rest = self._search(step + 1, remaining & ~selection)
+            if rest is not None:
+                return [selection] + rest
+
+        self.failed.add((step, remaining))
+        return None
+
+    def _candidates(self, step, remaining, available):
+        """Paket MK semester ini: seimbang dan penuh lebih dulu (heuristik), lalu semua paket maksimal.
+
+        Paket maksimal = tidak ada MK layak lain yang masih muat. Cukup paket ini
+        yang dicoba: MK yang muat tapi ditunda selalu bisa dimajukan ke semester
+        ini tanpa membuat rencana yang ada menjadi tidak valid, jadi pencarian
+        tetap lengkap (tidak ada rencana yang terlewat).
+        """
+        capacity = self.capacity[step]
+        active = [c for c in self.capacity[step:] if c > 0]
+        remaining_sks = sum(self.sks[i] for i in _bits(remaining))
+        target = -(-remaining_sks // len(active)) if active else 0
+
+        seen = set()
+        for limit in (min(target, capacity), capacity):
+            mask, load = 0, 0
+            for i in available:
+                if load + self.sks[i] <= limit:
+                    mask |= 1 << i
+                    load += self.sks[i]
+            if mask not in seen:
+                seen.add(mask)
+                yield mask
+        for mask in self._maximal_packages(available, capacity):
+            if mask not in seen:
+                seen.add(mask)
+                yield mask
+
+    def _maximal(self, mask, load, capacity, available):
+        return all(mask >> i & 1 or load + self.sks[i] > capacity for i in available)
+
+    def _maximal_packages(self, available, capacity):
+        """Semua paket maksimal, urut prioritas (MK berprioritas tinggi diambil lebih dulu)"""
+        stack = [(0, 0, 0)]  # (posisi di available, mask, beban SKS)
+        while stack:
+            pos, mask, load = stack.pop()
+            if pos == len(available):
+                if self._maximal(mask, load, capacity, available):
+                    yield mask
+                continue
+            i = available[pos]
+            stack.append((pos + 1, mask, load))  # tanpa MK ini (dicoba belakangan)
+            if load + self.sks[i] <= capacity:
+                stack.append((pos + 1, mask | 1 << i, load + self.sks[i]))
+
+
+def _bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def read_students_csv(source):
+    """Data mahasiswa: kolom NIM, Semester, Peminatan; opsional MBKM (mis. "5,6").
+
+    Semester yang bukan angka menjadi NaN (dilaporkan plan_batch sebagai
+    "Semester tidak valid"); Peminatan kosong berarti hanya MK wajib.
+    """
+    df = pd.read_csv(source, dtype=str, skipinitialspace=True)
+    df.columns = [c.strip() for c in df.columns]
+    missing = [c for c in ('NIM', 'Semester', 'Peminatan') if c not in df.columns]
+    if missing:
+        raise ValueError(f"Kolom wajib tidak ada: {', '.join(missing)}")
+    df['NIM'] = df['NIM'].str.strip()
+    df = df[df['NIM'].notna() & (df['NIM'] != '')].copy()
+    df['Semester'] = pd.to_numeric(df['Semester'], errors='coerce')
+    df['Peminatan'] = df['Peminatan'].str.strip().replace('', None)
+    return df.reset_index(drop=True)
+
+
+def plan_batch(planner, students, transcripts):
+    """Rencana studi banyak mahasiswa sekaligus.
+
+    students: DataFrame NIM, Semester, Peminatan (opsional MBKM: semester dipisah koma);
+    transcripts: DataFrame NIM, Kode. Mahasiswa dengan transkrip, semester dan
+    peminatan yang sama memakai hasil cache yang sama. Mengembalikan DataFrame
+    NIM, Semester, Kode, SKS, MBKM, Status.
+    """
+    passed = transcripts.groupby('NIM')['Kode'].agg(frozenset).to_dict()
+    rows = []
+    for student in students.itertuples(index=False):
+        nim = str(student.NIM)
+        mbkm = getattr(student, 'MBKM', None)
+        mbkm = [int(s) for s in str(mbkm).split(',') if s.strip().isdigit()] if isinstance(mbkm, str) else []
+        semester = student.Semester
+        if pd.isna(semester) or not 1 <= semester <= planner.total_semesters:
+            rows.append({"NIM": nim, "Semester": None, "Kode": None, "SKS": None, "MBKM": False,
+                         "Status": "Semester tidak valid"})
+            continue
+        peminatan = student.Peminatan if isinstance(student.Peminatan, str) else None
+        plan = planner.plan(passed.get(nim, frozenset()), peminatan, int(semester), mbkm)
+        if plan is None:
+            rows.append({"NIM": nim, "Semester": None, "Kode": None, "SKS": None, "MBKM": False,
+                         "Status": "Tidak dapat selesai dalam 8 semester"})
+            continue
+        for semester in plan:
+            for kode in semester["MK"] or [None]:
+                rows.append({"NIM": nim, "Semester": semester["Semester"], "Kode": kode,
+                             "SKS": planner.index.sks(kode) if kode else 0, "MBKM": semester["MBKM"],
+                             "Status": "OK"})
+    return pd.DataFrame(rows, columns=["NIM", "Semester", "Kode", "SKS", "MBKM", "Status"])
+
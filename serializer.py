@@ -0,0 +1,107 @@
+"""Codec untuk file data, backup dan export.
+
+Dipilih lewat environment:
+- OBE_CODEC=json (default) | msgpack  -> format file data dan backup
+- OBE_COMPACT=1                      -> JSON tanpa indentasi
+- OBE_FAST_JSON=0                    -> paksa json stdlib walau orjson terpasang
+
+orjson dan msgpack bersifat opsional; jika tidak terpasang dipakai json stdlib.
+"""
+import json
+import os
+import warnings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+CODEC_NAME = os.environ.get('OBE_CODEC', 'json').lower()
+COMPACT = os.environ.get('OBE_COMPACT', '0').lower() in ('1', 'true', 'yes')
+FAST_JSON = os.environ.get('OBE_FAST_JSON', '1').lower() in ('1', 'true', 'yes')
+
+
+class JsonCodec:
+    """JSON UTF-8; memakai orjson jika tersedia, stdlib sebagai fallback"""
+
+    extension = '.json'
+
+    def __init__(self, compact=COMPACT, fast=FAST_JSON):
+        self.compact = compact
+        self.fast = fast and orjson is not None
+        self.name = ('orjson' if self.fast else 'json') + ('-compact' if compact else '')
+
+    def dumps(self, obj):
+        if self.fast:
+            option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            if not self.compact:
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(obj, option=option)
+        if self.compact:
+            return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+
+    def loads(self, data):
+        if self.fast:
+            return orjson.loads(data)
+        return json.loads(data)
+
+
+class MsgpackCodec:
+    """Biner ringkas (msgpack) untuk file data dan backup"""
+
+    extension = '.msgpack'
+    name = 'msgpack'
+
+    def dumps(self, obj):
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def loads(self, data):
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+def get_codec(name=None, compact=None):
+    """Codec sesuai konfigurasi (msgpack jatuh ke JSON jika paketnya tidak ada)"""
+    name = (name or CODEC_NAME).lower()
+    compact = COMPACT if compact is None else compact
+    if name == 'msgpack':
+        if msgpack is not None:
+            return MsgpackCodec()
+        warnings.warn("msgpack tidak terpasang, memakai JSON")
+    return JsonCodec(compact=compact)
+
+
+def codec_for_path(path):
+    """Codec berdasarkan ekstensi file (untuk membaca backup/data format lain)"""
+    if path.endswith(MsgpackCodec.extension):
+        if msgpack is None:
+            raise ImportError("msgpack diperlukan untuk membaca " + path)
+        return MsgpackCodec()
+    return JsonCodec()
+
+
+def with_extension(path, codec):
+    """data/cpl.json -> data/cpl.msgpack untuk codec biner"""
+    return os.path.splitext(path)[0] + codec.extension
+
+
+_line_codec = JsonCodec(compact=True)
+
+
+def json_text(obj, compact=None):
+    """Teks JSON (str) untuk export/download"""
+    return JsonCodec(compact=COMPACT if compact is None else compact).dumps(obj).decode('utf-8')
+
+
+def json_line(obj):
+    """Satu baris JSON ringkas (journal, kolom SQLite)"""
+    return _line_codec.dumps(obj).decode('utf-8')
+
+
+def parse_json(text):
+    return _line_codec.loads(text)
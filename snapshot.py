@@ -0,0 +1,57 @@
+"""Snapshot data kurikulum read-only yang dibagi antar sesi, plus sesi edit copy-on-write"""
+from collections.abc import Mapping
+from types import MappingProxyType
+
+
+def freeze(value):
+    """Ubah dict/list bertingkat menjadi MappingProxyType/tuple (read-only)"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def thaw(value):
+    """Salinan dict/list biasa yang boleh diubah dari data hasil freeze()"""
+    if isinstance(value, Mapping):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(v) for v in value]
+    return value
+
+
+class LazySnapshot(Mapping):
+    """Mapping koleksi yang baru di-load saat pertama kali diakses"""
+
+    def __init__(self, loader, keys):
+        self._loader = loader
+        self._keys = tuple(keys)
+        self._loaded = {}
+
+    def __getitem__(self, key):
+        if key not in self._loaded:
+            if key not in self._keys:
+                raise KeyError(key)
+            self._loaded[key] = self._prepare(self._loader(key))
+        return self._loaded[key]
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _prepare(self, value):
+        return value
+
+
+class EditSession(LazySnapshot):
+    """Akses data untuk halaman admin: koleksi disalin saat pertama kali dibaca.
+
+    Halaman viewer memakai snapshot bersama secara langsung; hanya koleksi
+    yang benar-benar disentuh halaman admin yang dialokasikan ulang.
+    """
+
+    def _prepare(self, value):
+        return thaw(value)
@@ -0,0 +1,662 @@
+"""Backend penyimpanan data kurikulum (file JSON per koleksi atau SQLite/WAL)"""
+import contextlib
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: tanpa advisory lock
+    fcntl = None
+
+from models import cpl_code
+from serializer import get_codec, json_line, parse_json, with_extension
+
+# ==================== KONFIGURASI ====================
+DATA_DIR = 'data'
+
+DATA_FILES = {
+    'pl_data': 'data/profil_lulusan.json',
+    'cpl_data': 'data/cpl.json',
+    'mk_wajib': 'data/mata_kuliah_wajib.json',
+    'peminatan_data': 'data/peminatan.json',
+    'prasyarat_data': 'data/prasyarat.json',
+    'mbkm_data': 'data/mbkm.json',
+    'bk_data': 'data/bahan_kajian.json',
+    'cpmk_data': 'data/cpmk.json',
+    'nilai_agregat': 'data/nilai_agregat.json'
+}
+
+SQLITE_PATH = os.path.join(DATA_DIR, 'kurikulum.db')
+JOURNAL_DIR = os.path.join(DATA_DIR, 'journal')
+MANIFEST_PATH = os.path.join(DATA_DIR, 'manifest.json')
+CACHE_DIR = os.path.join(DATA_DIR, 'cache')  # hasil turunan (layout graph, dsb.)
+
+# Pilih backend lewat environment: "json" (default), "sqlite" atau "journal"
+STORAGE_BACKEND = os.environ.get('OBE_STORAGE', 'json').lower()
+
+# Ukuran log (byte) yang memicu compaction journal ke snapshot baru
+JOURNAL_COMPACT_BYTES = int(os.environ.get('OBE_JOURNAL_COMPACT_BYTES', 256 * 1024))
+JOURNAL_READ_RETRIES = 3  # pembacaan tanpa lock sebelum menunggu lock penulis
+
+# Field yang dipakai sebagai kunci baris per koleksi (koleksi dict memakai key-nya)
+KEY_FIELDS = {
+    'pl_data': ('id',),
+    'cpl_data': ('id',),
+    'mk_wajib': ('Kode',),
+    'mbkm_data': ('Kegiatan',),
+    'bk_data': ('id',),
+    'cpmk_data': ('id',),
+    'nilai_agregat': ('id',)
+}
+
+# Koleksi yang disimpan sebagai dict {kunci: nilai}, bukan list of record.
+# peminatan_data disimpan bersarang {nama_peminatan: [MK, ...]} sama seperti di memori.
+DICT_COLLECTIONS = {'prasyarat_data', 'peminatan_data'}
+
+
+def nest_peminatan(rows):
+    """Format lama (list datar dengan 'nama_peminatan') -> {peminatan: [MK, ...]}"""
+    nested = {}
+    for item in rows:
+        if 'nama_peminatan' in item:
+            mk_item = {k: v for k, v in item.items() if k != 'nama_peminatan'}
+            nested.setdefault(item['nama_peminatan'], []).append(mk_item)
+    return nested
+
+
+class StorageError(Exception):
+    """Data tersimpan tidak bisa dibaca (file rusak, bukan file yang hilang)"""
+
+
+# ==================== PENULISAN AMAN ====================
+@contextlib.contextmanager
+def file_lock(path):
+    """Advisory lock eksklusif lintas proses lewat file `<path>.lock`.
+
+    Hanya penulis yang mengambil lock; pembaca tidak pernah menunggu karena
+    file data selalu diganti secara atomik.
+    """
+    with open(path + '.lock', 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def atomic_write_json(path, data, **dump_kwargs):
+    """Tulis JSON secara atomik (lihat atomic_write_bytes)"""
+    atomic_write_bytes(path, json.dumps(data, **dump_kwargs).encode('utf-8'))
+
+
+def atomic_write_bytes(path, payload):
+    """Tulis ke file sementara, fsync, lalu rename menggantikan file tujuan"""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp_path)
+        raise
+    _fsync_directory(directory)
+
+
+def _fsync_directory(directory):
+    # Pastikan entri direktori hasil rename ikut tersimpan ke disk
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def record_key(key, record):
+    """Kunci record berdasarkan id/Kode (None jika field kunci kosong)"""
+    parts = []
+    for field in KEY_FIELDS.get(key, ('id',)):
+        value = record.get(field) if isinstance(record, dict) else None
+        if value is None or value == '' or value != value:  # value != value -> NaN
+            return None
+        parts.append(str(value))
+    return '/'.join(parts)
+
+
+def keyed_rows(key, data):
+    """Pasangkan setiap baris dengan kuncinya (kunci kosong/duplikat memakai posisi)"""
+    if isinstance(data, dict):
+        return [(str(k), v) for k, v in data.items()]
+
+    seen = set()
+    result = []
+    for position, row in enumerate(data):
+        rk = record_key(key, row)
+        if rk is None or rk in seen:
+            rk = f'#{position}'
+        seen.add(rk)
+        result.append((rk, row))
+    return result
+
+
+# ==================== BACKEND JSON ====================
+class JsonBackend:
+    """Satu file per koleksi, dikodekan dengan codec aktif (JSON, JSON ringkas atau msgpack)"""
+
+    name = 'json'
+
+    def __init__(self, data_files=DATA_FILES, codec=None):
+        self.data_files = data_files
+        self.codec = codec or get_codec()
+
+    def path(self, key):
+        """Lokasi file koleksi untuk codec aktif (data/cpl.json atau data/cpl.msgpack)"""
+        return with_extension(self.data_files[key], self.codec)
+
+    def ensure(self):
+        """Membuat direktori data dan file kosong jika belum ada"""
+        for key in self.data_files:
+            filepath = self.path(key)
+            directory = os.path.dirname(filepath)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if not os.path.exists(filepath) and not os.path.exists(self.data_files[key]):
+                with file_lock(filepath):
+                    if not os.path.exists(filepath):
+                        self._write(filepath, {} if key in DICT_COLLECTIONS else [])
+
+    def load(self, key, default=None):
+        filepath = self.path(key)
+        codec = self.codec
+        if not os.path.exists(filepath) and os.path.exists(self.data_files[key]):
+            # File JSON lama dibaca sampai koleksi disimpan ulang dengan codec aktif
+            filepath = self.data_files[key]
+            codec = get_codec('json')
+        try:
+            with open(filepath, 'rb') as f:
+                return codec.loads(f.read())
+        except FileNotFoundError:
+            return default
+        except ValueError as e:
+            raise StorageError(f"{filepath} tidak valid: {e}") from e
+
+    def save(self, key, data):
+        filepath = self.path(key)
+        with file_lock(filepath):
+            self._write(filepath, data)
+
+    def _write(self, filepath, data):
+        atomic_write_bytes(filepath, self.codec.dumps(data))
+
+    def version(self, key):
+        """Stamp versi koleksi dari metadata file (mtime, ukuran, inode)"""
+        for filepath in (self.path(key), self.data_files[key]):
+            try:
+                stat = os.stat(filepath)
+            except FileNotFoundError:
+                continue
+            return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        return None
+
+    def upsert(self, key, rk, value):
+        """Tambah/ubah satu baris (JSON tetap menulis ulang seluruh file)"""
+        filepath = self.path(key)
+        with file_lock(filepath):
+            data = self.load(key, {} if key in DICT_COLLECTIONS else [])
+            if isinstance(data, dict):
+                data[rk] = value
+            else:
+                rows = keyed_rows(key, data)
+                for i, (existing_key, _) in enumerate(rows):
+                    if existing_key == rk:
+                        data[i] = value
+                        break
+                else:
+                    data.append(value)
+            self._write(filepath, data)
+
+    def delete(self, key, rk):
+        filepath = self.path(key)
+        with file_lock(filepath):
+            data = self.load(key, {} if key in DICT_COLLECTIONS else [])
+            if isinstance(data, dict):
+                data.pop(rk, None)
+            else:
+                data = [row for existing_key, row in keyed_rows(key, data) if existing_key != rk]
+            self._write(filepath, data)
+
+
+# ==================== BACKEND JOURNAL ====================
+class JournalBackend(JsonBackend):
+    """Snapshot JSON + log operasi append-only per koleksi.
+
+    upsert/delete hanya menambahkan satu baris ke `data/journal/<koleksi>.log`
+    (biaya O(perubahan)). State = snapshot + replay log; compaction di thread
+    latar belakang melipat log ke snapshot baru setelah melewati ambang ukuran.
+    """
+
+    name = 'journal'
+
+    def __init__(self, data_files=DATA_FILES, journal_dir=JOURNAL_DIR,
+                 compact_bytes=JOURNAL_COMPACT_BYTES, codec=None):
+        super().__init__(data_files, codec)
+        self.journal_dir = journal_dir
+        self.compact_bytes = compact_bytes
+        self._compacting = set()
+        self._compacting_lock = threading.Lock()
+
+    def log_path(self, key):
+        return os.path.join(self.journal_dir, key + '.log')
+
+    def ensure(self):
+        super().ensure()
+        os.makedirs(self.journal_dir, exist_ok=True)
+
+    def load(self, key, default=None):
+        # Snapshot dibaca lebih dulu, lalu log. Jika save()/compaction mengganti snapshot
+        # di antaranya (stamp berubah), log yang terbaca bisa milik generasi lain: ulangi.
+        # Setelah beberapa kali gagal, baca di bawah lock penulis.
+        for _ in range(JOURNAL_READ_RETRIES):
+            stamp = super().version(key)
+            snapshot = super().load(key, default)
+            ops = self._read_log(key)
+            if super().version(key) == stamp:
+                return _replay(key, snapshot, ops) if ops else snapshot
+        with file_lock(self.path(key)):
+            snapshot = super().load(key, default)
+            ops = self._read_log(key)
+        return _replay(key, snapshot, ops) if ops else snapshot
+
+    def save(self, key, data):
+        """Simpan penuh = snapshot baru dan log dikosongkan"""
+        filepath = self.path(key)
+        with file_lock(filepath):
+            self._write(filepath, data)
+            self._truncate_log(key)
+
+    def upsert(self, key, rk, value):
+        self._append(key, {'op': 'upsert', 'key': rk, 'value': value})
+
+    def delete(self, key, rk):
+        self._append(key, {'op': 'delete', 'key': rk})
+
+    def version(self, key):
+        try:
+            log_stat = os.stat(self.log_path(key))
+            log_version = (log_stat.st_mtime_ns, log_stat.st_size, log_stat.st_ino)
+        except FileNotFoundError:
+            log_version = None
+        return (super().version(key), log_version)
+
+    def compact(self, key):
+        """Lipat log ke snapshot baru (dipanggil otomatis oleh compactor)"""
+        filepath = self.path(key)
+        with file_lock(filepath):
+            ops = self._read_log(key)
+            if not ops:
+                return False
+            snapshot = super().load(key, {} if key in DICT_COLLECTIONS else [])
+            self._write(filepath, _replay(key, snapshot, ops))
+            self._truncate_log(key)
+        return True
+
+    def _append(self, key, op):
+        line = json_line(op) + '\n'
+        with file_lock(self.path(key)):
+            with open(self.log_path(key), 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+        if size >= self.compact_bytes:
+            self._schedule_compaction(key)
+
+    def _schedule_compaction(self, key):
+        with self._compacting_lock:
+            if key in self._compacting:
+                return
+            self._compacting.add(key)
+
+        def run():
+            try:
+                self.compact(key)
+            finally:
+                with self._compacting_lock:
+                    self._compacting.discard(key)
+
+        threading.Thread(target=run, name=f'journal-compact-{key}', daemon=True).start()
+
+    def _read_log(self, key):
+        try:
+            with open(self.log_path(key), 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+
+        ops = []
+        for i, line in enumerate(lines):
+            try:
+                ops.append(parse_json(line))
+            except ValueError as e:
+                # Baris terakhir yang terpotong (crash saat append) diabaikan
+                if i == len(lines) - 1:
+                    break
+                raise StorageError(f"{self.log_path(key)} baris {i + 1} tidak valid: {e}") from e
+        return ops
+
+    def _truncate_log(self, key):
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.log_path(key))
+
+
+def _replay(key, snapshot, ops):
+    """Terapkan operasi log secara berurutan ke snapshot"""
+    is_dict = isinstance(snapshot, dict) or (not snapshot and key in DICT_COLLECTIONS)
+    rows = dict(keyed_rows(key, snapshot or ({} if is_dict else [])))
+    for op in ops:
+        if op['op'] == 'upsert':
+            rows[op['key']] = op['value']
+        elif op['op'] == 'delete':
+            rows.pop(op['key'], None)
+    if is_dict:
+        return rows
+    return list(rows.values())
+
+
+# ==================== BACKEND SQLITE ====================
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS collections (
+    name TEXT PRIMARY KEY,
+    shape TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    collection TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    PRIMARY KEY (collection, row_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS records_position ON records (collection, position);
+CREATE TABLE IF NOT EXISTS versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+
+class SqliteBackend:
+    """Semua koleksi dalam satu database SQLite (mode WAL), satu baris per record"""
+
+    name = 'sqlite'
+
+    def __init__(self, path=SQLITE_PATH, data_files=DATA_FILES):
+        self.path = path
+        self.data_files = data_files
+        self._local = threading.local()
+
+    def _connect(self):
+        # sqlite3.Connection tidak boleh dipakai lintas thread (tiap sesi Streamlit = thread)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def ensure(self):
+        """Database dibuat otomatis; migrasi dari JSON jika database masih kosong"""
+        conn = self._connect()
+        empty = conn.execute('SELECT COUNT(*) FROM collections').fetchone()[0] == 0
+        source = JournalBackend(self.data_files)
+        if empty and any(source.version(key) != (None, None) for key in self.data_files):
+            migrate_json_to_sqlite(self, self.data_files)
+
+    def load(self, key, default=None):
+        conn = self._connect()
+        shape = conn.execute('SELECT shape FROM collections WHERE name = ?', (key,)).fetchone()
+        if shape is None:
+            return default
+
+        rows = conn.execute(
+            'SELECT row_key, body FROM records WHERE collection = ? ORDER BY position',
+            (key,)
+        ).fetchall()
+        if shape[0] == 'dict':
+            return {rk: parse_json(body) for rk, body in rows}
+        return [parse_json(body) for _, body in rows]
+
+    def save(self, key, data):
+        """Simpan seluruh koleksi, tetapi hanya baris yang berubah yang ditulis"""
+        shape = 'dict' if isinstance(data, dict) else 'list'
+        new_rows = keyed_rows(key, data)
+
+        conn = self._connect()
+        with _transaction(conn):
+            conn.execute(
+                'INSERT INTO collections (name, shape) VALUES (?, ?) '
+                'ON CONFLICT(name) DO UPDATE SET shape = excluded.shape',
+                (key, shape)
+            )
+            existing = {
+                rk: (position, body)
+                for rk, position, body in conn.execute(
+                    'SELECT row_key, position, body FROM records WHERE collection = ?', (key,)
+                )
+            }
+
+            new_keys = set()
+            changed = []
+            for position, (rk, value) in enumerate(new_rows):
+                new_keys.add(rk)
+                body = json_line(value)
+                if existing.get(rk) != (position, body):
+                    changed.append((key, rk, position, body))
+
+            removed = [(key, rk) for rk in existing if rk not in new_keys]
+            if removed or changed:
+                _bump_version(conn, key)
+            if removed:
+                conn.executemany('DELETE FROM records WHERE collection = ? AND row_key = ?', removed)
+            if changed:
+                conn.executemany(
+                    'INSERT INTO records (collection, row_key, position, body) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT(collection, row_key) DO UPDATE SET '
+                    'position = excluded.position, body = excluded.body',
+                    changed
+                )
+
+    def upsert(self, key, rk, value):
+        """Tambah/ubah satu baris berdasarkan kuncinya"""
+        conn = self._connect()
+        body = json_line(value)
+        shape = 'dict' if key in DICT_COLLECTIONS else 'list'
+        with _transaction(conn):
+            conn.execute(
+                'INSERT INTO collections (name, shape) VALUES (?, ?) ON CONFLICT(name) DO NOTHING',
+                (key, shape)
+            )
+            updated = conn.execute(
+                'UPDATE records SET body = ? WHERE collection = ? AND row_key = ?',
+                (body, key, rk)
+            ).rowcount
+            if not updated:
+                next_position = conn.execute(
+                    'SELECT COALESCE(MAX(position) + 1, 0) FROM records WHERE collection = ?',
+                    (key,)
+                ).fetchone()[0]
+                conn.execute(
+                    'INSERT INTO records (collection, row_key, position, body) VALUES (?, ?, ?, ?)',
+                    (key, rk, next_position, body)
+                )
+            _bump_version(conn, key)
+
+    def delete(self, key, rk):
+        conn = self._connect()
+        with _transaction(conn):
+            deleted = conn.execute(
+                'DELETE FROM records WHERE collection = ? AND row_key = ?', (key, rk)
+            ).rowcount
+            if deleted:
+                _bump_version(conn, key)
+
+    def version(self, key):
+        """Nomor versi koleksi, naik setiap kali koleksi berubah"""
+        row = self._connect().execute(
+            'SELECT version FROM versions WHERE name = ?', (key,)
+        ).fetchone()
+        return row[0] if row else 0
+
+
+def _bump_version(conn, key):
+    conn.execute(
+        'INSERT INTO versions (name, version) VALUES (?, 1) '
+        'ON CONFLICT(name) DO UPDATE SET version = version + 1',
+        (key,)
+    )
+
+
+class _transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK untuk koneksi autocommit"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+
+# ==================== MANIFEST RINGKASAN ====================
+def read_manifest(path=MANIFEST_PATH):
+    """Ringkasan per koleksi {key: {'version': ..., 'count': ...}} (kosong jika belum ada)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def update_manifest(entries, path=MANIFEST_PATH):
+    """Gabungkan entri ringkasan baru ke manifest"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with file_lock(path):
+        manifest = read_manifest(path)
+        manifest.update(entries)
+        atomic_write_json(path, manifest, ensure_ascii=False)
+
+
+def manifest_version(version):
+    """Bentuk versi seperti yang tersimpan di JSON (tuple -> list)"""
+    return json.loads(json.dumps(version))
+
+
+# ==================== MIGRASI & PEMILIHAN BACKEND ====================
+def migrate_json_to_sqlite(backend=None, data_files=DATA_FILES, journal_dir=JOURNAL_DIR):
+    """Salin semua koleksi JSON ke database SQLite (sekali jalan).
+
+    Dibaca lewat JournalBackend: snapshot data/*.json + log data/journal/*.log
+    yang belum di-compact, jadi perubahan mode journal ikut termigrasi.
+    """
+    backend = backend or SqliteBackend(data_files=data_files)
+    source = JournalBackend(data_files, journal_dir)
+    migrated = {}
+    for key in data_files:
+        data = source.load(key)
+        if data is None:
+            continue
+        if key == 'peminatan_data' and isinstance(data, list):
+            data = nest_peminatan(data)
+        backend.save(key, data)
+        migrated[key] = len(data)
+    return migrated
+
+
+def normalize_cpmk_links(rows):
+    """cpl_terkait format lama (label "KK1 - Mengembangkan...") -> kode CPL; None jika sudah normal"""
+    changed = False
+    normalized = []
+    for item in rows:
+        links = item.get('cpl_terkait') if isinstance(item, dict) else None
+        if isinstance(links, list):
+            codes = list(dict.fromkeys(cpl_code(link) for link in links))
+            if codes != links:
+                item = {**item, 'cpl_terkait': codes}
+                changed = True
+        normalized.append(item)
+    return normalized if changed else None
+
+
+def upgrade_legacy_formats(backend):
+    """Migrasi transparan format lama (sekali per proses).
+
+    - peminatan datar -> bersarang
+    - cpl_terkait CPMK berupa label tampilan -> kode CPL
+    """
+    data = backend.load('peminatan_data')
+    if isinstance(data, list) and data:
+        backend.save('peminatan_data', nest_peminatan(data))
+    cpmk_data = backend.load('cpmk_data')
+    if isinstance(cpmk_data, list):
+        normalized = normalize_cpmk_links(cpmk_data)
+        if normalized is not None:
+            backend.save('cpmk_data', normalized)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Backend aktif (dibuat sekali per proses)"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if STORAGE_BACKEND == 'sqlite':
+                    backend = SqliteBackend()
+                elif STORAGE_BACKEND == 'journal':
+                    backend = JournalBackend()
+                else:
+                    backend = JsonBackend()
+                backend.ensure()
+                upgrade_legacy_formats(backend)
+                _backend = backend
+    return _backend
+
+
+if __name__ == '__main__':
+    # python storage.py migrate [path_db]
+    if len(sys.argv) >= 2 and sys.argv[1] == 'migrate':
+        db_path = sys.argv[2] if len(sys.argv) > 2 else SQLITE_PATH
+        result = migrate_json_to_sqlite(SqliteBackend(db_path))
+        for key, count in result.items():
+            print(f"{key}: {count} record")
+        print(f"✅ Migrasi selesai ke {db_path}")
+    else:
+        print("Penggunaan: python storage.py migrate [path_db]")
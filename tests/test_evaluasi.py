@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from curriculum import CurriculumIndex
+from evaluasi import (PASSING_ATTAINMENT, AttainmentEngine, CplAggregates, CpmkCplMatrix, batch_contribution,
+                      cohort_summary)
+
+MK = [
+    {'Kode': 'A', 'Nama': 'A', 'SKS': 3, 'Semester': 1, 'CPL': 'S1, KK1'},
+    {'Kode': 'B', 'Nama': 'B', 'SKS': 3, 'Semester': 2, 'CPL': 'KK1'},
+    {'Kode': 'C', 'Nama': 'C', 'SKS': 2, 'Semester': 3, 'CPL': 'P1'},
+]
+
+
+@pytest.fixture
+def engine():
+    return AttainmentEngine(CurriculumIndex(MK))
+
+
+def test_attainment_matches_hand_rollup(engine):
+    grades = pd.DataFrame({
+        'NIM': ['2021001', '2021001', '2021001', '2022001', '2022001', '2022001'],
+        'Kode': ['A', 'A', 'B', 'B', 'C', 'X99'],
+        'Nilai': [60.0, 80.0, 70.0, 50.0, 90.0, 100.0],
+    })
+    result = engine.attainment(grades)
+
+    # Mengulang: nilai tertinggi (A=80); MK di luar kurikulum (X99) diabaikan
+    assert list(result.columns) == ['S1', 'P1', 'KK1']
+    assert result.loc['2021001', 'S1'] == 80
+    assert result.loc['2021001', 'KK1'] == pytest.approx((80 + 70) / 2)
+    assert np.isnan(result.loc['2021001', 'P1'])
+    assert np.isnan(result.loc['2022001', 'S1'])
+    assert result.loc['2022001', 'KK1'] == 50
+    assert result.loc['2022001', 'P1'] == 90
+
+    summary = cohort_summary(result).set_index(['Angkatan', 'CPL'])
+    assert summary.loc[('2021', 'KK1'), 'Rata-rata'] == pytest.approx(75)
+    assert summary.loc[('2021', 'KK1'), '% Tercapai'] == 100
+    assert summary.loc[('2022', 'KK1'), '% Tercapai'] == 0
+    assert ('2021', 'P1') not in summary.index  # belum ada MK pendukung yang diambil
+
+
+def test_cpmk_rollup_uses_weights():
+    matrix = CpmkCplMatrix([
+        {'mk_kode': 'A', 'kode': 'CPMK1', 'cpl_terkait': ['S1', 'KK1'], 'cpl_bobot': {'S1': 2}},
+        {'mk_kode': 'A', 'kode': 'CPMK2', 'cpl_terkait': ['S1']},
+        {'mk_kode': 'B', 'kode': 'CPMK1', 'cpl_terkait': ['KK1']},
+    ])
+    scores = pd.DataFrame({'NIM': ['1', '1', '1'], 'Kode': ['A', 'A', 'B'],
+                           'CPMK': ['CPMK1', 'CPMK2', 'CPMK1'], 'Nilai': [80.0, 60.0, 90.0]})
+    result = matrix.rollup(scores)
+
+    assert result.loc['1', 'S1'] == pytest.approx((80 * 2 + 60) / 3)
+    assert result.loc['1', 'KK1'] == pytest.approx((80 + 90) / 2)
+    assert matrix.course_frame().loc['A', 'S1'] == 3
+
+
+def _batch(rng, n=12):
+    nims = [f"{rng.choice(['2021', '2022'])}{i:03d}" for i in range(n)]
+    return pd.DataFrame({'NIM': nims, 'Nilai': rng.integers(30, 101, n).astype(float)})
+
+
+def _recompute(batches):
+    """Agregat dari nol langsung dari semua nilai batch yang tersisa"""
+    cpls = {mk['Kode']: [c.strip() for c in mk['CPL'].split(',')] for mk in MK}
+    rows = [
+        {'CPL': cpl, 'Angkatan': nim[:4], 'Semester': semester, 'Nilai': nilai}
+        for (kode, semester), grades in batches.items()
+        for nim, nilai in zip(grades['NIM'], grades['Nilai'])
+        for cpl in cpls[kode]
+    ]
+    grouped = pd.DataFrame(rows).groupby(['CPL', 'Angkatan', 'Semester'])['Nilai']
+    return pd.DataFrame({
+        'Rata-rata': grouped.mean(),
+        '% Nilai Tercapai': grouped.apply(lambda s: (s >= PASSING_ATTAINMENT).mean() * 100),
+        'Jumlah Nilai': grouped.size(),
+    })
+
+
+def _assert_matches(aggregates, batches):
+    actual = aggregates.frame().set_index(['CPL', 'Angkatan', 'Semester']).sort_index()
+    expected = _recompute(batches).sort_index()
+    assert list(actual.index) == list(expected.index)
+    np.testing.assert_allclose(actual.to_numpy(dtype=float), expected.to_numpy(dtype=float))
+
+
+def test_cpl_aggregates_match_full_recompute(engine):
+    rng = np.random.default_rng(7)
+    batches = {(kode, semester): _batch(rng) for kode in 'ABC' for semester in ('2023/2024 Ganjil', '2024/2025 Ganjil')}
+    aggregates = CplAggregates()
+    for (kode, semester), grades in batches.items():
+        aggregates.apply(batch_contribution(engine, kode, semester, grades))
+    _assert_matches(aggregates, batches)
+
+    # Ganti satu batch: hanya baris CPL MK tersebut yang berubah
+    key = ('A', '2023/2024 Ganjil')
+    batches[key] = _batch(rng, n=5)
+    touched = aggregates.apply(batch_contribution(engine, *key, batches[key]))
+    assert {cpl for cpl, _, _ in touched} == {'S1', 'KK1'}
+    _assert_matches(aggregates, batches)
+
+    # Hapus batch: baris yang tidak lagi punya nilai ikut hilang
+    for key in [('C', '2023/2024 Ganjil'), ('C', '2024/2025 Ganjil')]:
+        aggregates.remove(f"{key[0]}|{key[1]}")
+        del batches[key]
+    _assert_matches(aggregates, batches)
+    assert 'P1' not in set(aggregates.frame()['CPL'])
+
+    # Membangun ulang dari record tersimpan memberi hasil yang sama
+    rebuilt = CplAggregates(aggregates.batches.values())
+    pd.testing.assert_frame_equal(rebuilt.frame(), aggregates.frame())
@@ -0,0 +1,44 @@
+import importlib
+
+import pytest
+
+from prasyarat import PrerequisiteOrder
+
+
+def test_order_rejects_cycles_and_keeps_topological_order():
+    order = PrerequisiteOrder.from_data({'B': ['A'], 'C': ['B']})
+
+    assert order.add_edge('C', 'A') == ['A', 'B', 'C', 'A']
+    assert order.add_edge('A', 'A') == ['A', 'A']
+    assert order.set_prerequisites('A', ['C'])
+    assert order.set_prerequisites('D', ['C', 'A']) is None
+    assert order.ord['A'] < order.ord['B'] < order.ord['C'] < order.ord['D']
+
+
+def test_from_data_reports_stored_cycles():
+    order = PrerequisiteOrder.from_data({'A': ['B'], 'B': ['A']})
+    assert len(order.rejected) == 1
+
+
+@pytest.fixture(scope='module')
+def main(tmp_path_factory):
+    # main.py adalah skrip Streamlit: di-import dalam mode bare dengan direktori data sementara
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(tmp_path_factory.mktemp('kurikulum'))
+        yield importlib.import_module('main')
+
+
+def test_set_prasyarat_rejects_cycle_without_saving(main):
+    assert main.set_prasyarat('B', ['A']) is None
+    assert main.set_prasyarat('C', ['B']) is None
+
+    cycle = main.set_prasyarat('A', ['C'])
+    assert cycle[0] == cycle[-1] and set(cycle) == {'A', 'B', 'C'}
+    saved = main.load_current('prasyarat_data')
+    assert 'A' not in saved
+    assert list(saved['C']) == ['B']
+
+    # Menghapus prasyarat yang membentuk rantai membuat edge tadi diterima
+    assert main.set_prasyarat('C', []) is None
+    assert main.set_prasyarat('A', ['C']) is None
+    assert list(main.load_current('prasyarat_data')['A']) == ['C']
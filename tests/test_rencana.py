@@ -0,0 +1,88 @@
+import functools
+import itertools
+import random
+
+import pytest
+
+from curriculum import CurriculumIndex
+from prasyarat import ReachabilityIndex
+from rencana import StudyPlanner
+
+
+def make_planner(spec, prasyarat, **kwargs):
+    """spec: {kode: (sks, semester kurikulum)}"""
+    mk = [{'Kode': kode, 'Nama': kode, 'SKS': sks, 'Semester': semester} for kode, (sks, semester) in spec.items()]
+    return StudyPlanner(CurriculumIndex(mk), ReachabilityIndex(prasyarat, extra_nodes=list(spec)), **kwargs)
+
+
+def assert_valid(plan, spec, prasyarat, start, sks_max):
+    taken = {}
+    for row in plan:
+        assert row['SKS'] == sum(spec[kode][0] for kode in row['MK']) <= sks_max
+        for kode in row['MK']:
+            assert row['Semester'] % 2 == spec[kode][1] % 2  # MK hanya dibuka di semester ganjil/genap-nya
+            taken[kode] = row['Semester']
+    assert sorted(taken) == sorted(spec)
+    assert min(taken.values()) >= start
+    for kode, prereqs in prasyarat.items():
+        assert all(taken[p] < taken[kode] for p in prereqs)
+
+
+def feasible(spec, prasyarat, start, sks_max, total=8):
+    """Pencarian lengkap (semua subset per semester) sebagai pembanding"""
+    codes = list(spec)
+
+    @functools.lru_cache(maxsize=None)
+    def search(semester, done):
+        if len(done) == len(codes):
+            return True
+        if semester > total:
+            return False
+        available = [k for k in codes if k not in done and spec[k][1] % 2 == semester % 2
+                     and all(p in done for p in prasyarat.get(k, []))]
+        for r in range(len(available) + 1):
+            for combo in itertools.combinations(available, r):
+                if sum(spec[k][0] for k in combo) <= sks_max and search(semester + 1, done | frozenset(combo)):
+                    return True
+        return False
+
+    return search(start, frozenset())
+
+
+def test_finds_plan_beyond_balanced_and_full_packages():
+    spec = {'M0': (4, 5), 'M1': (2, 1), 'M2': (4, 7), 'M3': (6, 3), 'M4': (2, 6), 'M5': (4, 1), 'M6': (4, 5)}
+    prasyarat = {'M2': ['M0', 'M1'], 'M4': ['M0', 'M1'], 'M6': ['M0']}
+    plan = make_planner(spec, prasyarat, sks_max=8).plan((), None, 3)
+
+    assert plan is not None
+    assert_valid(plan, spec, prasyarat, 3, 8)
+
+
+def test_passed_courses_and_impossible_plan():
+    spec = {'A': (3, 1), 'B': (3, 2), 'C': (3, 3)}
+    prasyarat = {'B': ['A'], 'C': ['B']}
+    planner = make_planner(spec, prasyarat)
+
+    plan = planner.plan(('A',), None, 2)
+    assert [row['MK'] for row in plan if row['MK']] == [['B'], ['C']]
+    # Rantai A -> B -> C butuh tiga semester, hanya tersisa dua
+    assert planner.plan((), None, 7) is None
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_matches_exhaustive_search(seed):
+    rng = random.Random(seed)
+    for _ in range(40):
+        n = rng.randint(4, 7)
+        spec = {f"M{i}": (rng.choice([2, 3, 4, 6]), rng.randint(1, 8)) for i in range(n)}
+        prasyarat = {}
+        for i in range(n):
+            prereqs = [f"M{j}" for j in range(i) if rng.random() < 0.3]
+            if prereqs:
+                prasyarat[f"M{i}"] = prereqs
+        start, sks_max = rng.randint(3, 7), rng.choice([6, 8, 9])
+
+        plan = make_planner(spec, prasyarat, sks_max=sks_max).plan((), None, start)
+        assert (plan is not None) == feasible(spec, prasyarat, start, sks_max)
+        if plan is not None:
+            assert_valid(plan, spec, prasyarat, start, sks_max)